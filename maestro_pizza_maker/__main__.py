@@ -0,0 +1,8 @@
+# python -m maestro_pizza_maker, see `maestro_pizza_maker.cli`
+
+import sys
+
+from maestro_pizza_maker.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+# The web tier of the maestro pizza maker serves many guests at once from async handlers.
+# Solving a pizza model or aggregating the taste of a menu blocks the event loop, therefore the work runs
+# on an executor and the requests are grouped on the way:
+#
+#   - identical requests in flight are merged, the later callers await the result of the first one
+#   - requests arriving within `window` seconds are coalesced: the optimizer requests sharing a set of constraints
+#     go to the executor together and are solved on one model, the requests with other constraints go in
+#     other executor calls and are solved in parallel. The risk measures of all menus of the window are computed
+#     in one executor call, at once on the stacked menu tastes
+#
+# usage:
+#   pizza = await optimize(constraints_values, constraints_ingredients, lambda_param=0.5)
+#   tar = await menu_risk(menu, quantile=0.05)
+#
+# The merged callers share the returned `Pizza`, it should not be modified.
+
+import asyncio
+import weakref
+from concurrent.futures import Executor
+from dataclasses import astuple, dataclass
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from maestro_pizza_maker.catalog import IngredientCatalog, default_catalog
+from maestro_pizza_maker.pizza import Pizza
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.pizza_optimizer import (
+    OBJECTIVES,
+    PizzaConstraintsIngredients,
+    PizzaConstraintsValues,
+    build_pizza_model,
+    solve_objective,
+)
+from maestro_pizza_maker.profiling import count
+from maestro_pizza_maker.taste_at_risk import _menu_taste
+
+# the risk measures of `maestro_pizza_maker.taste_at_risk`, taste at risk and conditional taste at risk of a menu
+RISK_MEASURES = ["tar", "ctar"]
+
+
+@dataclass
+class _OptimizeRequest:
+    constraints_values: PizzaConstraintsValues
+    constraints_ingredients: PizzaConstraintsIngredients
+    objective: str
+    lambda_param: float
+    catalog: IngredientCatalog
+    max_seconds: float = np.inf
+
+    def model_key(self) -> Hashable:
+        # requests with the same key are solved on the same model
+        return astuple(self.constraints_values), astuple(self.constraints_ingredients), id(self.catalog)
+
+
+@dataclass
+class _RiskRequest:
+    menu: PizzaMenu
+    quantile: float
+    measure: str
+
+
+def _optimize_batch(requests: List[_OptimizeRequest]) -> List[Any]:
+    # the pizza or the raised exception of every request
+    models: Dict[Hashable, Any] = {}
+    results: List[Any] = []
+    for request in requests:
+        try:
+            key = request.model_key()
+            if key not in models:
+                models[key] = build_pizza_model(
+                    request.constraints_values, request.constraints_ingredients, request.catalog
+                )
+            results.append(
+                solve_objective(models[key], request.objective, request.lambda_param, request.max_seconds)
+            )
+        except Exception as error:
+            results.append(error)
+    return results
+
+
+def _risk_batch(requests: List[_RiskRequest]) -> List[Any]:
+    # the menu tastes with the same number of scenarios are stacked, the quantiles and the tail means
+    # are computed once per quantile for all menus
+    results: List[Any] = [None] * len(requests)
+    groups: Dict[Tuple[int, float], List[Tuple[int, np.ndarray]]] = {}
+    for k, request in enumerate(requests):
+        try:
+            taste = np.asarray(_menu_taste(request.menu))
+            if taste.ndim != 1:
+                raise ValueError("the menu has no pizzas")
+        except Exception as error:
+            results[k] = error
+            continue
+        groups.setdefault((len(taste), request.quantile), []).append((k, taste))
+
+    for (_, quantile), members in groups.items():
+        tastes = np.vstack([taste for _, taste in members])
+        tar = np.quantile(tastes, q=quantile, axis=1)
+        tail = tastes <= tar[:, None]
+        ctar = (tastes * tail).sum(axis=1) / tail.sum(axis=1)
+        for (k, _), menu_tar, menu_ctar in zip(members, tar, ctar):
+            results[k] = float(menu_tar if requests[k].measure == "tar" else menu_ctar)
+    return results
+
+
+def _distribute(batch: List[Tuple[Any, asyncio.Future]], done: asyncio.Future) -> None:
+    for k, (_, future) in enumerate(batch):
+        if future.done():
+            continue
+        if done.cancelled():
+            future.cancel()
+        elif done.exception() is not None:
+            future.set_exception(done.exception())
+        elif isinstance(done.result()[k], BaseException):
+            future.set_exception(done.result()[k])
+        else:
+            future.set_result(done.result()[k])
+
+
+class _MicroBatcher:
+    # Collects the requests arriving within `window` seconds (at most max_batch of them)
+    # and runs them with one call of run_batch on the executor, or one call per group_key of the requests.
+
+    def __init__(
+        self, name: str, run_batch: Callable[[List[Any]], List[Any]], window: float, max_batch: int,
+        executor: Optional[Executor], group_key: Optional[Callable[[Any], Hashable]] = None,
+    ) -> None:
+        self.name = name
+        self.run_batch = run_batch
+        self.window = window
+        self.max_batch = max_batch
+        self.executor = executor
+        self.group_key = group_key
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def submit(self, request: Any) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((request, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        groups: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        for request, future in pending:
+            key = None if self.group_key is None else self.group_key(request)
+            groups.setdefault(key, []).append((request, future))
+        loop = asyncio.get_running_loop()
+        for batch in groups.values():
+            count("aio.batch", len(batch), kind=self.name)
+            done = loop.run_in_executor(self.executor, self.run_batch, [request for request, _ in batch])
+            done.add_done_callback(partial(_distribute, batch))
+
+
+class PizzaService:
+    """
+    Asyncio front end of the pizza optimizer and of the risk measures of a menu.
+    The work runs on the executor, the default executor of the event loop by default.
+    Identical requests in flight are merged and the requests of every window seconds are batched.
+    A service belongs to one event loop.
+    """
+
+    def __init__(self, executor: Optional[Executor] = None, window: float = 0.002, max_batch: int = 64) -> None:
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # only the requests sharing a model wait for each other
+        self._optimizer = _MicroBatcher(
+            "optimize", _optimize_batch, window, max_batch, executor, group_key=_OptimizeRequest.model_key
+        )
+        self._risk = _MicroBatcher("menu_risk", _risk_batch, window, max_batch, executor)
+
+    def _merged(self, key: Hashable, batcher: _MicroBatcher, request: Any) -> asyncio.Future:
+        future = self._inflight.get(key)
+        if future is None:
+            future = batcher.submit(request)
+            self._inflight[key] = future
+            future.add_done_callback(partial(self._done, key))
+        else:
+            count("aio.merged", kind=batcher.name)
+        # a cancelled caller must not cancel the request of the merged callers
+        return asyncio.shield(future)
+
+    def _done(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # the exception is retrieved by the callers, if any are left
+            future.exception()
+
+    async def optimize(
+        self,
+        constraints_values: PizzaConstraintsValues,
+        constraints_ingredients: PizzaConstraintsIngredients,
+        objective: str = "maximize_taste_penalty_price",
+        lambda_param: float = 0.5,
+        catalog: Optional[IngredientCatalog] = None,
+        max_seconds: float = np.inf,
+    ) -> Pizza:
+        if objective not in OBJECTIVES:
+            raise ValueError(f"unknown objective {objective}, expected one of {OBJECTIVES}")
+        catalog = default_catalog() if catalog is None else catalog
+        if objective == "minimize_price":
+            # lambda_param does not change the price, equal constraints are the same request
+            lambda_param = 0.5
+        request = _OptimizeRequest(
+            constraints_values, constraints_ingredients, objective, float(lambda_param), catalog, float(max_seconds)
+        )
+        key = ("optimize", objective, request.lambda_param, request.max_seconds) + request.model_key()
+        return await self._merged(key, self._optimizer, request)
+
+    async def menu_risk(self, menu: PizzaMenu, quantile: float = 0.05, measure: str = "tar") -> float:
+        if measure not in RISK_MEASURES:
+            raise ValueError(f"unknown measure {measure}, expected one of {RISK_MEASURES}")
+        # We focus on the left tail of the taste distribution.
+        if quantile > 0.5:
+            quantile = 1 - quantile
+        # the menu is kept alive by the request, its id is not reused while the request is in flight
+        key = ("menu_risk", id(menu), float(quantile), measure)
+        return await self._merged(key, self._risk, _RiskRequest(menu, float(quantile), measure))
+
+
+# the services of the module level functions, one per event loop
+_SERVICES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, PizzaService]" = weakref.WeakKeyDictionary()
+
+
+def _service() -> PizzaService:
+    loop = asyncio.get_running_loop()
+    if loop not in _SERVICES:
+        _SERVICES[loop] = PizzaService()
+    return _SERVICES[loop]
+
+
+async def optimize(
+    constraints_values: PizzaConstraintsValues,
+    constraints_ingredients: PizzaConstraintsIngredients,
+    objective: str = "maximize_taste_penalty_price",
+    lambda_param: float = 0.5,
+    catalog: Optional[IngredientCatalog] = None,
+    max_seconds: float = np.inf,
+) -> Pizza:
+    """
+    Solves one of `OBJECTIVES` (`minimize_price` or `maximize_taste_penalty_price`) without blocking the event loop,
+    the solver returns the best pizza found within max_seconds, see `solve_objective`.
+    """
+    return await _service().optimize(
+        constraints_values, constraints_ingredients, objective, lambda_param, catalog, max_seconds
+    )
+
+
+async def menu_risk(menu: PizzaMenu, quantile: float = 0.05, measure: str = "tar") -> float:
+    """
+    The taste at risk ("tar") or the conditional taste at risk ("ctar") of the menu without blocking the event loop.
+    """
+    return await _service().menu_risk(menu, quantile, measure)
@@ -0,0 +1,506 @@
+# Benchmark suite for the maestro pizza maker.
+# Every operation is timed and its peak memory is traced on synthetic pizzas, menus and ingredient catalogs
+# of configurable size, so that a change can be checked against a stored JSON baseline.
+#
+# usage:
+#   python -m maestro_pizza_maker.benchmarks --output results.json
+#   python -m maestro_pizza_maker.benchmarks --baseline baseline.json --save-baseline
+#   python -m maestro_pizza_maker.benchmarks --baseline baseline.json --threshold 0.25
+#
+# the last call exits with status 1 if any operation got slower (or hungrier) than the baseline by more than the threshold.
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from maestro_pizza_maker.catalog import INGREDIENT_TYPES, IngredientCatalog
+from maestro_pizza_maker.ingredients import IngredientType
+from maestro_pizza_maker.pizza import Pizza
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.sand_box.fat_generator import fat_dtype
+
+PRESETS: Dict[str, Dict[str, List[int]]] = {
+    "quick": {
+        "menu_sizes": [10, 1_000],
+        "scenario_counts": [1_000, 10_000],
+        "catalog_sizes": [16, 256],
+    },
+    "full": {
+        "menu_sizes": [10, 1_000, 100_000, 1_000_000],
+        "scenario_counts": [1_000, 10_000, 100_000, 1_000_000],
+        "catalog_sizes": [16, 256, 4_096],
+    },
+}
+
+# sizes of the axes that an operation is not parametrized by, the menu size is the requested one closest to it
+DEFAULT_MENU_SIZE = 100
+DEFAULT_SCENARIO_COUNT = 1_000
+DEFAULT_CATALOG_SIZE = 16
+# number of concurrent requests of the asyncio front end
+BURST_SIZE = 64
+# worker counts of the thread-parallel evaluation, 2 runs the parallel code path on a single core
+PARALLEL_WORKERS = [2, 8]
+
+# the type of the i-th synthetic ingredient, dough and sauce come first so that every catalog can build a pizza
+_TYPE_CYCLE = [
+    IngredientType.DOUGH,
+    IngredientType.SAUCE,
+    IngredientType.CHEESE,
+    IngredientType.MEAT,
+    IngredientType.VEGETABLE,
+    IngredientType.FRUIT,
+]
+
+
+@dataclass
+class BenchmarkConfig:
+    menu_sizes: List[int]
+    scenario_counts: List[int]
+    catalog_sizes: List[int]
+    operations: Optional[List[str]] = None
+    repeat: int = 3
+    seed: int = 0
+
+
+@dataclass
+class BenchmarkResult:
+    operation: str
+    params: Dict[str, int]
+    seconds: float
+    peak_bytes: int
+
+    @property
+    def key(self) -> str:
+        params = ",".join(f"{name}={value}" for name, value in sorted(self.params.items()))
+        return f"{self.operation}[{params}]"
+
+
+@dataclass
+class Regression:
+    key: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else np.inf
+
+
+@dataclass
+class Comparison:
+    regressions: List[Regression] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.regressions
+
+
+def synthetic_catalog(
+    n_ingredients: int, n_scenarios: int, seed: int = 0, dtype: Optional[str] = None
+) -> IngredientCatalog:
+    """
+    Creates a catalog of n_ingredients random pizza ingredients with n_scenarios fat scenarios,
+    stored in the given dtype or the one of `fat_dtype`.
+    """
+    if n_ingredients < len(_TYPE_CYCLE):
+        raise ValueError(f"the catalog needs at least {len(_TYPE_CYCLE)} ingredients")
+    rng = np.random.default_rng(seed)
+    type_codes = np.array([INGREDIENT_TYPES.index(ingredient_type) for ingredient_type in _TYPE_CYCLE])
+    return IngredientCatalog(
+        names=[f"INGREDIENT_{i}" for i in range(n_ingredients)],
+        types=type_codes[np.arange(n_ingredients) % len(_TYPE_CYCLE)],
+        price=rng.uniform(0.5, 2.0, size=n_ingredients),
+        protein=rng.uniform(0.0, 15.0, size=n_ingredients),
+        carbohydrates=rng.uniform(0.0, 10.0, size=n_ingredients),
+        calories=rng.uniform(10.0, 400.0, size=n_ingredients),
+        fat=rng.normal(loc=30, scale=5, size=(n_ingredients, n_scenarios)).clip(min=0.1).astype(fat_dtype(dtype)),
+    )
+
+
+def synthetic_menu(ingredients: IngredientCatalog, n_pizzas: int, seed: int = 0) -> PizzaMenu:
+    """
+    Creates a menu of n_pizzas random pizzas with one dough, one sauce and up to two toppings of every other type.
+    """
+    rng = np.random.default_rng(seed)
+    by_type: Dict[IngredientType, List] = {}
+    for ingredient in ingredients:
+        by_type.setdefault(ingredient.value.type, []).append(ingredient)
+
+    def pick(ingredient_type: IngredientType, low: int, high: int) -> List:
+        options = by_type[ingredient_type]
+        size = int(rng.integers(low, high + 1))
+        return [options[i] for i in rng.integers(0, len(options), size=size)]
+
+    pizzas = [
+        Pizza(
+            dough=pick(IngredientType.DOUGH, 1, 1)[0],
+            sauce=pick(IngredientType.SAUCE, 1, 1)[0],
+            cheese=pick(IngredientType.CHEESE, 0, 2),
+            fruits=pick(IngredientType.FRUIT, 0, 2),
+            meat=pick(IngredientType.MEAT, 0, 2),
+            vegetables=pick(IngredientType.VEGETABLE, 0, 2),
+        )
+        for _ in range(n_pizzas)
+    ]
+    return PizzaMenu(pizzas=pizzas)
+
+
+# every operation yields (params, callable to benchmark) pairs, the setup is done outside of the measurement
+Case = Tuple[Dict[str, int], Callable[[], object]]
+
+
+def _bench_pizza_taste(config: BenchmarkConfig) -> Iterator[Case]:
+    for n_scenarios in config.scenario_counts:
+        ingredients = synthetic_catalog(DEFAULT_CATALOG_SIZE, n_scenarios, config.seed)
+        pizza = synthetic_menu(ingredients, 1, config.seed).pizzas[0]
+        yield {"scenarios": n_scenarios}, lambda pizza=pizza: pizza.taste
+
+
+def _bench_fat_scenarios(config: BenchmarkConfig) -> Iterator[Case]:
+    from maestro_pizza_maker.sand_box.fat_generator import multivariate_normal_scenarios
+
+    rng = np.random.default_rng(config.seed)
+    mean = rng.normal(loc=30, scale=5, size=DEFAULT_CATALOG_SIZE)
+    dummy = rng.random((DEFAULT_CATALOG_SIZE, DEFAULT_CATALOG_SIZE))
+    for n_scenarios in config.scenario_counts:
+        yield {"scenarios": n_scenarios}, lambda n_scenarios=n_scenarios: multivariate_normal_scenarios(
+            mean, dummy @ dummy.T, n_scenarios, config.seed
+        )
+
+
+def _bench_menu_to_dataframe(config: BenchmarkConfig) -> Iterator[Case]:
+    ingredients = synthetic_catalog(DEFAULT_CATALOG_SIZE, DEFAULT_SCENARIO_COUNT, config.seed)
+    for n_pizzas in config.menu_sizes:
+        menu = synthetic_menu(ingredients, n_pizzas, config.seed)
+        yield {"pizzas": n_pizzas}, lambda menu=menu: menu.to_dataframe(
+            sort_by="price", descendent=False
+        )
+
+
+def _menu_size(config: BenchmarkConfig) -> int:
+    # the menu size of the operations that are not parametrized by it, one of the requested sizes
+    return min(config.menu_sizes, key=lambda n_pizzas: (abs(n_pizzas - DEFAULT_MENU_SIZE), n_pizzas))
+
+
+def _bench_menu_construction(config: BenchmarkConfig) -> Iterator[Case]:
+    n_pizzas = _menu_size(config)
+    for n_ingredients in config.catalog_sizes:
+        ingredients = synthetic_catalog(n_ingredients, DEFAULT_SCENARIO_COUNT, config.seed)
+        yield {"ingredients": n_ingredients}, lambda ingredients=ingredients: synthetic_menu(
+            ingredients, n_pizzas, config.seed
+        )
+
+
+def _bench_taste_at_risk_menu(config: BenchmarkConfig) -> Iterator[Case]:
+    from maestro_pizza_maker.taste_at_risk import (
+        conditional_taste_at_risk_menu,
+        taste_at_risk_menu,
+    )
+
+    n_pizzas = _menu_size(config)
+    for n_scenarios in config.scenario_counts:
+        ingredients = synthetic_catalog(DEFAULT_CATALOG_SIZE, n_scenarios, config.seed)
+        menu = synthetic_menu(ingredients, n_pizzas, config.seed)
+        yield {"pizzas": n_pizzas, "scenarios": n_scenarios}, lambda menu=menu: (
+            taste_at_risk_menu(menu, quantile=0.05),
+            conditional_taste_at_risk_menu(menu, quantile=0.05),
+        )
+    ingredients = synthetic_catalog(DEFAULT_CATALOG_SIZE, DEFAULT_SCENARIO_COUNT, config.seed)
+    for n_pizzas in config.menu_sizes:
+        menu = synthetic_menu(ingredients, n_pizzas, config.seed)
+        yield {"pizzas": n_pizzas, "scenarios": DEFAULT_SCENARIO_COUNT}, lambda menu=menu: (
+            taste_at_risk_menu(menu, quantile=0.05),
+            conditional_taste_at_risk_menu(menu, quantile=0.05),
+        )
+
+
+def _bench_parallel_risk(config: BenchmarkConfig) -> Iterator[Case]:
+    from maestro_pizza_maker.taste_at_risk import conditional_taste_at_risk_menu
+
+    ingredients = synthetic_catalog(DEFAULT_CATALOG_SIZE, DEFAULT_SCENARIO_COUNT, config.seed)
+    for n_pizzas in config.menu_sizes:
+        menu = synthetic_menu(ingredients, n_pizzas, config.seed)
+        for n_workers in PARALLEL_WORKERS:
+            yield {"pizzas": n_pizzas, "workers": n_workers}, lambda menu=menu, n_workers=n_workers: (
+                conditional_taste_at_risk_menu(menu, quantile=0.05, n_workers=n_workers),
+                menu.get_most_fat_pizza(quantile=0.5, n_workers=n_workers),
+            )
+
+
+def _bench_most_fat_pizza(config: BenchmarkConfig) -> Iterator[Case]:
+    ingredients = synthetic_catalog(DEFAULT_CATALOG_SIZE, DEFAULT_SCENARIO_COUNT, config.seed)
+    for n_pizzas in config.menu_sizes:
+        menu = synthetic_menu(ingredients, n_pizzas, config.seed)
+        yield {"pizzas": n_pizzas}, lambda menu=menu: menu.get_most_fat_pizza(quantile=0.5)
+
+
+def _bench_pareto_front(config: BenchmarkConfig) -> Iterator[Case]:
+    ingredients = synthetic_catalog(DEFAULT_CATALOG_SIZE, DEFAULT_SCENARIO_COUNT, config.seed)
+    for n_pizzas in config.menu_sizes:
+        menu = synthetic_menu(ingredients, n_pizzas, config.seed)
+        yield {"pizzas": n_pizzas}, lambda menu=menu: menu.pareto_front(
+            ["price", "taste_at_risk", "calories"], catalog=ingredients
+        )
+
+
+def _bench_pareto_full_front(config: BenchmarkConfig) -> Iterator[Case]:
+    from maestro_pizza_maker.pareto import pareto_mask
+
+    # the worst case of three objectives: every point is on the front, no pivot removes any of them
+    rng = np.random.default_rng(config.seed)
+    for n_pizzas in config.menu_sizes:
+        values = rng.random((n_pizzas, 3))
+        values[:, 2] = 3 - values[:, 0] - values[:, 1]
+        yield {"pizzas": n_pizzas}, lambda values=values: pareto_mask(values)
+
+
+def _bench_taste_index(config: BenchmarkConfig) -> Iterator[Case]:
+    ingredients = synthetic_catalog(DEFAULT_CATALOG_SIZE, DEFAULT_SCENARIO_COUNT, config.seed)
+    for n_pizzas in config.menu_sizes:
+        menu = synthetic_menu(ingredients, n_pizzas, config.seed)
+        yield {"pizzas": n_pizzas}, lambda menu=menu: menu.taste_index().duplicates(radius=0.01)
+
+
+def _bench_sensitivities(config: BenchmarkConfig) -> Iterator[Case]:
+    from maestro_pizza_maker.pizza_sensitivities import (
+        menu_sensitivity_carbs,
+        menu_sensitivity_fat,
+        menu_sensitivity_protein,
+    )
+
+    ingredients = synthetic_catalog(DEFAULT_CATALOG_SIZE, DEFAULT_SCENARIO_COUNT, config.seed)
+    for n_pizzas in config.menu_sizes:
+        menu = synthetic_menu(ingredients, max(n_pizzas, 2), config.seed)
+        yield {"pizzas": n_pizzas}, lambda menu=menu: (
+            menu_sensitivity_protein(menu),
+            menu_sensitivity_carbs(menu),
+            menu_sensitivity_fat(menu),
+        )
+
+
+def _bench_catalog_load(config: BenchmarkConfig) -> Iterator[Case]:
+    import os
+    import tempfile
+
+    # the cases are measured while the generator waits at the yield, the files are removed after the last one
+    with tempfile.TemporaryDirectory() as directory:
+        for n_ingredients in config.catalog_sizes:
+            path = os.path.join(directory, f"catalog_{n_ingredients}.npz")
+            synthetic_catalog(n_ingredients, DEFAULT_SCENARIO_COUNT, config.seed).to_npz(path)
+            yield {"ingredients": n_ingredients}, lambda path=path: IngredientCatalog.from_npz(path)
+
+
+def _bench_optimizers(config: BenchmarkConfig) -> Iterator[Case]:
+    from maestro_pizza_maker.pizza_optimizer import (
+        PizzaConstraintsIngredients,
+        PizzaConstraintsValues,
+        maximize_taste_penalty_price,
+        minimize_price,
+    )
+
+    constraints_ingredients = PizzaConstraintsIngredients(cheese=1, meat=1, vegetables=1)
+    for n_ingredients in config.catalog_sizes:
+        catalog = synthetic_catalog(n_ingredients, DEFAULT_SCENARIO_COUNT, config.seed)
+        yield {"ingredients": n_ingredients}, lambda catalog=catalog: (
+            minimize_price(PizzaConstraintsValues(), constraints_ingredients, catalog=catalog),
+            maximize_taste_penalty_price(
+                PizzaConstraintsValues(), constraints_ingredients, catalog=catalog
+            ),
+        )
+
+
+def _bench_aio_burst(config: BenchmarkConfig) -> Iterator[Case]:
+    import asyncio
+
+    from maestro_pizza_maker.aio import PizzaService
+
+    async def burst(menus: List[PizzaMenu]) -> List[float]:
+        service = PizzaService()
+        return await asyncio.gather(*[service.menu_risk(menu, quantile=0.05) for menu in menus])
+
+    # a burst of concurrent risk requests, every menu is requested twice
+    for n_scenarios in config.scenario_counts:
+        ingredients = synthetic_catalog(DEFAULT_CATALOG_SIZE, n_scenarios, config.seed)
+        menus = [synthetic_menu(ingredients, 10, config.seed + k) for k in range(BURST_SIZE // 2)] * 2
+        yield {"requests": BURST_SIZE, "scenarios": n_scenarios}, lambda menus=menus: asyncio.run(burst(menus))
+
+
+OPERATIONS: Dict[str, Callable[[BenchmarkConfig], Iterator[Case]]] = {
+    "catalog_load": _bench_catalog_load,
+    "pizza_taste": _bench_pizza_taste,
+    "fat_scenarios": _bench_fat_scenarios,
+    "menu_construction": _bench_menu_construction,
+    "menu_to_dataframe": _bench_menu_to_dataframe,
+    "taste_at_risk_menu": _bench_taste_at_risk_menu,
+    "most_fat_pizza": _bench_most_fat_pizza,
+    "parallel_risk": _bench_parallel_risk,
+    "pareto_front": _bench_pareto_front,
+    "pareto_full_front": _bench_pareto_full_front,
+    "taste_index": _bench_taste_index,
+    "sensitivities": _bench_sensitivities,
+    "optimizers": _bench_optimizers,
+    "aio_burst": _bench_aio_burst,
+}
+
+
+def measure(function: Callable[[], object], repeat: int = 3) -> Tuple[float, int]:
+    """
+    Returns the best wall time out of `repeat` runs and the peak traced memory of one extra run.
+    The memory run is separate, since tracing allocations slows the timed runs down.
+    """
+    seconds = np.inf
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        function()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak_bytes
+
+
+def run_benchmarks(config: BenchmarkConfig) -> List[BenchmarkResult]:
+    operations = config.operations or list(OPERATIONS)
+    unknown = set(operations) - set(OPERATIONS)
+    if unknown:
+        raise ValueError(f"unknown benchmark operations: {sorted(unknown)}")
+
+    results = []
+    for operation in operations:
+        for params, function in OPERATIONS[operation](config):
+            seconds, peak_bytes = measure(function, repeat=config.repeat)
+            results.append(BenchmarkResult(operation, params, seconds, peak_bytes))
+    return results
+
+
+def compare(
+    baseline: List[BenchmarkResult],
+    current: List[BenchmarkResult],
+    threshold: float = 0.25,
+    memory_threshold: Optional[float] = None,
+    min_seconds: float = 1e-3,
+) -> Comparison:
+    """
+    Compares the current results with the baseline ones.
+    A result regresses if it is slower (or uses more memory) than the baseline by more than the relative threshold,
+    timings faster than min_seconds in both runs are considered noise and skipped.
+    """
+    memory_threshold = threshold if memory_threshold is None else memory_threshold
+    by_key = {result.key: result for result in baseline}
+    comparison = Comparison()
+    for result in current:
+        reference = by_key.get(result.key)
+        if reference is None:
+            comparison.missing.append(result.key)
+            continue
+        if max(result.seconds, reference.seconds) >= min_seconds and result.seconds > reference.seconds * (1 + threshold):
+            comparison.regressions.append(
+                Regression(result.key, "seconds", reference.seconds, result.seconds)
+            )
+        if result.peak_bytes > reference.peak_bytes * (1 + memory_threshold):
+            comparison.regressions.append(
+                Regression(result.key, "peak_bytes", reference.peak_bytes, result.peak_bytes)
+            )
+    return comparison
+
+
+def save_results(results: List[BenchmarkResult], path: str) -> None:
+    document = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "fat_dtype": fat_dtype().name,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": [asdict(result) for result in results],
+    }
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2)
+
+
+def load_results(path: str) -> List[BenchmarkResult]:
+    with open(path) as file:
+        document = json.load(file)
+    return [BenchmarkResult(**result) for result in document["results"]]
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m maestro_pizza_maker.benchmarks",
+        description="Benchmarks pizzas, menus, risk measures, sensitivities and optimizers.",
+    )
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    parser.add_argument("--menu-sizes", type=int, nargs="+")
+    parser.add_argument("--scenario-counts", type=int, nargs="+")
+    parser.add_argument("--catalog-sizes", type=int, nargs="+")
+    parser.add_argument("--operations", nargs="+", choices=sorted(OPERATIONS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="where to write the results as JSON")
+    parser.add_argument("--baseline", help="JSON baseline to compare the results with")
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="write the results to --baseline instead of comparing with it",
+    )
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--memory-threshold", type=float)
+    parser.add_argument("--min-seconds", type=float, default=1e-3)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    preset = PRESETS[args.preset]
+    config = BenchmarkConfig(
+        menu_sizes=args.menu_sizes or preset["menu_sizes"],
+        scenario_counts=args.scenario_counts or preset["scenario_counts"],
+        catalog_sizes=args.catalog_sizes or preset["catalog_sizes"],
+        operations=args.operations,
+        repeat=args.repeat,
+        seed=args.seed,
+    )
+    results = run_benchmarks(config)
+    for result in results:
+        print(f"{result.key:<60} {result.seconds * 1e3:12.3f} ms {result.peak_bytes / 2**20:10.2f} MiB")
+
+    if args.output:
+        save_results(results, args.output)
+    if args.baseline and args.save_baseline:
+        save_results(results, args.baseline)
+        return 0
+    if args.baseline:
+        comparison = compare(
+            load_results(args.baseline),
+            results,
+            threshold=args.threshold,
+            memory_threshold=args.memory_threshold,
+            min_seconds=args.min_seconds,
+        )
+        for key in comparison.missing:
+            print(f"not in baseline: {key}")
+        for regression in comparison.regressions:
+            print(
+                f"REGRESSION {regression.key} {regression.metric}: "
+                f"{regression.baseline:.6g} -> {regression.current:.6g} (x{regression.ratio:.2f})"
+            )
+        return 0 if comparison.ok else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
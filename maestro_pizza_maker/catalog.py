@@ -0,0 +1,364 @@
+# class representing a data-driven catalog of pizza ingredients
+#
+# `PizzaIngredients` is a fixed enum of 16 ingredients. A catalog holds any number of ingredients column-wise
+# (one numpy array per attribute) together with a block of fat scenarios (ingredients x scenarios), so that
+# loading it and its memory footprint grow linearly with the number of ingredients.
+# Its ingredients behave like the members of `PizzaIngredients` (they have a `name` and a `value`),
+# therefore they can be used in `Pizza`, `PizzaMenu` and the optimizers.
+
+import re
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from maestro_pizza_maker.ingredients import (
+    TASTE_WEIGHTS,
+    IngredientType,
+    PizzaIngredient,
+    PizzaIngredients,
+)
+from maestro_pizza_maker.sand_box.fat_generator import fat_dtype
+
+# the types are stored as codes, i.e. positions in this list
+INGREDIENT_TYPES: List[IngredientType] = list(IngredientType)
+_TYPE_CODES: Dict[IngredientType, int] = {
+    ingredient_type: code for code, ingredient_type in enumerate(INGREDIENT_TYPES)
+}
+
+_COLUMNS = ["name", "type", "price", "protein", "carbohydrates", "calories"]
+_FAT_COLUMN = re.compile(r"^fat_(\d+)$")
+
+
+class CatalogIngredient:
+    """
+    An ingredient of an `IngredientCatalog`, it behaves like a member of `PizzaIngredients`.
+    """
+
+    __slots__ = ("catalog", "index")
+
+    def __init__(self, catalog: "IngredientCatalog", index: int) -> None:
+        self.catalog = catalog
+        self.index = index
+
+    @property
+    def name(self) -> str:
+        return str(self.catalog.names[self.index])
+
+    @property
+    def value(self) -> PizzaIngredient:
+        return self.catalog.ingredient(self.index)
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, CatalogIngredient)
+            and other.catalog is self.catalog
+            and other.index == self.index
+        )
+
+    def __hash__(self) -> int:
+        return hash((id(self.catalog), self.index))
+
+    def __repr__(self) -> str:
+        return f"<CatalogIngredient.{self.name}>"
+
+
+Ingredient = Union[PizzaIngredients, CatalogIngredient]
+
+
+@dataclass(eq=False, repr=False)
+class IngredientCatalog:
+    names: np.ndarray
+    types: np.ndarray  # codes of `INGREDIENT_TYPES`
+    price: np.ndarray
+    protein: np.ndarray
+    carbohydrates: np.ndarray
+    calories: np.ndarray
+    fat: np.ndarray  # fat scenarios, shape (ingredients, scenarios)
+    labels: Optional[np.ndarray] = None  # human readable names, the names by default
+    # the enum members, if the catalog was created from an enum, so that they are returned instead of `CatalogIngredient`
+    members: Optional[Sequence[PizzaIngredients]] = None
+    _ingredients: List[Optional[PizzaIngredient]] = field(init=False, default_factory=list)
+
+    def __post_init__(self) -> None:
+        self.names = np.asarray(self.names, dtype=object)
+        self.types = np.asarray(self.types, dtype=np.int8)
+        for attribute in ["price", "protein", "carbohydrates", "calories"]:
+            setattr(self, attribute, np.asarray(getattr(self, attribute), dtype=np.float64))
+        self.fat = np.asarray(self.fat)
+        self.labels = self.names if self.labels is None else np.asarray(self.labels, dtype=object)
+
+        n = len(self.names)
+        if self.fat.ndim != 2 or self.fat.shape[0] != n:
+            raise ValueError(
+                f"the fat scenarios must have the shape (ingredients, scenarios) = ({n}, ...), got {self.fat.shape}"
+            )
+        for attribute in ["types", "price", "protein", "carbohydrates", "calories", "labels"]:
+            if len(getattr(self, attribute)) != n:
+                raise ValueError(f"{attribute} must have {n} entries, one per ingredient")
+        if n and (self.types.min() < 0 or self.types.max() >= len(INGREDIENT_TYPES)):
+            raise ValueError("unknown ingredient type code")
+        if self.members is not None and len(self.members) != n:
+            raise ValueError(f"members must have {n} entries, one per ingredient")
+        self._ingredients = [None] * n
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return f"IngredientCatalog({len(self)} ingredients, {self.n_scenarios} scenarios)"
+
+    def __getitem__(self, index: int) -> Ingredient:
+        if self.members is not None:
+            return self.members[index]
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return CatalogIngredient(self, index % len(self))
+
+    def __iter__(self) -> Iterator[Ingredient]:
+        return (self[i] for i in range(len(self)))
+
+    @property
+    def n_scenarios(self) -> int:
+        return self.fat.shape[1]
+
+    def ingredient(self, index: int) -> PizzaIngredient:
+        # the ingredient objects are created on demand, their fat is a view into the fat scenarios
+        ingredient = self._ingredients[index]
+        if ingredient is None:
+            ingredient = PizzaIngredient(
+                name=str(self.labels[index]),
+                price=float(self.price[index]),
+                type=INGREDIENT_TYPES[self.types[index]],
+                protein=float(self.protein[index]),
+                fat=self.fat[index],
+                carbohydrates=float(self.carbohydrates[index]),
+                calories=float(self.calories[index]),
+            )
+            self._ingredients[index] = ingredient
+        return ingredient
+
+    @cached_property
+    def _index_by_name(self) -> Dict[str, int]:
+        return {str(name): i for i, name in enumerate(self.names)}
+
+    def index_of(self, ingredient: Union[Ingredient, str]) -> int:
+        if isinstance(ingredient, CatalogIngredient) and ingredient.catalog is self:
+            return ingredient.index
+        name = ingredient if isinstance(ingredient, str) else ingredient.name
+        try:
+            return self._index_by_name[name]
+        except KeyError:
+            raise KeyError(f"{name} is not in the catalog") from None
+
+    def type_indices(self, ingredient_type: IngredientType) -> np.ndarray:
+        return self._type_indices[_TYPE_CODES[ingredient_type]]
+
+    @cached_property
+    def _type_indices(self) -> List[np.ndarray]:
+        # one stable sort instead of a scan per type
+        order = np.argsort(self.types, kind="stable")
+        bounds = np.searchsorted(self.types[order], np.arange(len(INGREDIENT_TYPES) + 1))
+        return [order[bounds[code] : bounds[code + 1]] for code in range(len(INGREDIENT_TYPES))]
+
+    @cached_property
+    def fat_mean(self) -> np.ndarray:
+        return self.fat.mean(axis=1)
+
+    @cached_property
+    def taste_weights(self) -> np.ndarray:
+        weights = np.array([TASTE_WEIGHTS[ingredient_type] for ingredient_type in INGREDIENT_TYPES])
+        return weights[self.types]
+
+    @cached_property
+    def expected_taste(self) -> np.ndarray:
+        return self.taste_weights * self.fat_mean
+
+    @cached_property
+    def weighted_fat(self) -> np.ndarray:
+        # the taste of every ingredient in every scenario, in the dtype of the fat scenarios
+        return self.taste_weights.astype(self.fat.dtype)[:, None] * self.fat
+
+    def tastes(self, indptr: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """
+        Returns the (pizzas x scenarios) matrix of the tastes of the pizzas in CSR form (see `indices`),
+        indptr may be a slice of the offsets of more pizzas. The r-th ingredients of all pizzas are added at once.
+        """
+        return _pizza_rows(self.weighted_fat, indptr, indices)
+
+    def fats(self, indptr: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        # the (pizzas x scenarios) matrix of the fat of the pizzas, as `tastes`
+        return _pizza_rows(self.fat, indptr, indices)
+
+    def taste_blocks(
+        self, indptr: np.ndarray, indices: np.ndarray, block_size: int = 2**22
+    ) -> Iterator[Tuple[int, int, np.ndarray]]:
+        # the tastes of the pizzas start:stop in blocks of about block_size values
+        n_pizzas = len(indptr) - 1
+        per_pizza = max(1, int(indptr[-1] - indptr[0]) // max(n_pizzas, 1))
+        block = max(1, block_size // (self.n_scenarios * per_pizza))
+        for start in range(0, n_pizzas, block):
+            stop = min(start + block, n_pizzas)
+            yield start, stop, self.tastes(indptr[start : stop + 1], indices)
+
+    def counts(self, pizzas: Iterable) -> np.ndarray:
+        """
+        Returns the (pizzas x ingredients) matrix of how many times each ingredient is on each pizza.
+        """
+        indptr, indices = self.indices(pizzas)
+        counts = np.zeros((len(indptr) - 1, len(self)), dtype=np.int32)
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        np.add.at(counts, (rows, np.asarray(indices, dtype=np.intp)), 1)
+        return counts
+
+    def indices(self, pizzas: Iterable) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the ingredient counts in CSR form: pizza p has the ingredients indices[indptr[p]:indptr[p + 1]].
+        """
+        indptr: List[int] = [0]
+        indices: List[int] = []
+        for pizza in pizzas:
+            indices.extend(self.index_of(ingredient) for ingredient in pizza.ingredients)
+            indptr.append(len(indices))
+        return np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int32)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "name": self.labels,
+                "price": self.price,
+                "type": [INGREDIENT_TYPES[code] for code in self.types],
+                "protein": self.protein,
+                "fat": list(self.fat),
+                "carbohydrates": self.carbohydrates,
+                "calories": self.calories,
+            }
+        )
+
+    @classmethod
+    def from_enum(cls, ingredients=PizzaIngredients) -> "IngredientCatalog":
+        members = list(ingredients)
+        values = [member.value for member in members]
+        return cls(
+            names=[member.name for member in members],
+            labels=[value.name for value in values],
+            types=[_TYPE_CODES[value.type] for value in values],
+            price=[value.price for value in values],
+            protein=[value.protein for value in values],
+            carbohydrates=[value.carbohydrates for value in values],
+            calories=[value.calories for value in values],
+            fat=np.stack([value.fat for value in values]),
+            members=members,
+        )
+
+    @classmethod
+    def from_dataframe(
+        cls, df: pd.DataFrame, fat: Optional[Union[np.ndarray, str]] = None
+    ) -> "IngredientCatalog":
+        """
+        Creates a catalog from a dataframe with the columns name, type, price, protein, carbohydrates, calories
+        and optionally label. The fat scenarios are either given (as an array or a path to a .npy file)
+        or stored in the columns fat_0, fat_1, ... which are read in the dtype of `fat_dtype`.
+        """
+        missing = [column for column in _COLUMNS if column not in df.columns]
+        if missing:
+            raise ValueError(f"the ingredients are missing the columns {missing}")
+
+        if fat is None:
+            fat_columns = sorted(
+                (int(match.group(1)), column)
+                for column in df.columns
+                if (match := _FAT_COLUMN.match(str(column)))
+            )
+            if not fat_columns:
+                raise ValueError("no fat scenarios given, neither as an argument nor as fat_<i> columns")
+            fat = df[[column for _, column in fat_columns]].to_numpy(dtype=fat_dtype())
+        elif isinstance(fat, str):
+            fat = np.load(fat, mmap_mode="r")
+
+        codes = df["type"].map({value: _parse_type(value) for value in df["type"].unique()})
+        return cls(
+            names=df["name"].to_numpy(dtype=object),
+            labels=df["label"].to_numpy(dtype=object) if "label" in df.columns else None,
+            types=codes.to_numpy(dtype=np.int8),
+            price=df["price"].to_numpy(dtype=np.float64),
+            protein=df["protein"].to_numpy(dtype=np.float64),
+            carbohydrates=df["carbohydrates"].to_numpy(dtype=np.float64),
+            calories=df["calories"].to_numpy(dtype=np.float64),
+            fat=fat,
+        )
+
+    @classmethod
+    def from_csv(cls, path: str, fat: Optional[Union[np.ndarray, str]] = None, **kwargs) -> "IngredientCatalog":
+        return cls.from_dataframe(pd.read_csv(path, **kwargs), fat=fat)
+
+    @classmethod
+    def from_parquet(cls, path: str, fat: Optional[Union[np.ndarray, str]] = None, **kwargs) -> "IngredientCatalog":
+        return cls.from_dataframe(pd.read_parquet(path, **kwargs), fat=fat)
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> "IngredientCatalog":
+        # the inverse of `to_arrays`, the numeric arrays are used as they are, e.g. memory-mapped
+        return cls(
+            names=arrays["names"].astype(object),
+            labels=arrays["labels"].astype(object),
+            types=arrays["types"],
+            price=arrays["price"],
+            protein=arrays["protein"],
+            carbohydrates=arrays["carbohydrates"],
+            calories=arrays["calories"],
+            fat=arrays["fat"],
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        # the columns without python objects, so that they can be stored without pickling
+        return {
+            "names": self.names.astype(str),
+            "labels": self.labels.astype(str),
+            "types": self.types,
+            "price": self.price,
+            "protein": self.protein,
+            "carbohydrates": self.carbohydrates,
+            "calories": self.calories,
+            "fat": self.fat,
+        }
+
+    @classmethod
+    def from_npz(cls, path: str) -> "IngredientCatalog":
+        with np.load(path, allow_pickle=False) as data:
+            return cls.from_arrays(data)
+
+    def to_npz(self, path: str) -> None:
+        np.savez(path, **self.to_arrays())
+
+
+def _pizza_rows(rows: np.ndarray, indptr: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    # the sums of the rows of the ingredients of every pizza, in the order of the ingredients as `Pizza.fat`
+    first, lengths = indptr[:-1], np.diff(indptr)
+    sums = np.zeros((len(first), rows.shape[1]), dtype=rows.dtype)
+    for r in range(int(lengths.max()) if len(lengths) else 0):
+        pizzas = np.flatnonzero(lengths > r)
+        if len(pizzas) == len(lengths):
+            sums += rows[indices[first + r]]
+        else:
+            sums[pizzas] += rows[indices[first[pizzas] + r]]
+    return sums
+
+
+def _parse_type(value: Union[str, IngredientType]) -> int:
+    if isinstance(value, IngredientType):
+        return _TYPE_CODES[value]
+    try:
+        return _TYPE_CODES[IngredientType(str(value).strip().lower())]
+    except ValueError:
+        raise ValueError(f"unknown ingredient type {value!r}") from None
+
+
+@lru_cache(maxsize=None)
+def default_catalog() -> IngredientCatalog:
+    """
+    The catalog of the `PizzaIngredients` enum.
+    """
+    return IngredientCatalog.from_enum(PizzaIngredients)
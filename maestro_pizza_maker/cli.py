@@ -0,0 +1,401 @@
+# Command line entry point of the maestro pizza maker, for files of pizzas and optimization jobs of any size.
+#
+#   evaluate   reads pizzas from JSONL ({"id": ..., "ingredients": ["CLASSIC_DOUGH", "TOMATO_SAUCE", ...]}, one per
+#              line) or CSV (the columns id and ingredients, the ingredients separated by ";") and writes their price,
+#              nutrients, average fat, taste at risk and conditional taste at risk
+#   optimize   reads optimization jobs from JSONL, one per line, and writes the optimal pizzas:
+#              {"id": "cheap", "objective": "minimize_price", "lambda": 0.5, "max_seconds": 10,
+#               "values": {"protein": {"min": 20}, "price": {"max": 30}}, "ingredients": {"cheese": 1, "meat": 1}}
+#              the fat in the scenarios is bounded by "values": {"fat_chance": {"max": 40, "probability": 0.95}}
+#
+# The input is read lazily and the pizzas are evaluated in chunks (of about `PIZZA_CHUNK_VALUES` taste values, as
+# the fat quantiles of `maestro_pizza_maker.parallel`) on their ingredient indices, without creating `Pizza` objects.
+# The results are written (and flushed) chunk by chunk as JSONL or CSV, in the order of the input. With --workers
+# the chunks (or the jobs) are evaluated on a `shared_pool`, at most two per worker at a time, so the memory does
+# not depend on the size of the input. A pizza or a job that fails gets an error instead of its results and the
+# command exits with status 1.
+#
+# usage:
+#   python -m maestro_pizza_maker evaluate pizzas.jsonl --output results.csv --quantile 0.05 --workers 4
+#   python -m maestro_pizza_maker optimize jobs.jsonl --output pizzas.jsonl --catalog catalog.npz
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from maestro_pizza_maker.catalog import INGREDIENT_TYPES, IngredientCatalog, default_catalog
+from maestro_pizza_maker.ingredients import IngredientType
+from maestro_pizza_maker.parallel import PIZZA_CHUNK_VALUES
+from maestro_pizza_maker.pizza_optimizer import (
+    ChanceBounds,
+    PizzaConstraintsIngredients,
+    PizzaConstraintsValues,
+    PizzaOptimizationError,
+    ValueBounds,
+    build_pizza_model,
+    solve_objective,
+)
+from maestro_pizza_maker.profiling import count, phase
+from maestro_pizza_maker.shared import shared_pool, worker_catalog
+
+FORMATS = ["jsonl", "csv"]
+# the separator of the ingredients in a CSV cell
+INGREDIENT_SEPARATOR = ";"
+EVALUATION_COLUMNS = ["id", "price", "protein", "carbohydrates", "calories", "average_fat", "tar", "ctar", "error"]
+OPTIMIZATION_COLUMNS = [
+    "id",
+    "status",
+    "objective_value",
+    "ingredients",
+    "price",
+    "protein",
+    "carbohydrates",
+    "calories",
+    "average_fat",
+    "error",
+]
+# the field of a record that could not be read, its error
+READ_ERROR = "_read_error"
+# the chunks (or jobs) in flight per worker
+_WINDOW_PER_WORKER = 2
+
+_DOUGH, _SAUCE = INGREDIENT_TYPES.index(IngredientType.DOUGH), INGREDIENT_TYPES.index(IngredientType.SAUCE)
+
+
+@dataclass
+class PizzaChunk:
+    ids: List[str]
+    errors: List[Optional[str]]  # the pizzas with an error have no ingredients
+    indptr: np.ndarray
+    indices: np.ndarray
+
+
+def _file_format(path: str, given: Optional[str]) -> str:
+    if given is not None:
+        return given
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    return "csv" if extension == "csv" else "jsonl"
+
+
+@contextmanager
+def _open(path: str, mode: str) -> Iterator[IO[str]]:
+    # "-" is the standard input or output
+    if path == "-":
+        yield sys.stdin if "r" in mode else sys.stdout
+        return
+    with open(path, mode, newline="") as file:
+        yield file
+
+
+def read_records(file: IO[str], file_format: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the records of a JSONL or CSV file one at a time, the ingredients of a CSV record as a list.
+    A line that is no JSON object is yielded as a record with the error in the field READ_ERROR.
+    """
+    if file_format == "csv":
+        for record in csv.DictReader(file):
+            ingredients = record.get("ingredients") or ""
+            record["ingredients"] = [name.strip() for name in ingredients.split(INGREDIENT_SEPARATOR) if name.strip()]
+            yield record
+        return
+    for number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as error:
+            record = {READ_ERROR: f"line {number} is not valid JSON: {error.msg}"}
+        if not isinstance(record, dict):
+            record = {READ_ERROR: f"line {number} is not a JSON object"}
+        yield record
+
+
+def _error_message(error: Exception) -> str:
+    # the str of a KeyError is the repr of its argument, the message is the argument itself
+    if isinstance(error, KeyError) and error.args:
+        return str(error.args[0])
+    return str(error)
+
+
+def pizza_chunks(records: Iterable[Dict[str, Any]], catalog: IngredientCatalog, chunk_size: int) -> Iterator[PizzaChunk]:
+    """
+    Yields the pizzas of the records in chunks of chunk_size, as ingredient indices of the catalog in CSR form.
+    The id of a pizza is its position in the input, unless the record has one.
+    """
+    ids: List[str] = []
+    errors: List[Optional[str]] = []
+    indptr: List[int] = [0]
+    indices: List[int] = []
+    for position, record in enumerate(records):
+        ids.append(str(record.get("id", position)))
+        try:
+            if READ_ERROR in record:
+                raise ValueError(record[READ_ERROR])
+            pizza = [catalog.index_of(name) for name in record.get("ingredients", [])]
+            types = catalog.types[pizza]
+            if np.count_nonzero(types == _DOUGH) != 1 or np.count_nonzero(types == _SAUCE) != 1:
+                raise ValueError("a pizza needs exactly one dough and one sauce")
+            errors.append(None)
+            indices.extend(pizza)
+        except (KeyError, ValueError, TypeError) as error:
+            errors.append(_error_message(error))
+        indptr.append(len(indices))
+        if len(ids) == chunk_size:
+            yield PizzaChunk(ids, errors, np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int32))
+            ids, errors, indptr, indices = [], [], [0], []
+    if ids:
+        yield PizzaChunk(ids, errors, np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int32))
+
+
+def evaluate_pizzas(
+    catalog: IngredientCatalog, indptr: np.ndarray, indices: np.ndarray, quantile: float
+) -> Dict[str, np.ndarray]:
+    """
+    Returns the price, the nutrients, the average fat, the taste at risk and the conditional taste at risk of the
+    pizzas in CSR form, the measures of `Pizza` and `maestro_pizza_maker.taste_at_risk` for all pizzas at once.
+    """
+    # We focus on the left tail of the taste distribution.
+    if quantile > 0.5:
+        quantile = 1 - quantile
+    lengths = np.diff(indptr)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    results = {
+        attribute: np.bincount(rows, getattr(catalog, attribute)[indices], minlength=len(lengths))
+        for attribute in ["price", "protein", "carbohydrates", "calories"]
+    }
+    # the mean of the fat vectors of the ingredients is the mean of their mean fat
+    fat = np.bincount(rows, catalog.fat_mean[indices], minlength=len(lengths))
+    results["average_fat"] = np.divide(fat, lengths, out=np.full(len(lengths), np.nan), where=lengths > 0)
+    tastes = catalog.tastes(indptr, indices)
+    tar = np.quantile(tastes, q=quantile, axis=1)
+    tail = tastes <= tar[:, None]
+    results["tar"] = tar
+    results["ctar"] = (tastes * tail).sum(axis=1) / tail.sum(axis=1)
+    return results
+
+
+def _evaluate_in_worker(indptr: np.ndarray, indices: np.ndarray, quantile: float) -> Dict[str, np.ndarray]:
+    return evaluate_pizzas(worker_catalog(), indptr, indices, quantile)
+
+
+def _chunk_records(chunk: PizzaChunk, results: Dict[str, np.ndarray]) -> Iterator[Dict[str, Any]]:
+    for p, (pizza_id, error) in enumerate(zip(chunk.ids, chunk.errors)):
+        record: Dict[str, Any] = {"id": pizza_id}
+        for column in EVALUATION_COLUMNS[1:-1]:
+            record[column] = None if error else float(results[column][p])
+        record["error"] = error
+        yield record
+
+
+def _job_object(job: Dict[str, Any], key: str) -> Dict[str, Any]:
+    # the JSON object of the job at the key, empty if the job leaves it out
+    value = job.get(key, {})
+    if not isinstance(value, dict):
+        raise ValueError(f"{key} must be a JSON object, got {json.dumps(value)}")
+    return value
+
+
+def _job_constraints(job: Dict[str, Any]) -> Tuple[PizzaConstraintsValues, PizzaConstraintsIngredients]:
+    values = PizzaConstraintsValues(
+        **{
+            attribute: (ChanceBounds if attribute == "fat_chance" else ValueBounds)(**bounds)
+            for attribute, bounds in _job_object(job, "values").items()
+        }
+    )
+    return values, PizzaConstraintsIngredients(**_job_object(job, "ingredients"))
+
+
+def optimize_job(job: Dict[str, Any], catalog: IngredientCatalog) -> Dict[str, Any]:
+    """
+    Solves the optimization job on the catalog, returns the record of the optimal pizza or of the error.
+    """
+    record: Dict[str, Any] = dict.fromkeys(OPTIMIZATION_COLUMNS)
+    record["id"] = job.get("id")
+    try:
+        if READ_ERROR in job:
+            raise ValueError(job[READ_ERROR])
+        values, ingredients = _job_constraints(job)
+        pizza_model = build_pizza_model(values, ingredients, catalog)
+        # the solver log would be mixed with the records written to the standard output
+        pizza_model.model.verbose = 0
+        pizza = solve_objective(
+            pizza_model,
+            job.get("objective", "maximize_taste_penalty_price"),
+            lambda_param=job.get("lambda", 0.5),
+            max_seconds=job.get("max_seconds", np.inf),
+            max_nodes=job.get("max_nodes"),
+            max_gap=job.get("max_gap"),
+        )
+    except PizzaOptimizationError as error:
+        record["status"] = error.solver_stats.status if error.solver_stats is not None else None
+        record["error"] = str(error)
+        return record
+    except (KeyError, TypeError, ValueError) as error:
+        record["error"] = _error_message(error)
+        return record
+    record["status"] = pizza.solver_stats.status
+    record["objective_value"] = pizza.solver_stats.objective_value
+    record["ingredients"] = [ingredient.name for ingredient in pizza.ingredients]
+    for attribute in ["price", "protein", "carbohydrates", "calories", "average_fat"]:
+        record[attribute] = float(getattr(pizza, attribute))
+    return record
+
+
+def _optimize_in_worker(job: Dict[str, Any]) -> Dict[str, Any]:
+    return optimize_job(job, worker_catalog())
+
+
+def _ordered_map(
+    function: Callable, arguments: Iterable[Tuple], catalog: IngredientCatalog, n_workers: int
+) -> Iterator[Any]:
+    # function(*args) for every args on a pool of n_workers processes attached to the catalog, in order,
+    # the next arguments are read only when fewer than _WINDOW_PER_WORKER calls per worker are pending
+    with shared_pool(n_workers, catalog) as pool:
+        pending: deque = deque()
+        for args in arguments:
+            pending.append(pool.apply_async(function, args))
+            if len(pending) >= _WINDOW_PER_WORKER * n_workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+class RecordWriter:
+    """
+    Writes records as JSONL or as CSV with the given columns, the lists of a CSV record joined by the separator.
+    """
+
+    def __init__(self, file: IO[str], file_format: str, columns: List[str]) -> None:
+        self.file = file
+        self.format = file_format
+        self._csv = csv.DictWriter(file, fieldnames=columns) if file_format == "csv" else None
+        if self._csv is not None:
+            self._csv.writeheader()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self._csv is None:
+            self.file.write(json.dumps(record) + "\n")
+            return
+        self._csv.writerow(
+            {
+                column: INGREDIENT_SEPARATOR.join(value) if isinstance(value, list) else value
+                for column, value in record.items()
+            }
+        )
+
+    def flush(self) -> None:
+        self.file.flush()
+
+
+def load_catalog(path: Optional[str], fat: Optional[str] = None) -> IngredientCatalog:
+    """
+    Loads the catalog of a .npz, .csv or .parquet file (the fat scenarios of the last two optionally from a .npy file),
+    the catalog of `PizzaIngredients` without a path.
+    """
+    if path is None:
+        return default_catalog()
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npz":
+        return IngredientCatalog.from_npz(path)
+    if extension == ".parquet":
+        return IngredientCatalog.from_parquet(path, fat=fat)
+    return IngredientCatalog.from_csv(path, fat=fat)
+
+
+def evaluate(args: argparse.Namespace) -> int:
+    catalog = load_catalog(args.catalog, args.fat)
+    chunk_size = args.chunk_size or max(1, PIZZA_CHUNK_VALUES // max(catalog.n_scenarios, 1))
+    failed = 0
+    with _open(args.input, "r") as source, _open(args.output, "w") as target:
+        writer = RecordWriter(target, _file_format(args.output, args.output_format), EVALUATION_COLUMNS)
+        chunks = pizza_chunks(
+            read_records(source, _file_format(args.input, args.input_format)), catalog, chunk_size
+        )
+        if args.workers == 1:
+            evaluated = ((chunk, evaluate_pizzas(catalog, chunk.indptr, chunk.indices, args.quantile)) for chunk in chunks)
+        else:
+            # the chunks go to the workers and come back with their results, the metadata stays here
+            pending: deque = deque()
+
+            def arguments() -> Iterator[Tuple]:
+                for chunk in chunks:
+                    pending.append(chunk)
+                    yield chunk.indptr, chunk.indices, args.quantile
+
+            results = _ordered_map(_evaluate_in_worker, arguments(), catalog, args.workers)
+            evaluated = ((pending.popleft(), result) for result in results)
+        for chunk, results in evaluated:
+            with phase("cli.write", pizzas=len(chunk.ids)):
+                for record in _chunk_records(chunk, results):
+                    writer.write(record)
+                writer.flush()
+            count("cli.pizzas", len(chunk.ids))
+            failed += sum(error is not None for error in chunk.errors)
+    if failed:
+        print(f"{failed} pizzas could not be evaluated", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def optimize(args: argparse.Namespace) -> int:
+    catalog = load_catalog(args.catalog, args.fat)
+    failed = 0
+    with _open(args.input, "r") as source, _open(args.output, "w") as target:
+        writer = RecordWriter(target, _file_format(args.output, args.output_format), OPTIMIZATION_COLUMNS)
+        jobs = read_records(source, "jsonl")
+        if args.workers == 1:
+            records = (optimize_job(job, catalog) for job in jobs)
+        else:
+            records = _ordered_map(_optimize_in_worker, ((job,) for job in jobs), catalog, args.workers)
+        for record in records:
+            writer.write(record)
+            writer.flush()
+            failed += record["error"] is not None
+    if failed:
+        print(f"{failed} jobs failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _positive(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be positive")
+    return number
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m maestro_pizza_maker",
+        description="Evaluates files of pizzas and runs optimization jobs.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("input", help='the input file, "-" for the standard input')
+    common.add_argument("--output", default="-", help='the output file, "-" (the default) for the standard output')
+    common.add_argument("--output-format", choices=FORMATS, help="by the extension of the output file by default")
+    common.add_argument("--catalog", help="a .npz, .csv or .parquet catalog, PizzaIngredients by default")
+    common.add_argument("--fat", help="the .npy fat scenarios of a .csv or .parquet catalog")
+    common.add_argument("--workers", type=_positive, default=1, help="the number of worker processes")
+
+    evaluate_parser = commands.add_parser("evaluate", parents=[common], help="evaluate the pizzas of a file")
+    evaluate_parser.add_argument("--input-format", choices=FORMATS, help="by the extension of the input file by default")
+    evaluate_parser.add_argument("--quantile", type=float, default=0.05)
+    evaluate_parser.add_argument("--chunk-size", type=_positive, help="the pizzas evaluated at once")
+    evaluate_parser.set_defaults(run=evaluate)
+
+    optimize_parser = commands.add_parser("optimize", parents=[common], help="run the optimization jobs of a file")
+    optimize_parser.set_defaults(run=optimize)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    return args.run(args)
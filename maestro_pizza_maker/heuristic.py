@@ -0,0 +1,230 @@
+# For catalogs of thousands of ingredients CBC takes too long for interactive use, the maestro pizza maker then
+# looks for a good pizza heuristically, under the same value and ingredient count constraints:
+#
+#   - greedy construction: the ingredients with the best objective coefficients of every type
+#   - simulated annealing on swaps: an ingredient of the pizza is replaced by another one of the same type, so the
+#     ingredient counts always hold. The value constraints are a penalty (of the violations relative to the
+#     largest coefficient of the value), that grows while the pizza violates them. All replacements of the
+#     ingredient are evaluated at once and the best one is made if it improves the pizza, or with the annealing
+#     probability if it does not
+#   - the search stops at the time budget, after max_iterations or after patience swaps without a better pizza
+#   - the best pizza satisfying the constraints is compared with the bound of the LP relaxation of the model,
+#     whose relative gap is reported as the gap of the MIP solver (OPTIMAL within the default gap of CBC)
+#
+# The pizza can also be the warm start of the MIP solver, see `solve_objective(..., solver="warm_start")`.
+#
+# usage:
+#   minimize_price(values, ingredients, catalog, solver="heuristic", max_seconds=0.5)
+#   heuristic_selection(pizza_model, "maximize_taste_penalty_price", lambda_param=0.5, options=HeuristicOptions(seed=1))
+
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+from mip import MINIMIZE, OptimizationStatus
+
+from maestro_pizza_maker.pizza import PIZZA_SLOTS
+from maestro_pizza_maker.pizza_optimizer import (
+    _DEFAULT_GAP,
+    VALUES,
+    InfeasiblePizzaError,
+    PizzaModel,
+    PizzaOptimizationError,
+    _optimize_relaxation,
+    set_objective,
+    value_matrix,
+)
+from maestro_pizza_maker.profiling import SolverStats, count, phase, record_phase, record_solver_stats
+
+# violations up to this (relative to the largest coefficient of the value) are rounding
+_FEASIBILITY_TOLERANCE = 1e-9
+# the time is checked every this many swaps
+_CLOCK_INTERVAL = 64
+
+
+@dataclass
+class HeuristicOptions:
+    max_seconds: float = 1.0
+    max_iterations: int = 100_000
+    patience: int = 2_000  # swaps without a better pizza
+    seed: int = 0
+    initial_temperature: float = 0.1  # relative to the mean absolute objective coefficient
+    cooling: float = 0.999
+    penalty_growth: float = 2.0  # of the penalty, after patience // 10 swaps violating the constraints
+
+
+@dataclass
+class HeuristicResult:
+    selected: Optional[np.ndarray]  # the ingredient indices of the best pizza, None if no pizza satisfies the constraints
+    objective_value: Optional[float]
+    iterations: int
+
+
+def _problem(pizza_model: PizzaModel) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Tuple[np.ndarray, int]]]:
+    # the value matrix with the model prices, its bounds and the ingredients and counts of every type
+    catalog = pizza_model.catalog
+    values = value_matrix(catalog)
+    values[VALUES.index("price")] = pizza_model.prices
+    bounds = [getattr(pizza_model.constraints_values, value) for value in VALUES]
+    bounds[VALUES.index("price")] = pizza_model.price_bounds
+    low = np.array([bound.min for bound in bounds], dtype=np.float64)
+    high = np.array([bound.max for bound in bounds], dtype=np.float64)
+    groups = []
+    for ingredient_type, attribute in PIZZA_SLOTS.items():
+        n_selected = getattr(pizza_model.constraints_ingredients, attribute)
+        indices = catalog.type_indices(ingredient_type)
+        if n_selected > len(indices):
+            raise InfeasiblePizzaError(
+                f"The model is infeasible -> the catalog has fewer than {n_selected} ingredients of type {ingredient_type.value}"
+            )
+        if n_selected > 0:
+            groups.append((indices, n_selected))
+    return values, low, high, groups
+
+
+def anneal(
+    costs: np.ndarray,
+    values: np.ndarray,
+    low: np.ndarray,
+    high: np.ndarray,
+    groups: List[Tuple[np.ndarray, int]],
+    options: HeuristicOptions,
+) -> HeuristicResult:
+    """
+    Minimizes costs @ x over the binary x with sum(x[indices]) == n for every (indices, n) of the groups
+    and low <= values @ x <= high, by greedy construction and simulated annealing on swaps within the groups.
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(options.seed)
+    # only the values with a bound, that can be violated, are evaluated
+    active = (high < np.inf) | (low > np.where(values < 0, values, 0).sum(axis=1))
+    values, low, high = values[active], low[active], high[active]
+    scale = np.abs(values).max(axis=1, initial=0.0)
+    scale[scale == 0] = 1.0
+
+    def violation(totals: np.ndarray) -> np.ndarray:
+        # the relative violations of the value constraints, of the columns of totals
+        excess = np.maximum(low[:, None] - totals, 0) + np.maximum(totals - high[:, None], 0)
+        return (excess / scale[:, None]).sum(axis=0)
+
+    # the ingredients of the pizza, the greedy pizza at first
+    chosen = np.zeros(len(costs), dtype=bool)
+    for indices, n_selected in groups:
+        chosen[indices[np.argsort(costs[indices], kind="stable")[:n_selected]]] = True
+    if not groups:
+        return HeuristicResult(np.flatnonzero(chosen), 0.0, 0)
+    totals = values[:, chosen].sum(axis=1)
+    cost = costs[chosen].sum()
+    current_violation = violation(totals[:, None])[0]
+    # the values and costs of the ingredients of every group, contiguous for the evaluation of the swaps
+    blocks = [(indices, np.ascontiguousarray(values[:, indices]), costs[indices]) for indices, _ in groups]
+
+    spread = costs.max() - costs.min()
+    penalty = spread * sum(n_selected for _, n_selected in groups) + 1.0
+    temperature = options.initial_temperature * max(np.abs(costs).mean(), 1e-12)
+    # the groups are picked in proportion to their ingredient counts, every ingredient of the pizza equally often
+    weights = np.array([n_selected for _, n_selected in groups], dtype=np.float64)
+    weights /= weights.sum()
+
+    best, best_cost = None, np.inf
+    if current_violation <= _FEASIBILITY_TOLERANCE:
+        best, best_cost = chosen.copy(), cost
+    since_best = infeasible_for = 0
+    iteration = 0
+    for iteration in range(1, options.max_iterations + 1):
+        if iteration % _CLOCK_INTERVAL == 0 and time.perf_counter() - start > options.max_seconds:
+            break
+        indices, block_values, block_costs = blocks[rng.choice(len(blocks), p=weights)]
+        on_pizza = np.flatnonzero(chosen[indices])
+        if len(on_pizza) == len(indices):
+            continue
+        removed = on_pizza[rng.integers(len(on_pizza))]
+        # every replacement of the removed ingredient at once, the ingredients on the pizza are no replacement
+        replaced = block_values + (totals - block_values[:, removed])[:, None]
+        violations = violation(replaced)
+        deltas = block_costs - block_costs[removed] + penalty * (violations - current_violation)
+        deltas[on_pizza] = np.inf
+        k = int(np.argmin(deltas))
+        if deltas[k] < 0 or rng.random() < np.exp(-deltas[k] / max(temperature, 1e-300)):
+            chosen[indices[removed]], chosen[indices[k]] = False, True
+            totals = replaced[:, k]
+            cost += block_costs[k] - block_costs[removed]
+            current_violation = violations[k]
+        temperature *= options.cooling
+
+        since_best += 1
+        if current_violation <= _FEASIBILITY_TOLERANCE:
+            infeasible_for = 0
+            if cost < best_cost - 1e-12:
+                best, best_cost, since_best = chosen.copy(), cost, 0
+        else:
+            infeasible_for += 1
+            if infeasible_for >= max(options.patience // 10, 1):
+                penalty *= options.penalty_growth
+                infeasible_for = 0
+        if since_best >= options.patience:
+            break
+    count("heuristic.iterations", iteration)
+    if best is None:
+        return HeuristicResult(None, None, iteration)
+    # the cost of the best pizza summed again, without the rounding of the updates
+    selected = np.flatnonzero(best)
+    return HeuristicResult(selected, float(costs[selected].sum()), iteration)
+
+
+def _lp_bound(pizza_model: PizzaModel) -> float:
+    # the objective value of the LP relaxation of the model, with the objective set
+    status = _optimize_relaxation(pizza_model.model)
+    if status in (OptimizationStatus.INFEASIBLE, OptimizationStatus.INT_INFEASIBLE):
+        raise InfeasiblePizzaError("The model is infeasible -> no pizza satisfies the constraints")
+    if status != OptimizationStatus.OPTIMAL:
+        raise PizzaOptimizationError(f"The LP relaxation stopped with the status {status.name}")
+    return pizza_model.model.objective_value
+
+
+def heuristic_selection(
+    pizza_model: PizzaModel,
+    objective: str,
+    lambda_param: float = 0.5,
+    options: Optional[HeuristicOptions] = None,
+) -> Tuple[np.ndarray, SolverStats]:
+    """
+    Returns the ingredient indices of the heuristic pizza and its solver stats, the objective value,
+    the LP bound and their gap. Raises InfeasiblePizzaError if the LP relaxation is infeasible
+    and PizzaOptimizationError if no pizza satisfying the constraints was found.
+    """
+    options = HeuristicOptions() if options is None else options
+    build_seconds = time.perf_counter() - pizza_model.build_start
+    record_phase("optimizer.build", build_seconds, objective=objective)
+    costs = set_objective(pizza_model, objective, lambda_param)
+    # the costs of a maximization are the negated coefficients
+    sign = 1.0 if pizza_model.model.sense == MINIMIZE else -1.0
+    with phase("optimizer.heuristic", objective=objective):
+        solve_start = time.perf_counter()
+        values, low, high, groups = _problem(pizza_model)
+        result = anneal(costs, values, low, high, groups, options)
+        bound = _lp_bound(pizza_model)
+        solve_seconds = time.perf_counter() - solve_start
+    pizza_model.build_start = time.perf_counter()
+
+    stats = SolverStats(
+        status="NO_SOLUTION_FOUND",
+        build_seconds=build_seconds,
+        solve_seconds=solve_seconds,
+        nodes=None,
+        objective_bound=bound,
+        num_vars=pizza_model.model.num_cols,
+        num_constraints=pizza_model.model.num_rows,
+    )
+    if result.selected is None:
+        record_solver_stats(objective, stats)
+        raise PizzaOptimizationError(
+            f"No pizza found -> the heuristic found no pizza satisfying the constraints in {result.iterations} swaps",
+            stats,
+        )
+    stats.objective_value = sign * result.objective_value
+    stats.gap = abs(stats.objective_value - bound) / max(abs(stats.objective_value), 1e-12)
+    stats.status = "OPTIMAL" if stats.gap <= _DEFAULT_GAP else "FEASIBLE"
+    record_solver_stats(objective, stats)
+    return result.selected, stats
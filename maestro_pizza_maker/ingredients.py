@@ -3,7 +3,6 @@
 from dataclasses import dataclass
 from enum import Enum
 from typing import Dict, Literal, Union
-import pandas as pd
 from maestro_pizza_maker.sand_box.fat_generator import FAT_SIMULATIONS
 
 # from numpy.random import normal, exponential, gamma, uniform
@@ -19,6 +18,17 @@ class IngredientType(Enum):
     FRUIT = "fruit"
 
 
+# weight of the fat of every ingredient type in the taste of a pizza, see `Pizza.taste`
+TASTE_WEIGHTS: Dict[IngredientType, float] = {
+    IngredientType.DOUGH: 0.05,
+    IngredientType.SAUCE: 0.2,
+    IngredientType.CHEESE: 0.3,
+    IngredientType.FRUIT: 0.1,
+    IngredientType.MEAT: 0.3,
+    IngredientType.VEGETABLE: 0.05,
+}
+
+
 @dataclass
 class PizzaIngredient:
     name: str
@@ -181,18 +191,17 @@ class PizzaIngredients(Enum):
 
     # create a dataframes with all ingredients
     @staticmethod
-    def get_ingredients_df():
-        ingredients = []
-        for ingredient in PizzaIngredients:
-            ingredients.append(
-                {
-                    "name": ingredient.value.name,
-                    "price ": ingredient.value.price,
-                    "type": ingredient.value.type,
-                    "protein ": ingredient.value.protein,
-                    "fat ": ingredient.value.fat,
-                    "carbohydrates ": ingredient.value.carbohydrates,
-                    "calories ": ingredient.value.calories,
-                }
-            )
-        return pd.DataFrame(ingredients)
+    def get_ingredients_df(catalog=None):
+        # the ingredients of any `IngredientCatalog` can be listed, by default the ones of this enum
+        from maestro_pizza_maker.catalog import default_catalog
+
+        catalog = default_catalog() if catalog is None else catalog
+        return catalog.to_dataframe().rename(
+            columns={
+                "price": "price ",
+                "protein": "protein ",
+                "fat": "fat ",
+                "carbohydrates": "carbohydrates ",
+                "calories": "calories ",
+            }
+        )
@@ -0,0 +1,577 @@
+# The maestro pizza maker does not create pizzas one by one, he creates whole menus.
+# Calling `maximize_taste_penalty_price` for every slot of the menu ignores the goals of the menu as a whole,
+# therefore the pizzas of a menu are chosen jointly in one model over (pizza x ingredient) variables:
+#
+#   maximize   sum_p sum_i y_pi * (E(taste_i) - lambda * price_i) + diversity_weight * sum_i u_i
+#
+#   subject to the constraints of `PizzaConstraintsValues` and `PizzaConstraintsIngredients` for every pizza p,
+#              sum_p sum_i y_pi * price_i <= budget                              (total cost of the menu)
+#              u_i <= sum_p y_pi                                                (ingredient i is used on the menu)
+#              menu_taste_s + M_s * z_s >= min_menu_tar, sum_s z_s <= floor(q * (S - 1))   (TaR of the menu)
+#              (added lazily, only for the scenarios in which a solution falls below min_menu_tar)
+#              fat_ps <= max + M_ps * w_ps, sum_s w_ps <= floor((1 - p) * S)     (fat chance of every pizza p)
+#              (added lazily as well, see `add_fat_chance_constraints`)
+#              s_p >= s_p+1, s_p = sum_i c_i * y_pi                             (symmetry breaking)
+#              no two consecutive pizzas share all ingredients                   (no duplicates)
+#
+# Sorting the pizzas by the signature s_p with generic weights c_i breaks the symmetry between the slots
+# and puts equal pizzas next to each other, so that duplicates only need to be excluded between neighbours.
+#
+# The joint model grows with the number of pizzas times the size of the catalog, large menus are solved
+# by column generation instead: a master problem chooses n_pizzas among known recipes (columns) and the single
+# pizza model prices new recipes with the duals of the master. The columns start from a greedy decomposition,
+# one pizza after another, and the master solution is the warm start of the joint model.
+
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from mip import (
+    BINARY,
+    CONTINUOUS,
+    INTEGER,
+    Constr,
+    LinExpr,
+    Model,
+    OptimizationStatus,
+    Var,
+    maximize,
+    xsum,
+)
+
+from maestro_pizza_maker.catalog import IngredientCatalog, default_catalog
+from maestro_pizza_maker.pizza import PIZZA_SLOTS, Pizza
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.pizza_optimizer import (
+    PizzaConstraintsIngredients,
+    PizzaConstraintsValues,
+    PizzaModel,
+    PizzaOptimizationError,
+    ScenarioConstraints,
+    _optimize,
+    _optimize_relaxation,
+    add_fat_chance_constraints,
+    add_pizza_constraints,
+    build_pizza_model,
+)
+from maestro_pizza_maker.profiling import phase
+
+Recipe = Tuple[int, ...]  # sorted indices of the ingredients of a pizza in the catalog
+
+_HAS_SOLUTION = (OptimizationStatus.OPTIMAL, OptimizationStatus.FEASIBLE)
+
+
+@dataclass
+class MenuConstraints:
+    budget: Optional[float] = None  # maximal total price of the menu
+    min_menu_tar: Optional[float] = None  # minimal taste at risk of the whole menu
+    tar_quantile: float = 0.05
+    allow_duplicates: bool = False
+    diversity_weight: float = 0.0  # reward for every distinct ingredient used on the menu
+
+
+def _signature_weights(n_ingredients: int) -> np.ndarray:
+    # generic weights, two different pizzas have the same signature with probability zero
+    return np.random.default_rng(20230401).uniform(1.0, 2.0, size=n_ingredients)
+
+
+def _menu_tar_quantile(quantile: float) -> float:
+    # the left tail of the taste distribution, as in `maestro_pizza_maker.taste_at_risk`
+    return 1 - quantile if quantile > 0.5 else quantile
+
+
+def _ingredient_taste(catalog: IngredientCatalog) -> np.ndarray:
+    # (ingredients x scenarios), the menu taste in scenario s depends only on how many times
+    # each ingredient is on the menu
+    return catalog.taste_weights[:, None] * catalog.fat
+
+
+def _lowest_pizza_taste(
+    catalog: IngredientCatalog, constraints_ingredients: PizzaConstraintsIngredients, taste: np.ndarray
+) -> np.ndarray:
+    # the lowest taste of any pizza in every scenario, it tightens the big M of the scenario constraints
+    lowest = np.zeros(taste.shape[1])
+    for ingredient_type, slot in PIZZA_SLOTS.items():
+        count = getattr(constraints_ingredients, slot)
+        if count:
+            lowest += np.sort(taste[catalog.type_indices(ingredient_type)], axis=0)[:count].sum(axis=0)
+    return lowest
+
+
+def _pizza_size(constraints_ingredients: PizzaConstraintsIngredients) -> int:
+    return sum(getattr(constraints_ingredients, slot) for slot in PIZZA_SLOTS.values())
+
+
+def _recipe_counts(recipes: Sequence[Recipe], n_ingredients: int) -> np.ndarray:
+    # how many times each ingredient is on the menu
+    counts = np.zeros(n_ingredients)
+    for recipe in recipes:
+        counts[list(recipe)] += 1
+    return counts
+
+
+class _MenuTarScenarios(ScenarioConstraints):
+    # the scenario constraints of the taste at risk of the menu, the menu taste is above min_menu_tar
+    # in all but the allowed scenarios
+
+    def __init__(
+        self,
+        model: Model,
+        variables: List[Var],
+        taste: np.ndarray,
+        lower: np.ndarray,
+        constraints: MenuConstraints,
+        slack: Optional[Var] = None,
+    ) -> None:
+        # taste[k, s] is the taste of variables[k] in scenario s, lower[s] a lower bound of the menu taste in s
+        allowed = _allowed_scenarios(constraints, taste.shape[1])
+        super().__init__(model, variables, taste, lower, constraints.min_menu_tar, allowed, slack)
+        self.taste = taste
+
+
+def _allowed_scenarios(constraints: MenuConstraints, n_scenarios: int) -> int:
+    # np.quantile interpolates between the order statistics floor(h) and ceil(h), h = q * (S - 1),
+    # both are above the bound if at most floor(h) scenarios are below it
+    return int(np.floor(_menu_tar_quantile(constraints.tar_quantile) * (n_scenarios - 1)))
+
+
+def _lowest_scenarios(menu_taste: np.ndarray, constraints: MenuConstraints) -> np.ndarray:
+    # the scenarios with the lowest taste of the menu, a good first guess of the binding ones
+    size = min(2 * (_allowed_scenarios(constraints, len(menu_taste)) + 1), len(menu_taste))
+    return np.argsort(menu_taste, kind="stable")[:size]
+
+
+def _violated_scenarios(menu_taste: np.ndarray, constraints: MenuConstraints) -> np.ndarray:
+    below = np.flatnonzero(menu_taste < constraints.min_menu_tar - 1e-6)
+    return below if len(below) > _allowed_scenarios(constraints, len(menu_taste)) else below[:0]
+
+
+def _exclude_equal(model: Model, first: List[Var], second: List[Var], size: int) -> None:
+    # two pizzas with size ingredients each are different, if they share at most size - 1 ingredients
+    shared = [model.add_var(var_type=CONTINUOUS, lb=0, ub=1) for _ in first]
+    for i in range(len(first)):
+        model += shared[i] >= first[i] + second[i] - 1
+    model += xsum(shared) <= size - 1
+
+
+def _pizzas(recipes: Sequence[Recipe], catalog: IngredientCatalog, **kwargs) -> List[Pizza]:
+    return [Pizza.from_ingredients([catalog[i] for i in recipe], **kwargs) for recipe in recipes]
+
+
+def _solve_joint(
+    n_pizzas: int,
+    constraints_values: PizzaConstraintsValues,
+    constraints_ingredients: PizzaConstraintsIngredients,
+    constraints: MenuConstraints,
+    lambda_param: float,
+    catalog: IngredientCatalog,
+    max_seconds: float,
+    start: Optional[List[Recipe]] = None,
+) -> Optional[List[Pizza]]:
+    build_start = time.perf_counter()
+    deadline = build_start + max_seconds
+    n = len(catalog)
+    model = Model()
+    model.verbose = 0
+
+    y = [[model.add_var(var_type=BINARY) for _ in range(n)] for _ in range(n_pizzas)]
+    fat_scenarios = []
+    for p in range(n_pizzas):
+        add_pizza_constraints(model, y[p], catalog, constraints_values, constraints_ingredients)
+        fat_scenarios.append(add_fat_chance_constraints(model, y[p], catalog, constraints_values, constraints_ingredients))
+
+    # how many times each ingredient is on the menu
+    counts = [model.add_var(var_type=INTEGER, lb=0, ub=n_pizzas) for _ in range(n)]
+    for i in range(n):
+        model += LinExpr([y[p][i] for p in range(n_pizzas)] + [counts[i]], [1.0] * n_pizzas + [-1.0]) == 0
+
+    if constraints.budget is not None:
+        model += LinExpr(counts, catalog.price.tolist()) <= constraints.budget
+    scenarios = None
+    if constraints.min_menu_tar is not None:
+        taste = _ingredient_taste(catalog)
+        lower = n_pizzas * _lowest_pizza_taste(catalog, constraints_ingredients, taste)
+        scenarios = _MenuTarScenarios(model, counts, taste, lower, constraints)
+
+    # symmetry breaking, the pizzas are sorted by their signatures
+    weights = _signature_weights(n)
+    signatures = [LinExpr(y[p], weights.tolist()) for p in range(n_pizzas)]
+    for p in range(n_pizzas - 1):
+        model += signatures[p] - signatures[p + 1] >= 0
+
+    # after sorting, equal pizzas are neighbours: they must not share all their ingredients
+    size = _pizza_size(constraints_ingredients)
+    if not constraints.allow_duplicates:
+        for p in range(n_pizzas - 1):
+            _exclude_equal(model, y[p], y[p + 1], size)
+
+    objective = LinExpr(counts, (catalog.expected_taste - lambda_param * catalog.price).tolist())
+    if constraints.diversity_weight:
+        used = [model.add_var(var_type=CONTINUOUS, lb=0, ub=1) for _ in range(n)]
+        for i in range(n):
+            model += used[i] <= counts[i]
+        objective.add_expr(xsum(used), constraints.diversity_weight)
+    model.objective = maximize(objective)
+
+    if start is not None:
+        # a known menu, e.g. from the column generation, sorted like the slots
+        start = sorted(start, key=lambda recipe: -weights[list(recipe)].sum())
+        start_counts = _recipe_counts(start, n)
+        model.start = [(y[p][i], 1.0) for p, recipe in enumerate(start) for i in recipe] + [
+            (counts[i], float(start_counts[i])) for i in range(n)
+        ]
+    if scenarios is not None:
+        menu_counts = _recipe_counts(start, n) if start is not None else np.ones(n)
+        scenarios.add(_lowest_scenarios(menu_counts @ scenarios.taste, constraints))
+    if start is not None:
+        # the fattest scenarios of the start pizzas are a good first guess of the binding ones
+        for recipe, pizza_scenarios in zip(start, fat_scenarios):
+            if pizza_scenarios is not None:
+                pizza_scenarios.add_worst(_recipe_counts([recipe], n))
+
+    while True:
+        model.max_seconds = max(deadline - time.perf_counter(), 0.0)
+        stats = _optimize(model, "optimize_menu.joint", build_start)
+        if model.status not in _HAS_SOLUTION:
+            return None
+        selected = [tuple(i for i in range(n) if y[p][i].x >= 0.99) for p in range(n_pizzas)]
+        build_start = time.perf_counter()
+
+        # signatures closer than the solver tolerance may separate equal pizzas, they are excluded explicitly
+        duplicates = []
+        if not constraints.allow_duplicates:
+            duplicates = [
+                (p, q) for p in range(n_pizzas) for q in range(p + 2, n_pizzas) if selected[p] == selected[q]
+            ]
+        for p, q in duplicates:
+            _exclude_equal(model, y[p], y[q], size)
+
+        violated = []
+        if scenarios is not None:
+            violated = _violated_scenarios(_recipe_counts(selected, n) @ scenarios.taste, constraints)
+            scenarios.add(violated)
+        # the fat scenarios of every pizza, as the ones of the single pizza model
+        fat_violated = sum(
+            pizza_scenarios.separate(_recipe_counts([recipe], n))
+            for recipe, pizza_scenarios in zip(selected, fat_scenarios)
+            if pizza_scenarios is not None
+        )
+
+        if not len(duplicates) and not len(violated) and not fat_violated:
+            return _pizzas(selected, catalog, solver_stats=stats)
+        if time.perf_counter() >= deadline:
+            return None
+
+
+class _Columns:
+    # The known recipes and the single pizza model pricing new ones. Unless duplicates are allowed,
+    # the known recipes are cut off from the pricing model, so that it always returns a new recipe.
+
+    def __init__(self, pricing: PizzaModel, constraints: MenuConstraints) -> None:
+        self.pricing = pricing
+        self.allow_duplicates = constraints.allow_duplicates
+        self.recipes: List[Recipe] = []
+        self.index: Dict[Recipe, int] = {}
+
+    def __contains__(self, recipe: Recipe) -> bool:
+        return recipe in self.index
+
+    def add(self, recipe: Recipe) -> None:
+        if recipe in self.index:
+            return
+        self.index[recipe] = len(self.recipes)
+        self.recipes.append(recipe)
+        if not self.allow_duplicates:
+            self.pricing.model += xsum(self.pricing.x[i] for i in recipe) <= len(recipe) - 1
+
+    def price(self, coefficients: np.ndarray, max_seconds: float) -> Optional[Recipe]:
+        # the recipe maximizing the coefficients, None if the pricing model has no solution in time
+        model = self.pricing.model
+        model.objective = maximize(LinExpr(self.pricing.x, coefficients.tolist()))
+        deadline = time.perf_counter() + max(max_seconds, 0.0)
+        while True:
+            model.max_seconds = max(deadline - time.perf_counter(), 0.0)
+            _optimize(model, "optimize_menu.pricing", self.pricing.build_start)
+            self.pricing.build_start = time.perf_counter()
+            if model.status not in _HAS_SOLUTION:
+                return None
+            # a recipe violating the fat chance constraints is priced again with the violated scenarios
+            if not self.pricing.separate():
+                return tuple(int(i) for i in self.pricing.selected())
+            if time.perf_counter() >= deadline:
+                return None
+
+
+def _greedy_recipes(
+    columns: _Columns,
+    n_pizzas: int,
+    constraints_ingredients: PizzaConstraintsIngredients,
+    constraints: MenuConstraints,
+    values: np.ndarray,
+    catalog: IngredientCatalog,
+    max_seconds: float,
+) -> List[Recipe]:
+    # one pizza after another, the chosen pizzas are excluded and their cost is taken from the budget,
+    # stops at the first pizza without a solution
+    model, x = columns.pricing.model, columns.pricing.x
+    used = np.zeros(len(catalog), dtype=bool)
+    spent = 0.0
+    budget_constraint = None
+    recipes: List[Recipe] = []
+    # lower bound of the price of a pizza, kept in the budget for every pizza still to come
+    cheapest = sum(
+        np.sort(catalog.price[catalog.type_indices(ingredient_type)])[: getattr(constraints_ingredients, slot)].sum()
+        for ingredient_type, slot in PIZZA_SLOTS.items()
+    )
+    for p in range(n_pizzas):
+        if constraints.budget is not None:
+            if budget_constraint is not None:
+                model.remove(budget_constraint)
+            remaining = constraints.budget - spent - (n_pizzas - p - 1) * cheapest
+            budget_constraint = model.add_constr(LinExpr(x, catalog.price.tolist()) <= remaining)
+        # the diversity reward goes to the ingredients that are not on the menu yet
+        recipe = columns.price(values + constraints.diversity_weight * ~used, max_seconds / n_pizzas)
+        if recipe is None:
+            break
+        columns.add(recipe)
+        recipes.append(recipe)
+        used[list(recipe)] = True
+        spent += catalog.price[list(recipe)].sum()
+    if budget_constraint is not None:
+        model.remove(budget_constraint)
+    return recipes
+
+
+@dataclass
+class _MasterProblem:
+    model: Model
+    choose: List[Var]  # how many times each known recipe is on the menu
+    slacks: List[Var]  # elastic constraints, positive only if the known recipes do not allow a feasible menu
+    n_pizzas: Constr
+    budget: Optional[Constr]
+    used: List[Constr]
+    scenarios: Optional[_MenuTarScenarios]
+    price: np.ndarray
+
+    def duals(self, values: np.ndarray, taste: Optional[np.ndarray]) -> Tuple[np.ndarray, float]:
+        # the reduced cost of a recipe is the sum of the returned ingredient coefficients minus the constant
+        coefficients = values.copy()
+        if self.budget is not None:
+            coefficients -= self.budget.pi * self.price
+        coefficients += np.array([constr.pi for constr in self.used])
+        if self.scenarios is not None:
+            for s, constr in self.scenarios.constrs.items():
+                coefficients -= constr.pi * taste[:, s]
+        return coefficients, self.n_pizzas.pi
+
+
+def _build_master(
+    columns: _Columns,
+    n_pizzas: int,
+    constraints: MenuConstraints,
+    values: np.ndarray,
+    catalog: IngredientCatalog,
+    taste: Optional[np.ndarray],
+    lowest: Optional[np.ndarray],
+    scenarios: Sequence[int],
+    enforce: Optional[Set[int]] = None,
+) -> _MasterProblem:
+    n = len(catalog)
+    recipes = columns.recipes
+    model = Model()
+    model.verbose = 0
+    upper = n_pizzas if constraints.allow_duplicates else 1
+    choose = [model.add_var(var_type=INTEGER, lb=0, ub=upper) for _ in recipes]
+    slacks = [model.add_var(var_type=CONTINUOUS, lb=0) for _ in range(3)]
+
+    n_pizzas_constr = model.add_constr(LinExpr(choose + slacks[:1], [1.0] * (len(recipes) + 1)) == n_pizzas)
+    budget = None
+    if constraints.budget is not None:
+        prices = [float(catalog.price[list(recipe)].sum()) for recipe in recipes]
+        budget = model.add_constr(LinExpr(choose + slacks[1:2], prices + [-1.0]) <= constraints.budget)
+
+    # u_i <= sum of the recipes containing ingredient i
+    containing: List[List[Var]] = [[] for _ in range(n)]
+    for k, recipe in enumerate(recipes):
+        for i in recipe:
+            containing[i].append(choose[k])
+    used = [model.add_var(var_type=CONTINUOUS, lb=0, ub=1) for _ in range(n)]
+    used_constrs = [
+        model.add_constr(LinExpr([used[i]] + containing[i], [1.0] + [-1.0] * len(containing[i])) <= 0)
+        for i in range(n)
+    ]
+
+    tar = None
+    if taste is not None:
+        recipe_taste = np.vstack([taste[list(recipe)].sum(axis=0) for recipe in recipes])
+        # a missing pizza counts as the pizza with the lowest taste, the menu taste stays above n_pizzas * lowest
+        tar = _MenuTarScenarios(
+            model, choose + slacks[:1], np.vstack([recipe_taste, lowest]), n_pizzas * lowest, constraints, slack=slacks[2]
+        )
+        tar.add(scenarios)
+
+    # the slacks are penalized above any possible gain of the objective
+    penalty = 1e3 * (1.0 + n_pizzas * np.abs(values).max() * max(map(len, recipes)) + constraints.diversity_weight * n)
+    objective = LinExpr(choose, [float(values[list(recipe)].sum()) for recipe in recipes])
+    objective.add_expr(xsum(used), constraints.diversity_weight)
+    objective.add_expr(xsum(slacks), -penalty)
+    if enforce is not None:
+        # the linear relaxation of the scenario constraints is weak, the fractional z absorb any shortfall,
+        # to price recipes lifting the menu taste the enforced scenarios are penalized and the others dropped
+        for s, z in tar.z.items():
+            if s in enforce:
+                z.var_type = CONTINUOUS
+                objective.add_var(z, -penalty)
+            else:
+                z.lb = 1.0
+    model.objective = maximize(objective)
+
+    return _MasterProblem(model, choose, slacks, n_pizzas_constr, budget, used_constrs, tar, catalog.price)
+
+
+def _solve_column_generation(
+    n_pizzas: int,
+    constraints_values: PizzaConstraintsValues,
+    constraints_ingredients: PizzaConstraintsIngredients,
+    constraints: MenuConstraints,
+    lambda_param: float,
+    catalog: IngredientCatalog,
+    max_seconds: float,
+) -> Optional[List[Recipe]]:
+    build_start = time.perf_counter()
+    deadline = build_start + max_seconds
+    pricing = build_pizza_model(constraints_values, constraints_ingredients, catalog)
+    pricing.model.verbose = 0
+    columns = _Columns(pricing, constraints)
+    values = catalog.expected_taste - lambda_param * catalog.price
+
+    start = _greedy_recipes(
+        columns, n_pizzas, constraints_ingredients, constraints, values, catalog, max_seconds / 4
+    )
+    if not columns.recipes:
+        return None
+    taste = lowest = None
+    if constraints.min_menu_tar is not None:
+        taste = _ingredient_taste(catalog)
+        lowest = _lowest_pizza_taste(catalog, constraints_ingredients, taste)
+    scenarios: Set[int] = set()
+    if taste is not None:
+        scenarios.update(_lowest_scenarios(_recipe_counts(start, len(catalog)) @ taste, constraints).tolist())
+
+    enforce = None
+    coefficients = values
+    while True:
+        known = (len(columns.recipes), len(scenarios), enforce)
+        # new recipes are priced with the duals of the linear relaxation, for at most half of the remaining time
+        pricing_deadline = time.perf_counter() + (deadline - time.perf_counter()) / 2
+        while time.perf_counter() < pricing_deadline:
+            master = _build_master(
+                columns, n_pizzas, constraints, values, catalog, taste, lowest, sorted(scenarios), enforce
+            )
+            with phase("optimize_menu.master", relax=True):
+                _optimize_relaxation(master.model)
+            if master.model.status != OptimizationStatus.OPTIMAL:
+                break
+            coefficients, constant = master.duals(values, taste)
+            recipe = columns.price(coefficients, pricing_deadline - time.perf_counter())
+            if recipe is None or recipe in columns or coefficients[list(recipe)].sum() - constant <= 1e-6:
+                break
+            columns.add(recipe)
+
+        master = _build_master(columns, n_pizzas, constraints, values, catalog, taste, lowest, sorted(scenarios))
+        master.model.start = [(master.choose[columns.index[recipe]], float(start.count(recipe))) for recipe in set(start)]
+        master.model.max_seconds = max(deadline - time.perf_counter(), 0.0)
+        _optimize(master.model, "optimize_menu.master", build_start)
+        build_start = time.perf_counter()
+        if master.model.status not in _HAS_SOLUTION:
+            return None
+        selected = [
+            recipe
+            for recipe, var in zip(columns.recipes, master.choose)
+            for _ in range(int(round(var.x)))
+        ]
+        start = selected
+        feasible = all(slack.x <= 1e-6 for slack in master.slacks)
+
+        enforce = None
+        if taste is not None:
+            menu_taste = _recipe_counts(selected, len(catalog)) @ taste
+            violated = _violated_scenarios(menu_taste, constraints)
+            if feasible and not len(violated):
+                return selected
+            scenarios.update(violated.tolist())
+            if master.slacks[2].x > 1e-6:
+                # all but the allowed lowest scenarios of the menu are enforced in the next pricing round
+                ranked = sorted(scenarios, key=lambda s: menu_taste[s])
+                enforce = set(ranked[_allowed_scenarios(constraints, len(menu_taste)) :])
+        elif feasible:
+            return selected
+
+        if time.perf_counter() >= deadline:
+            return None
+        if (len(columns.recipes), len(scenarios), enforce) == known:
+            # the next round would end in the same solution, the next best recipes of the last pricing
+            # widen the choice of the master problem
+            for _ in range(n_pizzas):
+                recipe = columns.price(coefficients, deadline - time.perf_counter())
+                if recipe is None:
+                    break
+                columns.add(recipe)
+            if len(columns.recipes) == known[0]:
+                return None
+
+
+def optimize_menu(
+    n_pizzas: int,
+    constraints_values: PizzaConstraintsValues,
+    constraints_ingredients: PizzaConstraintsIngredients,
+    menu_constraints: Optional[MenuConstraints] = None,
+    lambda_param: float = 0.5,
+    catalog: Optional[IngredientCatalog] = None,
+    max_seconds: float = 10.0,
+    method: str = "auto",
+    joint_limit: int = 50,
+) -> PizzaMenu:
+    """
+    Chooses n_pizzas pizzas maximizing the expected taste minus lambda_param times the price of the whole menu,
+    every pizza satisfies constraints_values and constraints_ingredients, the menu satisfies menu_constraints.
+
+    method is "joint" (one model for the whole menu, warm started by the column generation),
+    "column_generation" or "auto": the joint model for up to joint_limit pizzas, the column generation otherwise.
+    The column generation gets half of max_seconds before the joint model and its menu is kept,
+    if the joint model finds no solution in the remaining time.
+
+    min_menu_tar is enforced on the order statistic below the interpolated quantile of `taste_at_risk_menu`,
+    a menu reaching the bound only through the interpolation is not accepted.
+    """
+    if method not in ("auto", "joint", "column_generation"):
+        raise ValueError(f"unknown method {method}")
+    if n_pizzas < 1:
+        raise ValueError("the menu needs at least one pizza")
+    catalog = default_catalog() if catalog is None else catalog
+    constraints = MenuConstraints() if menu_constraints is None else menu_constraints
+    arguments = (n_pizzas, constraints_values, constraints_ingredients, constraints, lambda_param, catalog)
+
+    start = time.perf_counter()
+    joint = method == "joint" or (method == "auto" and n_pizzas <= joint_limit)
+    recipes = _solve_column_generation(*arguments, max_seconds / 2 if joint else max_seconds)
+    pizzas = None if recipes is None else _pizzas(recipes, catalog)
+    if joint:
+        remaining = max_seconds - (time.perf_counter() - start)
+        pizzas = _solve_joint(*arguments, max(remaining, 0.0), start=recipes) or pizzas
+    if pizzas is None:
+        # infeasible or not solved in time, the column generation and the joint model can not tell
+        raise PizzaOptimizationError("No menu found -> likely infeasible or max_seconds too short")
+
+    menu = PizzaMenu(pizzas=pizzas)
+    if constraints.min_menu_tar is not None:
+        from maestro_pizza_maker.taste_at_risk import taste_at_risk_menu
+
+        tar = taste_at_risk_menu(menu, quantile=constraints.tar_quantile)
+        if tar < constraints.min_menu_tar - 1e-6:
+            raise PizzaOptimizationError(
+                f"The menu does not reach the taste at risk {constraints.min_menu_tar} (got {tar})"
+            )
+    return menu
@@ -0,0 +1,112 @@
+# The risk measures of a large menu are evaluated one pizza at a time, in Python, on one core.
+# With n_workers > 1 the maestro pizza maker splits the work into chunks for a thread pool instead,
+# every chunk is a NumPy kernel (matrix product, gather, partition) that releases the GIL:
+#
+#   - the menu is indexed once: its distinct ingredients become a small catalog and its pizzas the CSR
+#     ingredient indices (a loaded menu is indexed already), see `menu_index`
+#   - the menu taste is the product of the ingredient counts with the fat scenarios, chunked by scenarios
+#     (the ingredients of a compressed menu are counted from its recipes times their copies)
+#   - the tail of the conditional taste at risk is merged from the partial sums and counts of the chunks
+#   - the fat quantiles of the pizzas are computed in chunks of pizzas, the most fat pizza is the last maximum
+#
+# The chunks do not depend on the number of workers, so neither does the result.
+#
+# usage:
+#   taste_at_risk_menu(menu, 0.05, n_workers=8)
+#   menu.get_most_fat_pizza(0.5, n_workers=8)
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple, TypeVar
+
+import numpy as np
+
+from maestro_pizza_maker.catalog import Ingredient, IngredientCatalog
+from maestro_pizza_maker.persistence import StoredPizzas
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.profiling import count, phase
+from maestro_pizza_maker.recipes import RecipePizzas
+
+# scenarios per chunk of the menu taste and the tail, values per (pizzas x scenarios) chunk of the fat quantiles
+SCENARIO_CHUNK = 2**16
+PIZZA_CHUNK_VALUES = 2**20
+
+T = TypeVar("T")
+
+
+def _map_chunks(function: Callable[[int, int], T], n_items: int, chunk: int, n_workers: int) -> List[T]:
+    # function(start, stop) for the chunks of the items, in order
+    bounds = [(start, min(start + chunk, n_items)) for start in range(0, n_items, chunk)]
+    count("parallel.chunks", len(bounds))
+    if n_workers == 1 or len(bounds) == 1:
+        return [function(start, stop) for start, stop in bounds]
+    with ThreadPoolExecutor(min(n_workers, len(bounds))) as executor:
+        return list(executor.map(lambda bound: function(*bound), bounds))
+
+
+def menu_index(menu: PizzaMenu) -> Tuple[IngredientCatalog, np.ndarray, np.ndarray]:
+    """
+    Returns a catalog of the ingredients of the menu and the ingredient indices of its pizzas in CSR form,
+    see `IngredientCatalog.indices`. The catalog of a loaded menu is its stored catalog, otherwise it holds
+    the distinct ingredients of the menu, whichever enum or catalog they belong to.
+    """
+    pizzas = menu.pizzas
+    if isinstance(pizzas, StoredPizzas) and not pizzas.materialized:
+        return pizzas.catalog, pizzas.indptr, pizzas.indices
+    positions: Dict[Ingredient, int] = {}
+    indptr: List[int] = [0]
+    indices: List[int] = []
+    for pizza in pizzas:
+        indices.extend(positions.setdefault(ingredient, len(positions)) for ingredient in pizza.ingredients)
+        indptr.append(len(indices))
+    catalog = IngredientCatalog.from_enum(list(positions))
+    return catalog, np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int32)
+
+
+def menu_taste(menu: PizzaMenu, n_workers: int) -> np.ndarray:
+    """
+    Returns the taste of the whole menu, the sum of the tastes of all pizzas, in chunks of scenarios.
+    """
+    with phase("parallel.index", pizzas=len(menu)):
+        if isinstance(menu.pizzas, RecipePizzas):
+            catalog, indptr, indices = menu_index(PizzaMenu(pizzas=menu.pizzas.recipes))
+            totals = np.bincount(indices, np.repeat(menu.pizzas.weights, np.diff(indptr)), minlength=len(catalog))
+        else:
+            catalog, _, indices = menu_index(menu)
+            totals = np.bincount(indices, minlength=len(catalog))
+    weights = (totals * catalog.taste_weights).astype(catalog.fat.dtype)
+    with phase("parallel.menu_taste", workers=n_workers):
+        chunks = _map_chunks(
+            lambda start, stop: weights @ catalog.fat[:, start:stop], catalog.n_scenarios, SCENARIO_CHUNK, n_workers
+        )
+    return np.concatenate(chunks)
+
+
+def tail_mean(taste: np.ndarray, threshold: float, n_workers: int):
+    """
+    Returns the mean of the tastes up to the threshold, from the partial sums and counts of chunks of scenarios.
+    """
+
+    def partial(start: int, stop: int) -> Tuple[float, int]:
+        chunk = taste[start:stop]
+        tail = chunk <= threshold
+        return chunk.sum(where=tail), int(np.count_nonzero(tail))
+
+    with phase("parallel.tail_mean", workers=n_workers):
+        partials = _map_chunks(partial, len(taste), SCENARIO_CHUNK, n_workers)
+    total = sum(chunk_sum for chunk_sum, _ in partials)
+    return (total / sum(chunk_count for _, chunk_count in partials)).astype(taste.dtype)
+
+
+def fat_quantiles(menu: PizzaMenu, quantile: float, n_workers: int) -> np.ndarray:
+    """
+    Returns the quantile of the fat of every pizza of the menu, in chunks of pizzas.
+    """
+    with phase("parallel.index", pizzas=len(menu)):
+        catalog, indptr, indices = menu_index(menu)
+    chunk = max(1, PIZZA_CHUNK_VALUES // max(catalog.n_scenarios, 1))
+
+    def quantiles(start: int, stop: int) -> np.ndarray:
+        return np.quantile(catalog.fats(indptr[start : stop + 1], indices), q=quantile, axis=1)
+
+    with phase("parallel.fat_quantiles", workers=n_workers):
+        return np.concatenate(_map_chunks(quantiles, len(indptr) - 1, chunk, n_workers))
@@ -0,0 +1,243 @@
+# The maestro pizza maker shows his guests only the pizzas, that no other pizza beats in every respect:
+# a pizza is dominated, if another one is at least as good in all objectives (e.g. cheaper and tastier)
+# and better in one of them. The non-dominated pizzas are the Pareto front (or skyline) of the menu.
+#
+# The values of the objectives are computed for all pizzas at once from the ingredient indices of the menu,
+# the front is found without comparing all pairs of pizzas:
+#
+#   - one pass over the pizzas removes the ones dominated by a few good pivots
+#   - duplicates are merged, equal pizzas do not dominate each other
+#   - two objectives: the pizzas sorted by the first objective, a pizza is on the front,
+#     if its second objective is better than the best one before it (a cumulative minimum), O(n log n)
+#   - three objectives: the pizzas sorted lexicographically, a pizza is on the front, if no earlier pizza
+#     is better in the last two objectives (a vectorized divide and conquer over the pizzas), O(n log n)
+#   - more objectives: the pizzas sorted by the sum of their objectives are compared with the front so far
+#
+# usage:
+#   front = menu.pareto_front(["price", "taste_at_risk"])
+#   front = menu.pareto_front(["price", "expected_taste", "calories"], PizzaConstraintsValues(protein=ValueBounds(min=20)))
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from maestro_pizza_maker.catalog import IngredientCatalog
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.pizza_optimizer import VALUES, PizzaConstraintsValues, value_matrix
+from maestro_pizza_maker.profiling import count, phase
+
+# the objectives and whether they are minimized or maximized by default,
+# fat is the mean fat and taste_at_risk the taste at risk of the pizza at the given quantile
+PARETO_OBJECTIVES: Dict[str, str] = {
+    "price": "min",
+    "protein": "max",
+    "fat": "min",
+    "carbohydrates": "min",
+    "calories": "min",
+    "expected_taste": "max",
+    "taste_at_risk": "max",
+}
+SENSES = ["min", "max"]
+
+# number of pivots of the pre-filter
+_PIVOTS = 16
+
+
+def _dominated_by_pivots(columns: np.ndarray) -> np.ndarray:
+    # the points (the columns of the objectives x points matrix) dominated by one of the points with
+    # the smallest normalized sum of the objectives, compared one objective at a time
+    low, high = columns.min(axis=1), columns.max(axis=1)
+    score = np.zeros(columns.shape[1])
+    for column, lowest, highest in zip(columns, low, high):
+        score += (column - lowest) / (highest - lowest if highest > lowest else 1.0)
+    pivots = np.argpartition(score, min(_PIVOTS, len(score) - 1))[:_PIVOTS]
+    dominated = np.zeros(columns.shape[1], dtype=bool)
+    for pivot in columns[:, pivots].T:
+        weakly, strictly = np.ones(columns.shape[1], dtype=bool), np.zeros(columns.shape[1], dtype=bool)
+        for column, value in zip(columns, pivot):
+            weakly &= column >= value
+            strictly |= column > value
+        dominated |= weakly & strictly
+    return dominated
+
+
+def _front_2d(points: np.ndarray) -> np.ndarray:
+    # points sorted lexicographically and distinct
+    best_before = np.concatenate([[np.inf], np.minimum.accumulate(points[:-1, 1])])
+    return points[:, 1] < best_before
+
+
+def _front_3d(points: np.ndarray) -> np.ndarray:
+    # points sorted lexicographically and distinct, the earlier points are not worse in the first objective,
+    # so a point is dominated, if an earlier point has a smaller or equal y and z. Divide and conquer over the
+    # positions, a whole level at a time: the points of every block are in the order of y, a running minimum
+    # gives every point of a right half the smallest z of the left half up to its y. The order of the halves
+    # is then a stable partition of the blocks, O(n) per level and O(n log n) in all without a Python loop
+    n = len(points)
+    y = np.unique(points[:, 1], return_inverse=True)[1].reshape(-1)
+    z = np.unique(points[:, 2], return_inverse=True)[1].reshape(-1).astype(np.int64)
+    # the positions in the order of y, equal y in the order of the positions
+    order = np.argsort(y, kind="stable")
+    positions = np.arange(n)
+    dominated = np.zeros(n, dtype=bool)
+    # the running minimum is offset by block, so that it starts anew in every block
+    offset = n + 1
+    level = (n - 1).bit_length()
+    while level > 0:
+        block = order >> level
+        right = (order >> (level - 1)) & 1
+        zs = z[order]
+        smallest = np.minimum.accumulate(np.where(right, offset, zs) - block * offset) + block * offset
+        dominated[order[(right == 1) & (smallest <= zs)]] = True
+        # the rank of every point in its half, counted from the points of the same half before it in the block
+        start = block << level
+        ones = np.concatenate([[0], np.cumsum(right)])
+        ones_before = ones[positions] - ones[start]
+        rank = np.where(right == 1, ones_before, positions - start - ones_before)
+        halves = np.empty_like(order)
+        halves[((order >> (level - 1)) << (level - 1)) + rank] = order
+        order = halves
+        level -= 1
+    return ~dominated
+
+
+def _front_nd(points: np.ndarray) -> np.ndarray:
+    # a point is dominated only by points with a smaller sum, the later points of the front can still
+    # remove earlier ones, if the sums are equal up to rounding
+    order = np.argsort(points.sum(axis=1), kind="stable")
+    kept = np.empty((len(order), points.shape[1]))
+    index = np.empty(len(order), dtype=np.intp)
+    size = 0
+    for i in order:
+        point = points[i]
+        if size and np.any(np.all(kept[:size] <= point, axis=1)):
+            continue
+        alive = ~np.all(kept[:size] >= point, axis=1)
+        size_alive = int(alive.sum())
+        kept[:size_alive], index[:size_alive] = kept[:size][alive], index[:size][alive]
+        kept[size_alive], index[size_alive] = point, i
+        size = size_alive + 1
+    front = np.zeros(len(points), dtype=bool)
+    front[index[:size]] = True
+    return front
+
+
+def pareto_mask(values: np.ndarray) -> np.ndarray:
+    """
+    Returns a boolean mask of the rows of the (points x objectives) matrix, that are not dominated
+    by another row, all objectives are minimized. Equal rows are either all on the front or none of them.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim != 2:
+        raise ValueError("the values must be a (points x objectives) matrix")
+    if np.isnan(values).any():
+        raise ValueError("the values must not be NaN")
+    if len(values) == 0 or values.shape[1] == 0:
+        return np.ones(len(values), dtype=bool)
+    if values.shape[1] == 1:
+        return values[:, 0] == values[:, 0].min()
+
+    candidates = np.flatnonzero(~_dominated_by_pivots(np.ascontiguousarray(values.T)))
+    # the distinct candidates sorted lexicographically, the first objective first
+    order = candidates[np.lexsort(values[candidates].T[::-1])]
+    ordered = values[order]
+    distinct = np.ones(len(order), dtype=bool)
+    distinct[1:] = np.any(ordered[1:] != ordered[:-1], axis=1)
+    points = ordered[distinct]
+    if values.shape[1] == 2:
+        front = _front_2d(points)
+    elif values.shape[1] == 3:
+        front = _front_3d(points)
+    else:
+        front = _front_nd(points)
+    mask = np.zeros(len(values), dtype=bool)
+    mask[order] = front[np.cumsum(distinct) - 1]
+    return mask
+
+
+def _pizza_sums(per_ingredient: np.ndarray, indptr: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    # the sums of a value over the ingredients of every pizza, every pizza has ingredients
+    if len(indptr) == 1:
+        return np.empty(0)
+    return np.add.reduceat(per_ingredient[indices], indptr[:-1])
+
+
+def _pizza_taste_at_risk(catalog: IngredientCatalog, indptr: np.ndarray, indices: np.ndarray, quantile: float):
+    tar = np.empty(len(indptr) - 1)
+    for start, stop, tastes in catalog.taste_blocks(indptr, indices):
+        tar[start:stop] = np.quantile(tastes, q=quantile, axis=1)
+    return tar
+
+
+def objective_values(
+    menu: PizzaMenu,
+    objectives: Sequence[str],
+    catalog: Optional[IngredientCatalog] = None,
+    quantile: float = 0.05,
+) -> np.ndarray:
+    """
+    Returns the (pizzas x objectives) matrix of the values of the objectives of `PARETO_OBJECTIVES`,
+    the catalog of the menu ingredients is the one of its pizzas by default, see `PizzaMenu.ingredient_catalog`.
+    """
+    unknown = [objective for objective in objectives if objective not in PARETO_OBJECTIVES]
+    if unknown:
+        raise ValueError(f"unknown objectives {unknown}, expected some of {list(PARETO_OBJECTIVES)}")
+    catalog = menu.ingredient_catalog() if catalog is None else catalog
+    # We focus on the left tail of the taste distribution.
+    if quantile > 0.5:
+        quantile = 1 - quantile
+
+    indptr, indices = menu.ingredient_indices(catalog)
+    if np.any(np.diff(indptr) == 0):
+        raise ValueError("every pizza needs ingredients")
+    coefficients = value_matrix(catalog)
+    columns = []
+    for objective in objectives:
+        if objective in VALUES:
+            columns.append(_pizza_sums(coefficients[VALUES.index(objective)], indptr, indices))
+        elif objective == "expected_taste":
+            columns.append(_pizza_sums(catalog.expected_taste, indptr, indices))
+        else:
+            columns.append(_pizza_taste_at_risk(catalog, indptr, indices, quantile))
+    return np.column_stack(columns) if columns else np.empty((len(indptr) - 1, 0))
+
+
+def pareto_indices(
+    menu: PizzaMenu,
+    objectives: Sequence[str],
+    constraints_values: Optional[PizzaConstraintsValues] = None,
+    catalog: Optional[IngredientCatalog] = None,
+    quantile: float = 0.05,
+    senses: Optional[Dict[str, str]] = None,
+) -> np.ndarray:
+    """
+    Returns the positions of the pizzas on the Pareto front of the objectives among the pizzas,
+    that satisfy the value constraints (the fat is the mean fat, as in the optimizers).
+    The objectives are minimized or maximized as in `PARETO_OBJECTIVES`, unless senses says otherwise.
+    """
+    senses = {**PARETO_OBJECTIVES, **(senses or {})}
+    if not objectives:
+        raise ValueError("the Pareto front needs at least one objective")
+    unknown = [objective for objective in objectives if objective not in PARETO_OBJECTIVES]
+    if unknown:
+        raise ValueError(f"unknown objectives {unknown}, expected some of {list(PARETO_OBJECTIVES)}")
+    invalid = {objective: senses[objective] for objective in objectives if senses.get(objective) not in SENSES}
+    if invalid:
+        raise ValueError(f"the senses of the objectives must be one of {SENSES}, got {invalid}")
+
+    count("pareto.pizzas", len(menu))
+    bounded = [] if constraints_values is None else VALUES
+    with phase("pareto.values", objectives=len(objectives)):
+        names = list(objectives) + [value for value in bounded if value not in objectives]
+        values = objective_values(menu, names, catalog, quantile)
+    feasible = np.ones(len(values), dtype=bool)
+    for value in bounded:
+        bounds = getattr(constraints_values, value)
+        column = values[:, names.index(value)]
+        feasible &= (column >= bounds.min) & (column <= bounds.max)
+
+    candidates = np.flatnonzero(feasible)
+    signs = np.array([1.0 if senses[objective] == "min" else -1.0 for objective in objectives])
+    with phase("pareto.front", pizzas=len(candidates)):
+        front = pareto_mask(values[candidates][:, : len(objectives)] * signs)
+    return candidates[front]
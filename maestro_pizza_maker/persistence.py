@@ -0,0 +1,211 @@
+# The fat of `PizzaIngredients` depends on the seed and the dtype of the fat scenarios (and on the generator),
+# so a menu evaluated in one run is not necessarily evaluated on the same scenarios in the next one. The maestro
+# pizza maker therefore stores a menu together with its catalog and fat scenarios in one uncompressed NPZ archive:
+#
+#   catalog_<column>   the columns of the catalog, see `IngredientCatalog.to_arrays`
+#   indptr             (pizzas + 1,) offsets, pizza p has the ingredients indices[indptr[p]:indptr[p + 1]]
+#   indices            catalog indices of the ingredients of all pizzas (the ingredient count matrix in CSR form)
+#   pizza_ids          (pizzas,) ids of the pizzas
+#   metadata           JSON document
+#   format             version of the layout
+#
+# The members are not compressed, so that `load_menu` memory-maps them instead of reading them:
+# opening a menu of a million pizzas reads only the headers of the archive, and the pizzas are created
+# from the ingredient indices only when they are accessed.
+#
+# usage:
+#   save_menu("menu.npz", menu, metadata={"lambda": 0.5})
+#   stored = load_menu("menu.npz")
+#   taste_at_risk_menu(stored.menu, quantile=0.05)  # without creating the pizzas
+
+import json
+import struct
+import zipfile
+from collections.abc import MutableSequence
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from maestro_pizza_maker.catalog import IngredientCatalog
+from maestro_pizza_maker.pizza import Pizza
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.profiling import phase
+
+FORMAT_VERSION = 1
+
+_CATALOG_PREFIX = "catalog_"
+# the local file header of a zip member has a fixed size of 30 bytes, followed by the file name and the extra field
+_LOCAL_HEADER = struct.Struct("<4s5H3I2H")
+
+
+class StoredPizzas(MutableSequence):
+    """
+    The pizzas of a stored menu, created from the (memory-mapped) ingredient indices when they are accessed.
+    The first modification turns the sequence into a list of pizzas.
+    """
+
+    def __init__(self, catalog: IngredientCatalog, indptr: np.ndarray, indices: np.ndarray) -> None:
+        self.catalog = catalog
+        self.indptr = indptr
+        self.indices = indices
+        self._pizzas: Optional[List[Pizza]] = None
+
+    @property
+    def materialized(self) -> bool:
+        return self._pizzas is not None
+
+    def _pizza(self, p: int) -> Pizza:
+        return Pizza.from_ingredients(
+            [self.catalog[i] for i in self.indices[self.indptr[p] : self.indptr[p + 1]]]
+        )
+
+    def _materialize(self) -> List[Pizza]:
+        if self._pizzas is None:
+            with phase("persistence.materialize", pizzas=len(self)):
+                self._pizzas = [self._pizza(p) for p in range(len(self))]
+        return self._pizzas
+
+    def __len__(self) -> int:
+        return len(self._pizzas) if self._pizzas is not None else len(self.indptr) - 1
+
+    def __getitem__(self, index):
+        if self._pizzas is not None:
+            return self._pizzas[index]
+        if isinstance(index, slice):
+            return [self._pizza(p) for p in range(*index.indices(len(self)))]
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return self._pizza(index % len(self))
+
+    def __iter__(self) -> Iterator[Pizza]:
+        if self._pizzas is not None:
+            return iter(self._pizzas)
+        return (self._pizza(p) for p in range(len(self)))
+
+    def __setitem__(self, index, pizza) -> None:
+        self._materialize()[index] = pizza
+
+    def __delitem__(self, index) -> None:
+        del self._materialize()[index]
+
+    def insert(self, index: int, pizza: Pizza) -> None:
+        self._materialize().insert(index, pizza)
+
+    def __repr__(self) -> str:
+        return f"StoredPizzas({len(self)} pizzas, materialized={self.materialized})"
+
+    def counts(self) -> np.ndarray:
+        # (pizzas x ingredients) matrix of the ingredient counts, see `IngredientCatalog.counts`
+        if self._pizzas is not None:
+            return self.catalog.counts(self._pizzas)
+        counts = np.zeros((len(self), len(self.catalog)), dtype=np.int32)
+        rows = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        np.add.at(counts, (rows, np.asarray(self.indices, dtype=np.intp)), 1)
+        return counts
+
+    def menu_taste(self) -> np.ndarray:
+        # the sum of the tastes of all pizzas, from how many times each ingredient is on the menu
+        if self._pizzas is not None:
+            return sum(pizza.taste for pizza in self._pizzas)
+        totals = np.bincount(self.indices, minlength=len(self.catalog))
+        weights = (totals * self.catalog.taste_weights).astype(self.catalog.fat.dtype)
+        return weights @ self.catalog.fat
+
+
+@dataclass
+class StoredMenu:
+    menu: PizzaMenu  # its pizzas are `StoredPizzas`
+    catalog: IngredientCatalog
+    pizza_ids: np.ndarray
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+def save_menu(
+    path: str,
+    menu: PizzaMenu,
+    catalog: Optional[IngredientCatalog] = None,
+    pizza_ids: Optional[np.ndarray] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Stores the menu, the catalog of its ingredients (including the fat scenarios), the ids of the pizzas
+    (0, 1, ... by default) and a JSON serializable metadata dictionary in an uncompressed NPZ archive.
+    The catalog is the one of the pizzas by default, see `PizzaMenu.ingredient_catalog`.
+    """
+    catalog = menu.ingredient_catalog() if catalog is None else catalog
+    pizza_ids = np.arange(len(menu), dtype=np.int64) if pizza_ids is None else np.asarray(pizza_ids)
+    if pizza_ids.shape != (len(menu),):
+        raise ValueError(f"pizza_ids must have {len(menu)} entries, one per pizza")
+
+    with phase("persistence.save", pizzas=len(menu)):
+        indptr, indices = menu.ingredient_indices(catalog)
+        arrays = {_CATALOG_PREFIX + name: array for name, array in catalog.to_arrays().items()}
+        np.savez(
+            path,
+            format=np.int64(FORMAT_VERSION),
+            indptr=indptr,
+            indices=indices,
+            pizza_ids=pizza_ids,
+            metadata=np.array(json.dumps(metadata or {})),
+            **arrays,
+        )
+
+
+def _memory_map_npz(path: str) -> Dict[str, np.ndarray]:
+    # np.load can not memory-map the members of an archive, their offsets are found in the zip headers instead
+    arrays: Dict[str, np.ndarray] = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as file:
+        for info in archive.infolist():
+            name = info.filename[: -len(".npy")] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                # e.g. written by np.savez_compressed, it has to be read
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+
+            file.seek(info.header_offset)
+            header = _LOCAL_HEADER.unpack(file.read(_LOCAL_HEADER.size))
+            file.seek(info.header_offset + _LOCAL_HEADER.size + header[-2] + header[-1])
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+            if dtype.hasobject:
+                raise ValueError(f"{name} holds python objects, it can not be loaded without pickling")
+            if int(np.prod(shape)) == 0 or shape == ():
+                # nothing to map, e.g. the metadata document
+                arrays[name] = np.fromfile(file, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+                continue
+            arrays[name] = np.memmap(
+                path, dtype=dtype, mode="r", offset=file.tell(), shape=shape, order="F" if fortran_order else "C"
+            )
+    return arrays
+
+
+def load_menu(path: str) -> StoredMenu:
+    """
+    Opens a menu stored by `save_menu`. The arrays are memory-mapped and the pizzas are not created,
+    until they are accessed. The ingredients of the pizzas belong to the stored catalog, i.e. they are
+    evaluated on the stored fat scenarios.
+    """
+    with phase("persistence.load"):
+        arrays = _memory_map_npz(path)
+        version = int(arrays["format"])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unsupported menu format {version}, expected {FORMAT_VERSION}")
+        catalog = IngredientCatalog.from_arrays(
+            {
+                name[len(_CATALOG_PREFIX) :]: array
+                for name, array in arrays.items()
+                if name.startswith(_CATALOG_PREFIX)
+            }
+        )
+        pizzas = StoredPizzas(catalog, arrays["indptr"], arrays["indices"])
+        return StoredMenu(
+            menu=PizzaMenu(pizzas=pizzas),
+            catalog=catalog,
+            pizza_ids=arrays["pizza_ids"],
+            metadata=json.loads(str(arrays["metadata"])),
+        )
@@ -1,49 +1,42 @@
 # class representing a pizza
 
-from dataclasses import dataclass
-from typing import List, Literal, Optional, Dict
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import FrozenSet, Iterable, List, Optional, Dict, Tuple
 import uuid
 import random
-from maestro_pizza_maker.ingredients import PizzaIngredients
+from maestro_pizza_maker.catalog import Ingredient
+from maestro_pizza_maker.ingredients import IngredientType, PizzaIngredients
+from maestro_pizza_maker.profiling import SolverStats
 import numpy as np
 
 
+# the field of a pizza holding the ingredients of each type
+PIZZA_SLOTS: Dict[IngredientType, str] = {
+    IngredientType.DOUGH: "dough",
+    IngredientType.SAUCE: "sauce",
+    IngredientType.CHEESE: "cheese",
+    IngredientType.FRUIT: "fruits",
+    IngredientType.MEAT: "meat",
+    IngredientType.VEGETABLE: "vegetables",
+}
+
+# the multiset of the ingredients of a pizza, (ingredient, how many times) pairs, see `Pizza.recipe`
+Recipe = FrozenSet[Tuple[Ingredient, int]]
+
+
 @dataclass
 class Pizza:
-    dough: Literal[
-        PizzaIngredients.CLASSIC_DOUGH,
-        PizzaIngredients.THIN_DOUGH,
-        PizzaIngredients.WHOLEMEAL_DOUGH,
-    ]
-    sauce: Literal[PizzaIngredients.TOMATO_SAUCE, PizzaIngredients.CREAM_SAUCE]
-    cheese: Optional[
-        List[
-            Literal[
-                PizzaIngredients.MOZZARELA,
-                PizzaIngredients.CHEDDAR,
-                PizzaIngredients.PARMESAN,
-            ]
-        ]
-    ] = None
-    fruits: Optional[
-        List[Literal[PizzaIngredients.PINEAPPLE, PizzaIngredients.APPLE]]
-    ] = None
-    meat: Optional[
-        List[
-            Literal[
-                PizzaIngredients.HAM, PizzaIngredients.BACON, PizzaIngredients.SAUSAGE
-            ]
-        ]
-    ] = None
-    vegetables: Optional[
-        List[
-            Literal[
-                PizzaIngredients.MUSHROOMS,
-                PizzaIngredients.ONIONS,
-                PizzaIngredients.PEPPER,
-            ]
-        ]
-    ] = None
+    # the ingredients are members of `PizzaIngredients` or ingredients of an `IngredientCatalog`,
+    # the dough and the sauce must be of type DOUGH and SAUCE, the lists hold ingredients of the matching type
+    dough: Ingredient
+    sauce: Ingredient
+    cheese: Optional[List[Ingredient]] = None
+    fruits: Optional[List[Ingredient]] = None
+    meat: Optional[List[Ingredient]] = None
+    vegetables: Optional[List[Ingredient]] = None
+    # filled in by the optimizers, see `maestro_pizza_maker.pizza_optimizer`
+    solver_stats: Optional[SolverStats] = field(default=None, compare=False, repr=False)
 
     def __post_init__(self) -> None:
         if self.cheese is None:
@@ -63,6 +56,29 @@ class Pizza:
             *self.vegetables,
         ]
 
+    @classmethod
+    def from_ingredients(cls, ingredients: Iterable[Ingredient], **kwargs) -> "Pizza":
+        # sorts the ingredients into the fields by their type
+        slots: Dict[str, List[Ingredient]] = {slot: [] for slot in PIZZA_SLOTS.values()}
+        for ingredient in ingredients:
+            slots[PIZZA_SLOTS[ingredient.value.type]].append(ingredient)
+        if len(slots["dough"]) != 1 or len(slots["sauce"]) != 1:
+            raise ValueError("a pizza needs exactly one dough and one sauce")
+        return cls(
+            dough=slots["dough"][0],
+            sauce=slots["sauce"][0],
+            cheese=slots["cheese"],
+            fruits=slots["fruits"],
+            meat=slots["meat"],
+            vegetables=slots["vegetables"],
+            **kwargs,
+        )
+
+    @property
+    def recipe(self) -> Recipe:
+        # the pizzas with the same ingredients have the same recipe, whatever the order of the ingredients
+        return frozenset(Counter(self.ingredients).items())
+
     @property
     def price(self) -> float:
         return sum(ingredient.value.price for ingredient in self.ingredients)
@@ -111,8 +127,13 @@ class Pizza:
         # taste = 0.05 * fat_dough + 0.2 * fat_sauce + 0.3 * fat_cheese + 0.1 * fat_fruits + 0.3 * fat_meat + 0.05 * fat_vegetables
         taste_arr: np.ndarray = self.dough.value.fat * 0.05 + \
         self.sauce.value.fat * 0.2 + \
-        np.sum([cheese.value.fat for cheese in self.cheese], axis=0) * 0.3 + \
-        np.sum([fruit.value.fat for fruit in self.fruits], axis=0) * 0.1 + \
-        np.sum([meat.value.fat for meat in self.meat], axis=0) * 0.3 + \
-        np.sum([vegetable.value.fat for vegetable in self.vegetables], axis=0) * 0.05
+        _fat_sum(self.cheese) * 0.3 + \
+        _fat_sum(self.fruits) * 0.1 + \
+        _fat_sum(self.meat) * 0.3 + \
+        _fat_sum(self.vegetables) * 0.05
         return taste_arr
+
+
+def _fat_sum(ingredients: List[Ingredient]):
+    # the sum of the fat vectors in their dtype, np.sum([]) is a float64 zero and would upcast float32 scenarios
+    return sum((ingredient.value.fat for ingredient in ingredients), 0)
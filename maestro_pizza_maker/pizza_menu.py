@@ -1,13 +1,15 @@
 # class representing the pizza menu
 
 from dataclasses import dataclass
-from typing import List, Dict, Union
+from typing import List, Dict, Optional, Sequence, Tuple, Union
 
 import pandas as pd
 import numpy as np
 
+from maestro_pizza_maker.catalog import CatalogIngredient, IngredientCatalog, default_catalog
 from maestro_pizza_maker.pizza import Pizza, PizzaIngredients
 from maestro_pizza_maker.ingredients import PizzaIngredient
+from maestro_pizza_maker.profiling import count, phase
 
 
 @dataclass
@@ -37,20 +39,23 @@ class PizzaMenu:
         # The dataframe should be sorted by the price column in a descendent order
         assert sort_by in PizzaIngredient.__annotations__.keys()
         assert isinstance(descendent, bool)
-        data: List[Dict[str, Union[float, List[PizzaIngredients]]]] = \
-        [
-            {
-                "name": pizza.name,
-                "price": pizza.price,
-                "protein": pizza.protein,
-                "average_fat": pizza.average_fat,
-                "carbohydrates": pizza.carbohydrates,
-                "calories": pizza.calories,
-                "ingredients": pizza.ingredients
-            } \
-                for pizza in self.pizzas
-        ]
-        return pd.DataFrame(data).sort_values(by = sort_by, ascending=(not descendent))    
+        count("menu.to_dataframe.pizzas", len(self.pizzas))
+        with phase("menu.to_dataframe.collect"):
+            data: List[Dict[str, Union[float, List[PizzaIngredients]]]] = \
+            [
+                {
+                    "name": pizza.name,
+                    "price": pizza.price,
+                    "protein": pizza.protein,
+                    "average_fat": pizza.average_fat,
+                    "carbohydrates": pizza.carbohydrates,
+                    "calories": pizza.calories,
+                    "ingredients": pizza.ingredients
+                } \
+                    for pizza in self.pizzas
+            ]
+        with phase("menu.to_dataframe.build"):
+            return pd.DataFrame(data).sort_values(by = sort_by, ascending=(not descendent))    
 
     @property
     def cheapest_pizza(self) -> Pizza:
@@ -62,9 +67,16 @@ class PizzaMenu:
         # TODO: return the most caloric pizza from the menu
         return sorted(self.pizzas, key=lambda x: x.calories)[-1]
 
-    def get_most_fat_pizza(self, quantile: float = 0.5) -> Pizza:
+    def get_most_fat_pizza(self, quantile: float = 0.5, n_workers: int = 1) -> Pizza:
         # TODO: return the most fat pizza from the menu
         # consider the fact that fat is random and it is not always the same, so you should return the pizza that has the most fat in the quantile of cases specified by the quantile parameter
+        if n_workers > 1 and len(self.pizzas):
+            # the fat quantiles in chunks of pizzas on a thread pool, see `maestro_pizza_maker.parallel`
+            from maestro_pizza_maker.parallel import fat_quantiles
+
+            quantiles = fat_quantiles(self, quantile, n_workers)
+            # the last of the most fat pizzas, as the stable sort
+            return self.pizzas[len(quantiles) - 1 - int(np.argmax(quantiles[::-1]))]
         return sorted(self.pizzas, key=lambda x: np.quantile(x.fat, q=quantile))[-1]
     
     # Optional 5.2: Write other properties that might be useful.
@@ -84,6 +96,33 @@ class PizzaMenu:
         # return the pizza with more carbs from the menu
         return sorted(self.pizzas, key=lambda x: x.carbohydrates)[-1]
 
+    def pareto_front(
+        self,
+        objectives: Sequence[str],
+        constraints_values=None,
+        catalog: Optional[IngredientCatalog] = None,
+        quantile: float = 0.05,
+        senses: Optional[Dict[str, str]] = None,
+    ) -> "PizzaMenu":
+        # the menu of the pizzas, that are not dominated in the objectives by another pizza satisfying
+        # the value constraints (a `PizzaConstraintsValues`), see `maestro_pizza_maker.pareto`
+        from maestro_pizza_maker.pareto import pareto_indices
+
+        positions = pareto_indices(self, objectives, constraints_values, catalog, quantile, senses)
+        return PizzaMenu(pizzas=[self.pizzas[int(p)] for p in positions])
+
+    def taste_index(self, n_quantiles: int = 32):
+        # a `TasteSimilarityIndex` of the taste distributions of the pizzas, see `maestro_pizza_maker.similarity`
+        from maestro_pizza_maker.similarity import TasteSimilarityIndex
+
+        return TasteSimilarityIndex.from_menu(self, n_quantiles)
+
+    def compress(self) -> "PizzaMenu":
+        # the menu of the distinct recipes and their copies, see `maestro_pizza_maker.recipes`
+        from maestro_pizza_maker.recipes import compress_menu
+
+        return compress_menu(self)
+
     def add_pizza(self, pizza: Pizza) -> None:
         # TODO: code a function that adds a pizza to the menu
         assert isinstance(pizza, Pizza)
@@ -94,11 +133,62 @@ class PizzaMenu:
         # do not forget to check if the pizza is actually in the menu
         # if it is not in the menu, raise a ValueError
         assert isinstance(pizza, Pizza)
+        from maestro_pizza_maker.recipes import RecipePizzas
+
         try:
-            self.pizzas.remove(pizza)
-        except ValueError:
+            if isinstance(self.pizzas, RecipePizzas):
+                self.pizzas.remove(pizza)
+            else:
+                # the first pizza with the same recipe, the order of the ingredients does not matter
+                recipe = pizza.recipe
+                del self.pizzas[next(p for p, other in enumerate(self.pizzas) if other.recipe == recipe)]
+        except (ValueError, StopIteration):
             print("The pizza is not part of the menu. Try with another pizza.")
 
+    def ingredient_catalog(self) -> IngredientCatalog:
+        # the catalog of the ingredients of the pizzas: the stored catalog of a loaded menu, the catalog of
+        # `CatalogIngredient` pizzas, `PizzaIngredients` for enum pizzas and the distinct ingredients of a mixed menu
+        from maestro_pizza_maker.persistence import StoredPizzas
+
+        if isinstance(self.pizzas, StoredPizzas):
+            return self.pizzas.catalog
+        catalogs = {}
+        enum_ingredients = False
+        for pizza in self.pizzas:
+            for ingredient in pizza.ingredients:
+                if isinstance(ingredient, CatalogIngredient):
+                    catalogs[id(ingredient.catalog)] = ingredient.catalog
+                else:
+                    enum_ingredients = True
+        if not catalogs:
+            return default_catalog()
+        if len(catalogs) == 1 and not enum_ingredients:
+            return next(iter(catalogs.values()))
+        from maestro_pizza_maker.parallel import menu_index
+
+        return menu_index(self)[0]
+
+    def ingredient_counts(self, catalog: Optional[IngredientCatalog] = None) -> np.ndarray:
+        # (pizzas x ingredients) matrix of the ingredient counts, the ingredients of `ingredient_catalog` by default,
+        # the counts of a loaded menu are read without creating the pizzas
+        from maestro_pizza_maker.persistence import StoredPizzas
+
+        if isinstance(self.pizzas, StoredPizzas) and catalog in (None, self.pizzas.catalog):
+            return self.pizzas.counts()
+        catalog = self.ingredient_catalog() if catalog is None else catalog
+        return catalog.counts(self.pizzas)
+
+    def ingredient_indices(self, catalog: Optional[IngredientCatalog] = None) -> Tuple[np.ndarray, np.ndarray]:
+        # the ingredient counts in CSR form, see `IngredientCatalog.indices`, taken as they are from a loaded menu,
+        # on the catalog of the ingredients of the pizzas by default
+        from maestro_pizza_maker.persistence import StoredPizzas
+
+        pizzas = self.pizzas
+        if isinstance(pizzas, StoredPizzas) and not pizzas.materialized and catalog in (None, pizzas.catalog):
+            return pizzas.indptr, pizzas.indices
+        catalog = self.ingredient_catalog() if catalog is None else catalog
+        return catalog.indices(pizzas)
+
     def __len__(self) -> int:
         # TODO: return the number of pizzas in the menu
         return len(self.pizzas)
@@ -8,14 +8,36 @@
 # hint: you can find inspiration in the minimize_price function
 
 
-from dataclasses import dataclass
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Union
 
 import numpy as np
 
-from mip import Model, xsum, minimize, maximize,INTEGER, OptimizationStatus
+from mip import Constr, Model, LinExpr, Var, minimize, maximize, BINARY, CONTINUOUS, INF, INT_MAX, OptimizationStatus
 
-from maestro_pizza_maker.ingredients import IngredientType, PizzaIngredients
-from maestro_pizza_maker.pizza import Pizza
+from maestro_pizza_maker.catalog import IngredientCatalog, default_catalog
+from maestro_pizza_maker.pizza import PIZZA_SLOTS, Pizza
+from maestro_pizza_maker.profiling import SolverStats, count, phase, record_phase, record_solver_stats
+
+
+class PizzaOptimizationError(Exception):
+    # the optimizer has no pizza, e.g. no solution was found within the time, node or gap limits
+    def __init__(self, message: str, solver_stats: Optional[SolverStats] = None) -> None:
+        super().__init__(message)
+        self.solver_stats = solver_stats
+
+
+class InfeasiblePizzaError(PizzaOptimizationError):
+    # no pizza satisfies the constraints
+    pass
+
+
+# the default relative gap of CBC, restored on a shared model solved without a gap limit
+_DEFAULT_GAP = 1e-4
 
 
 @dataclass
@@ -24,13 +46,23 @@ class ValueBounds:
     max: float = np.inf
 
 
+@dataclass
+class ChanceBounds:
+    # the value is at most max in at least the given share of the fat scenarios, or if conservative
+    # the mean of the largest values in the other share of the scenarios is at most max, see `TailScenarios`
+    max: float = np.inf
+    probability: float = 0.95
+    conservative: bool = False
+
+
 @dataclass
 class PizzaConstraintsValues:
-    price: ValueBounds = ValueBounds()
-    protein: ValueBounds = ValueBounds()
-    fat: ValueBounds = ValueBounds()
-    carbohydrates: ValueBounds = ValueBounds()
-    calories: ValueBounds = ValueBounds()
+    price: ValueBounds = field(default_factory=ValueBounds)
+    protein: ValueBounds = field(default_factory=ValueBounds)
+    fat: ValueBounds = field(default_factory=ValueBounds)  # of the mean fat
+    carbohydrates: ValueBounds = field(default_factory=ValueBounds)
+    calories: ValueBounds = field(default_factory=ValueBounds)
+    fat_chance: Optional[ChanceBounds] = None  # of the fat in the scenarios, see `add_fat_chance_constraints`
 
 
 @dataclass
@@ -43,11 +75,463 @@ class PizzaConstraintsIngredients:
     sauce: int = 1
 
 
-def minimize_price(
+# the constrained values, i.e. the rows of the coefficient matrix `value_matrix`
+VALUES = ["price", "protein", "fat", "carbohydrates", "calories"]
+
+def value_matrix(catalog: IngredientCatalog) -> np.ndarray:
+    # (values x ingredients) coefficient matrix, the fat is taken as the mean over the fat scenarios
+    return np.vstack(
+        [
+            catalog.price,
+            catalog.protein,
+            catalog.fat_mean,
+            catalog.carbohydrates,
+            catalog.calories,
+        ]
+    )
+
+
+class ScenarioConstraints:
+    # The constraints coefficients[:, s] @ variables >= bound of the scenarios s, of which at most `allowed` may be
+    # violated, i.e. coefficients[:, s] @ variables + big_m[s] * z[s] >= bound with sum_s z[s] <= allowed.
+    # They are added lazily, only the scenarios in which a solution violates the bound enter the model. The other
+    # scenarios are unconstrained, so the model is a relaxation and a solution violating at most `allowed` scenarios
+    # among all scenarios is optimal. lower[s] is a lower bound of coefficients[:, s] @ variables, the tighter
+    # the smaller the big M.
+
+    def __init__(
+        self,
+        model: Model,
+        variables: List[Var],
+        coefficients: np.ndarray,
+        lower: np.ndarray,
+        bound: float,
+        allowed: int,
+        slack: Optional[Var] = None,
+    ) -> None:
+        self.model = model
+        self.variables = variables
+        self.coefficients = coefficients
+        self.bound = bound
+        self.allowed = allowed
+        self.big_m = np.maximum(bound - lower, 0.0)
+        self.slack = slack
+        self.z: Dict[int, Var] = {}
+        self.constrs: Dict[int, Constr] = {}
+        self.budget = None
+
+    def add(self, scenarios: Sequence[int]) -> None:
+        for s in scenarios:
+            if s in self.constrs:
+                continue
+            self.z[s] = self.model.add_var(var_type=BINARY)
+            self.constrs[s] = self.model.add_constr(
+                LinExpr(self.variables + [self.z[s]], self.coefficients[:, s].tolist() + [self.big_m[s]]) >= self.bound
+            )
+        if self.budget is not None:
+            self.model.remove(self.budget)
+        # the slack makes the budget elastic, the master problem of the column generation must stay feasible
+        z = list(self.z.values()) if self.slack is None else list(self.z.values()) + [self.slack]
+        coefficients = [1.0] * len(self.z) + ([] if self.slack is None else [-1.0])
+        self.budget = self.model.add_constr(LinExpr(z, coefficients) <= self.allowed)
+
+    def add_worst(self, values: np.ndarray) -> int:
+        # adds the scenarios of the solution with the variable values farthest below the bound, twice as many
+        # as needed to cut it off, but no scenario that no solution violates. Returns the number of added scenarios
+        worst = np.argsort(values @ self.coefficients, kind="stable")[: 2 * (self.allowed + 1)]
+        added = [s for s in worst.tolist() if self.big_m[s] > 0 and s not in self.constrs]
+        if added:
+            self.add(added)
+        return len(added)
+
+    def separate(self, values: np.ndarray) -> int:
+        # adds the worst scenarios of the solution, if it violates more than `allowed` of them
+        if (values @ self.coefficients < self.bound - 1e-6).sum() <= self.allowed:
+            return 0
+        return self.add_worst(values)
+
+
+class TailScenarios:
+    # The conservative version of the chance constraints coefficients[:, s] @ variables <= bound in all but
+    # `allowed` scenarios: the mean of the largest allowed + 1 values is at most the bound, so the (allowed + 1)-th
+    # largest is. As the conditional taste at risk, the mean is min_t t + sum_s max(values_s - t, 0) / (allowed + 1),
+    # i.e. t + sum_s u_s / (allowed + 1) <= bound with u_s >= coefficients[:, s] @ variables - t, u_s >= 0.
+    # The model has no binary variable per scenario and the rows u_s are added lazily, for the largest values.
+
+    def __init__(self, model: Model, variables: List[Var], coefficients: np.ndarray, bound: float, allowed: int) -> None:
+        self.model = model
+        self.variables = variables
+        self.coefficients = coefficients
+        self.bound = bound
+        self.n_tail = allowed + 1
+        self.t = model.add_var(var_type=CONTINUOUS, lb=-INF)
+        self.u: Dict[int, Var] = {}
+        self.constrs: Dict[int, Constr] = {}
+        self.tail = None
+
+    def add(self, scenarios: Sequence[int]) -> None:
+        for s in scenarios:
+            if s in self.constrs:
+                continue
+            self.u[s] = self.model.add_var(var_type=CONTINUOUS, lb=0)
+            self.constrs[s] = self.model.add_constr(
+                LinExpr(self.variables + [self.u[s], self.t], self.coefficients[:, s].tolist() + [-1.0, -1.0]) <= 0
+            )
+        if self.tail is not None:
+            self.model.remove(self.tail)
+        u = list(self.u.values())
+        self.tail = self.model.add_constr(LinExpr([self.t] + u, [1.0] + [1.0 / self.n_tail] * len(u)) <= self.bound)
+
+    def add_worst(self, values: np.ndarray) -> int:
+        # adds the scenarios with the largest values of the solution, twice as many as the tail.
+        # Returns the number of added scenarios
+        largest = np.argsort(-(values @ self.coefficients), kind="stable")
+        added = [s for s in largest[: 2 * self.n_tail].tolist() if s not in self.constrs]
+        if added:
+            self.add(added)
+        return len(added)
+
+    def separate(self, values: np.ndarray) -> int:
+        # adds the scenarios with the largest values of the solution, if the mean of the tail exceeds the bound
+        totals = values @ self.coefficients
+        if np.sort(totals)[-self.n_tail :].mean() <= self.bound + 1e-6:
+            return 0
+        return self.add_worst(values)
+
+
+@dataclass
+class PizzaModel:
+    model: Model
+    x: List[Var]
+    catalog: IngredientCatalog
+    build_start: float
+    # the price bounds and their constraints, replaced by `set_price`
+    price_bounds: ValueBounds = field(default_factory=ValueBounds)
+    price_constraints: List[Constr] = field(default_factory=list)
+    # the prices of the ingredients in the objectives and the price constraints, the catalog prices by default
+    price: Optional[np.ndarray] = None
+    # the constraints the model was built with, for the heuristic solver
+    constraints_values: PizzaConstraintsValues = field(default_factory=PizzaConstraintsValues)
+    constraints_ingredients: PizzaConstraintsIngredients = field(default_factory=PizzaConstraintsIngredients)
+    # the chance constraints of the fat, None without `PizzaConstraintsValues.fat_chance`
+    fat_scenarios: Optional[Union[ScenarioConstraints, TailScenarios]] = None
+
+    @property
+    def prices(self) -> np.ndarray:
+        return self.catalog.price if self.price is None else self.price
+
+    def set_price(self, price: np.ndarray) -> None:
+        # replaces the ingredient prices without building the model again, the catalog is not changed
+        price = np.asarray(price, dtype=np.float64)
+        if price.shape != (len(self.catalog),):
+            raise ValueError(f"the prices must have {len(self.catalog)} entries, one per ingredient")
+        self.model.remove(self.price_constraints)
+        self.price_constraints = _add_value_constraints(self.model, self.x, price, self.price_bounds)
+        self.price = price
+
+    def selected(self) -> np.ndarray:
+        # indices of the ingredients on the pizza of the current solution
+        return np.flatnonzero(np.array([var.x for var in self.x]) >= 0.99)
+
+    def pizza(self, **kwargs) -> Pizza:
+        return Pizza.from_ingredients([self.catalog[i] for i in self.selected()], **kwargs)
+
+    def separate(self) -> bool:
+        # adds the fat scenarios violated by the current solution, True if the model has to be solved again
+        if self.fat_scenarios is None:
+            return False
+        chosen = np.zeros(len(self.catalog))
+        chosen[self.selected()] = 1.0
+        added = self.fat_scenarios.separate(chosen)
+        count("optimizer.fat_scenarios", added)
+        return added > 0
+
+
+def _add_value_constraints(model: Model, x: List[Var], coefficients: np.ndarray, bounds: ValueBounds) -> List[Constr]:
+    constraints = []
+    # all coefficients are non-negative, the default bounds [0, inf) do not constrain anything
+    if bounds.min > 0 or (bounds.min > -np.inf and (coefficients < 0).any()):
+        constraints.append(model.add_constr(LinExpr(x, coefficients.tolist()) >= bounds.min))
+    if bounds.max < np.inf:
+        constraints.append(model.add_constr(LinExpr(x, coefficients.tolist()) <= bounds.max))
+    return constraints
+
+
+def add_pizza_constraints(
+    model: Model,
+    x: List[Var],
+    catalog: IngredientCatalog,
     constraints_values: PizzaConstraintsValues,
     constraints_ingredients: PizzaConstraintsIngredients,
+) -> Dict[str, List[Constr]]:
+    """
+    Adds the value and ingredient count constraints of one pizza, whose ingredients are selected by x.
+    Every constraint is created at once from a row of the coefficient matrix or from the ingredients of a type,
+    so that building the model is linear in the size of the catalog. Returns the constraints of each value.
+    """
+    coefficients = value_matrix(catalog)
+    value_constraints = {
+        value: _add_value_constraints(model, x, coefficients[row], getattr(constraints_values, value))
+        for row, value in enumerate(VALUES)
+    }
+
+    # the fields of `PizzaConstraintsIngredients` are named like the fields of `Pizza`
+    for ingredient_type, attribute in PIZZA_SLOTS.items():
+        indices = catalog.type_indices(ingredient_type)
+        n_required = getattr(constraints_ingredients, attribute)
+        if len(indices) == 0:
+            if n_required > 0:
+                raise InfeasiblePizzaError(
+                    f"The model is infeasible -> the catalog has no ingredient of type {ingredient_type.value}"
+                )
+            continue
+        model += LinExpr([x[i] for i in indices], [1.0] * len(indices)) == n_required
+    return value_constraints
+
+
+def add_fat_chance_constraints(
+    model: Model,
+    x: List[Var],
+    catalog: IngredientCatalog,
+    constraints_values: PizzaConstraintsValues,
+    constraints_ingredients: PizzaConstraintsIngredients,
+) -> Optional[Union[ScenarioConstraints, TailScenarios]]:
+    """
+    The chance constraints of the fat of one pizza, whose ingredients are selected by x: the fat is at most
+    fat_chance.max in at least fat_chance.probability of the fat scenarios. No scenario is in the model yet,
+    they are added by the `separate` method for the solutions violating them.
+
+    The exact constraints have a binary variable and a big M per added scenario, the big M is the fattest pizza
+    of the scenario above the bound, the scenarios in which no pizza exceeds it are never added. With many allowed
+    scenarios (thousands of scenarios at a probability of 0.95) CBC needs long to close the gap, the conservative
+    constraints bound the mean fat of the fattest scenarios instead, whose model is linear in the scenarios.
+    """
+    chance = constraints_values.fat_chance
+    if chance is None or chance.max == np.inf:
+        return None
+    if not 0 <= chance.probability <= 1:
+        raise ValueError("the probability of the chance constraints must be within [0, 1]")
+    # the rounding of the share is absorbed by the epsilon
+    allowed = int(np.floor((1 - chance.probability) * catalog.n_scenarios + 1e-9))
+    if allowed >= catalog.n_scenarios:
+        return None
+    if chance.conservative:
+        return TailScenarios(model, x, catalog.fat, chance.max, allowed)
+    # the fattest pizza of every scenario, from the fattest ingredients of every type
+    highest = np.zeros(catalog.n_scenarios)
+    for ingredient_type, attribute in PIZZA_SLOTS.items():
+        n_selected = getattr(constraints_ingredients, attribute)
+        if n_selected:
+            highest += -np.sort(-catalog.fat[catalog.type_indices(ingredient_type)], axis=0)[:n_selected].sum(axis=0)
+    # at most max is at least -max
+    return ScenarioConstraints(model, x, -catalog.fat, -highest, -chance.max, allowed)
+
+
+def build_pizza_model(
+    constraints_values: PizzaConstraintsValues,
+    constraints_ingredients: PizzaConstraintsIngredients,
+    catalog: Optional[IngredientCatalog] = None,
+) -> PizzaModel:
+    """
+    Builds the model shared by all objectives: one binary variable per ingredient of the catalog
+    and the constraints on the pizza values and on the number of ingredients of each type.
+    """
+    build_start = time.perf_counter()
+    catalog = default_catalog() if catalog is None else catalog
+    model = Model()
+    x = [model.add_var(var_type=BINARY, name=name) for name in catalog.names]
+    value_constraints = add_pizza_constraints(model, x, catalog, constraints_values, constraints_ingredients)
+    fat_scenarios = add_fat_chance_constraints(model, x, catalog, constraints_values, constraints_ingredients)
+    return PizzaModel(
+        model=model,
+        x=x,
+        catalog=catalog,
+        build_start=build_start,
+        price_bounds=constraints_values.price,
+        price_constraints=value_constraints["price"],
+        constraints_values=constraints_values,
+        constraints_ingredients=constraints_ingredients,
+        fat_scenarios=fat_scenarios,
+    )
+
+
+# one relaxation at a time redirects the standard output, see `_optimize_relaxation`
+_RELAXATION_OUTPUT_LOCK = threading.Lock()
+
+
+def _optimize_relaxation(model: Model) -> OptimizationStatus:
+    # solves the LP relaxation of the model. mip ignores verbose = 0 for relax=True and Clp writes its log
+    # to the file descriptor of the standard output, so a silent model has it sent to the null device. Other
+    # threads writing to the standard output during the solve lose their output
+    if model.verbose:
+        return model.optimize(relax=True)
+    with _RELAXATION_OUTPUT_LOCK, open(os.devnull, "w") as null:
+        sys.stdout.flush()
+        stdout = os.dup(1)
+        os.dup2(null.fileno(), 1)
+        try:
+            return model.optimize(relax=True)
+        finally:
+            os.dup2(stdout, 1)
+            os.close(stdout)
+
+
+def _optimize(model: Model, objective: str, build_start: float) -> SolverStats:
+    # solves the model and collects the solver statistics, the model building is timed from build_start
+    build_seconds = time.perf_counter() - build_start
+    record_phase("optimizer.build", build_seconds, objective=objective)
+
+    with phase("optimizer.solve", objective=objective):
+        solve_start = time.perf_counter()
+        model.optimize()
+        solve_seconds = time.perf_counter() - solve_start
+
+    has_solution = model.status in (OptimizationStatus.OPTIMAL, OptimizationStatus.FEASIBLE)
+    stats = SolverStats(
+        status=model.status.name,
+        build_seconds=build_seconds,
+        solve_seconds=solve_seconds,
+        # CBC does not report the number of explored nodes through mip
+        nodes=None,
+        gap=model.gap if has_solution else None,
+        objective_value=model.objective_value if has_solution else None,
+        objective_bound=model.objective_bound if has_solution else None,
+        num_vars=model.num_cols,
+        num_constraints=model.num_rows,
+    )
+    record_solver_stats(objective, stats)
+    return stats
+
+
+def _set_limits(model: Model, max_seconds: float, max_nodes: Optional[int], max_gap: Optional[float]) -> None:
+    # the limits of the next solve, the ones of a previous solve of a shared model are reset
+    if max_seconds < 0 or (max_nodes is not None and max_nodes < 0) or (max_gap is not None and max_gap < 0):
+        raise ValueError("the limits must not be negative")
+    # no limit is the largest float, CBC rejects inf (and prints so)
+    model.max_seconds = min(max_seconds, sys.float_info.max)
+    model.max_nodes = INT_MAX if max_nodes is None else max_nodes
+    model.max_mip_gap = _DEFAULT_GAP if max_gap is None else max_gap
+
+
+def _solve(
+    pizza_model: PizzaModel,
+    objective: str,
+    max_seconds: float = INF,
+    max_nodes: Optional[int] = None,
+    max_gap: Optional[float] = None,
+) -> Pizza:
+    _set_limits(pizza_model.model, max_seconds, max_nodes, max_gap)
+    deadline = time.perf_counter() + max_seconds
+    while True:
+        stats = _optimize(pizza_model.model, objective, pizza_model.build_start)
+        # a model solved again is only rebuilt from here on, e.g. with a new objective or new scenarios
+        pizza_model.build_start = time.perf_counter()
+        if pizza_model.model.status not in (OptimizationStatus.OPTIMAL, OptimizationStatus.FEASIBLE):
+            break
+        if not pizza_model.separate():
+            break
+        if time.perf_counter() >= deadline:
+            # the pizza violates the chance constraints, there is no time to solve again
+            raise PizzaOptimizationError("No pizza found -> the time ran out while adding fat scenarios", stats)
+        # the model with the added scenarios gets the rest of the time
+        pizza_model.model.max_seconds = min(deadline - time.perf_counter(), sys.float_info.max)
+
+    # check solution, a limit may stop the solver with a feasible pizza, whose optimality is not proven
+    status = pizza_model.model.status
+    if status in (OptimizationStatus.INFEASIBLE, OptimizationStatus.INT_INFEASIBLE):
+        raise InfeasiblePizzaError("The model is infeasible -> no pizza satisfies the constraints", stats)
+    if status not in (OptimizationStatus.OPTIMAL, OptimizationStatus.FEASIBLE):
+        raise PizzaOptimizationError(f"No pizza found -> the solver stopped with the status {status.name}", stats)
+
+    # solution, its status, gap and bound are in the solver stats
+    return pizza_model.pizza(solver_stats=stats)
+
+
+# the objectives of the pizza optimizer, named like the functions solving them
+OBJECTIVES = ["minimize_price", "maximize_taste_penalty_price"]
+# mip solves the model with CBC, heuristic returns the pizza of `maestro_pizza_maker.heuristic`
+# and warm_start solves the model with CBC starting from it
+SOLVERS = ["mip", "heuristic", "warm_start"]
+
+
+def set_objective(pizza_model: PizzaModel, objective: str, lambda_param: float = 0.5) -> np.ndarray:
+    """
+    Sets one of OBJECTIVES on a built model, replacing the previous one.
+    Returns the objective coefficients of the ingredients as costs to minimize, i.e. negated if maximized.
+    """
+    catalog = pizza_model.catalog
+    if objective == "minimize_price":
+        pizza_model.model.objective = minimize(LinExpr(pizza_model.x, pizza_model.prices.tolist()))
+        return pizza_model.prices
+    if objective == "maximize_taste_penalty_price":
+        # taste is a linear combination of the fats, its expectation is the weighted mean fat of the ingredients
+        # taste = 0.05 * fat_dough + 0.2 * fat_sauce + 0.3 * fat_cheese + 0.1 * fat_fruits + 0.3 * fat_meat + 0.05 * fat_vegetables
+        coefficients = catalog.expected_taste - lambda_param * pizza_model.prices
+        pizza_model.model.objective = maximize(LinExpr(pizza_model.x, coefficients.tolist()))
+        return -coefficients
+    raise ValueError(f"unknown objective {objective}, expected one of {OBJECTIVES}")
+
+
+def solve_objective(
+    pizza_model: PizzaModel,
+    objective: str,
+    lambda_param: float = 0.5,
+    max_seconds: float = INF,
+    max_nodes: Optional[int] = None,
+    max_gap: Optional[float] = None,
+    solver: str = "mip",
 ) -> Pizza:
     """
+    Sets one of OBJECTIVES on a built model and solves it. The objective replaces the previous one,
+    so that a model is built once for several objectives or values of lambda_param.
+    The prices are the ones set by `PizzaModel.set_price`, the catalog prices by default.
+
+    The solver stops at max_seconds, after max_nodes branch and bound nodes or at the relative gap max_gap,
+    the best pizza found so far is returned, its solver_stats tell the status (OPTIMAL or FEASIBLE), gap and bound.
+    Raises InfeasiblePizzaError if no pizza satisfies the constraints and PizzaOptimizationError
+    if no pizza was found within the limits.
+
+    The solver is one of SOLVERS. The heuristic searches for max_seconds (one second without a limit), its gap
+    is the one to the bound of the LP relaxation. The warm start gives CBC the rest of max_seconds.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver {solver}, expected one of {SOLVERS}")
+    if solver == "heuristic" and pizza_model.fat_scenarios is not None:
+        raise ValueError("the heuristic does not enforce the chance constraints, use the mip or warm_start solver")
+    if solver == "mip":
+        set_objective(pizza_model, objective, lambda_param)
+        return _solve(pizza_model, objective, max_seconds, max_nodes, max_gap)
+
+    from maestro_pizza_maker.heuristic import HeuristicOptions, heuristic_selection
+
+    options = HeuristicOptions() if max_seconds == INF else HeuristicOptions(max_seconds=max_seconds)
+    try:
+        selected, stats = heuristic_selection(pizza_model, objective, lambda_param, options)
+    except InfeasiblePizzaError:
+        raise
+    except PizzaOptimizationError:
+        if solver == "heuristic":
+            raise
+        # CBC starts without a pizza
+        selected, stats = [], None
+    if solver == "heuristic":
+        return Pizza.from_ingredients([pizza_model.catalog[i] for i in selected], solver_stats=stats)
+    pizza_model.model.start = [(pizza_model.x[i], 1.0) for i in selected]
+    if stats is not None and max_seconds != INF:
+        max_seconds = max(max_seconds - stats.solve_seconds, 0.0)
+    return _solve(pizza_model, objective, max_seconds, max_nodes, max_gap)
+
+
+def minimize_price(
+    constraints_values: PizzaConstraintsValues,
+    constraints_ingredients: PizzaConstraintsIngredients,
+    catalog: Optional[IngredientCatalog] = None,
+    max_seconds: float = INF,
+    max_nodes: Optional[int] = None,
+    max_gap: Optional[float] = None,
+    solver: str = "mip",
+) -> Pizza:
+    r"""
     Objective Function:
     \[
     \{minimize} \sum_{i=1}^{n} (x_i \cdot \{price}_i)
@@ -71,148 +555,13 @@ def minimize_price(
     - \( \{price}_i \), \( \{protein}_i \), etc., are properties of ingredient \( i \) (price, protein content, etc.).
     - \( \{constraints\_values.protein.min} \), \( \{constraints\_values.protein.max} \), etc., are the minimum and maximum constraints on nutritional values.
     - \( \{constraints\_ingredients.dough} \), etc., are the constraints on the number of ingredients of each type to include in the pizza.
-    """
-    model = Model()
-
-    # sets
-    ingredients = [ingredient for ingredient in PizzaIngredients]
-    ingredients_names = [ingredient.name for ingredient in ingredients]
-
-    # variables
-    x = [
-        model.add_var(var_type=INTEGER, lb=0, ub=1, name=ingredient)
-        for ingredient in ingredients_names
-    ]
-
-    # objective function
-    model.objective = minimize(
-        xsum(x[i] * ingredients[i].value.price for i in range(len(ingredients)))
-    )
-
-    # constraints
-    model += (
-        xsum(x[i] * ingredients[i].value.protein for i in range(len(ingredients)))
-        >= constraints_values.protein.min
-    )
-    model += (
-        xsum(x[i] * ingredients[i].value.protein for i in range(len(ingredients)))
-        <= constraints_values.protein.max
-    )
-    model += (
-        xsum(x[i] * ingredients[i].value.fat.mean() for i in range(len(ingredients)))
-        >= constraints_values.fat.min
-    )
-    model += (
-        xsum(x[i] * ingredients[i].value.fat.mean() for i in range(len(ingredients)))
-        <= constraints_values.fat.max
-    )
-    model += (
-        xsum(x[i] * ingredients[i].value.carbohydrates for i in range(len(ingredients)))
-        >= constraints_values.carbohydrates.min
-    )
-    model += (
-        xsum(x[i] * ingredients[i].value.carbohydrates for i in range(len(ingredients)))
-        <= constraints_values.carbohydrates.max
-    )
-    model += (
-        xsum(x[i] * ingredients[i].value.calories for i in range(len(ingredients)))
-        >= constraints_values.calories.min
-    )
-    model += (
-        xsum(x[i] * ingredients[i].value.calories for i in range(len(ingredients)))
-        <= constraints_values.calories.max
-    )
-
-    model += (
-        xsum(
-            x[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.DOUGH
-        )
-        == constraints_ingredients.dough
-    )
-    model += (
-        xsum(
-            x[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.SAUCE
-        )
-        == constraints_ingredients.sauce
-    )
-    model += (
-        xsum(
-            x[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.CHEESE
-        )
-        == constraints_ingredients.cheese
-    )
-    model += (
-        xsum(
-            x[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.MEAT
-        )
-        == constraints_ingredients.meat
-    )
-    model += (
-        xsum(
-            x[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.VEGETABLE
-        )
-        == constraints_ingredients.vegetables
-    )
-    model += (
-        xsum(
-            x[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.FRUIT
-        )
-        == constraints_ingredients.fruits
-    )
 
-    # optimize
-    model.optimize()
-
-    # check solution
-    if model.status != OptimizationStatus.OPTIMAL:
-        raise Exception(
-            "The model is not optimal -> likely no solution found (infeasible))"
-        )
-
-    # solution
-    return Pizza(
-        dough=[
-            ingredients[i].value
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.DOUGH and x[i].x == 1
-        ][0],
-        sauce=[
-            ingredients[i].value
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.SAUCE and x[i].x == 1
-        ],
-        cheese=[
-            ingredients[i].value
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.CHEESE and x[i].x == 1
-        ],
-        meat=[
-            ingredients[i].value
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.MEAT and x[i].x == 1
-        ],
-        vegetables=[
-            ingredients[i].value
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.VEGETABLE and x[i].x == 1
-        ],
-        fruits=[
-            ingredients[i].value
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.FRUIT and x[i].x == 1
-        ],
+    The ingredients are taken from the catalog, `PizzaIngredients` by default.
+    The limits max_seconds, max_nodes and max_gap, the solver and the errors are the ones of `solve_objective`.
+    """
+    pizza_model = build_pizza_model(constraints_values, constraints_ingredients, catalog)
+    return solve_objective(
+        pizza_model, "minimize_price", max_seconds=max_seconds, max_nodes=max_nodes, max_gap=max_gap, solver=solver
     )
 
 
@@ -220,9 +569,13 @@ def maximize_taste_penalty_price(
     constraints_values: PizzaConstraintsValues,
     constraints_ingredients: PizzaConstraintsIngredients,
     lambda_param: float = 0.5,
+    catalog: Optional[IngredientCatalog] = None,
+    max_seconds: float = INF,
+    max_nodes: Optional[int] = None,
+    max_gap: Optional[float] = None,
+    solver: str = "mip",
 ) -> Pizza:
-    
-    """
+    r"""
     Objective Function:
     \[
     \{maximize} \left( \sum_{i=1}^{n} \left( x_i \cdot \E({taste}_i) \right) - \lambda \cdot \left( \sum_{i=1}^{n} \left( x_i \cdot \{price}_i \right) \right) \right)
@@ -247,177 +600,11 @@ def maximize_taste_penalty_price(
     - \( \{price}_i \) is the price of ingredient \( i \).
     - \( \lambda \) is a parameter controlling the trade-off between taste and price (given as `lambda_param`).
     - \( \{constraints\_values} \) and \( \{constraints\_ingredients} \) represent the constraints on nutritional values and ingredient types, respectively.
-    """
-
-    # TODO: implement this function (description at the top of the file)
-    # recomendation: use latex notation to describe the suggested model
-    
-    model = Model()
-
-    # sets
-    ingredients = [ingredient for ingredient in PizzaIngredients]
-    ingredients_names = [ingredient.name for ingredient in ingredients]
-
-    # variables: 1. Variable Setup: The sets up variables for each ingredient in the pizza.
-    x = [
-        model.add_var(var_type=INTEGER, lb=0, ub=1, name=ingredient)
-        for ingredient in ingredients_names
-    ]
-
-    # 2.Taste Calculation: It calculates the taste of the pizza based on the fat content of each ingredient, 
-    # considering different types of ingredients (dough, sauce, cheese, etc.).
-    # REMAINDER: taste = 0.05 * fat_dough + 0.2 * fat_sauce + 0.3 * fat_cheese + 0.1 * fat_fruits + 0.3 * fat_meat + 0.05 * fat_vegetables
-    # taste is linear combination of normally distributed fats
-    taste = []
-    for ingredient in ingredients:
-        name = ingredient.value.type.value
-        if name == "dough":
-            taste.append(ingredient.value.fat * 0.05)
-        elif name == "sauce":
-            taste.append(ingredient.value.fat * 0.2) 
-        elif name == "cheese":
-            taste.append(ingredient.value.fat * 0.3)
-        elif name == "fruit":
-            taste.append(ingredient.value.fat * 0.1)
-        elif name == "meat":
-            taste.append(ingredient.value.fat * 0.05)
-        elif name == "vegetable":
-            taste.append(ingredient.value.fat * 0.05)
-
-    # 3. Objective set-up: The objective function aims to maximize the taste of the pizza
-    # minus a penalty term for its price, controlled by the parameter lambda_param (given from Maestro Pizza).
-    expected_tastes = np.average(taste, axis=1)
-    mean_pizza_taste = xsum(x[i] * expected_tastes[i] for i in range(len(expected_tastes)))
-    
-    #price as previous function
-    price = xsum(x[i] * ingredients[i].value.price for i in range(len(ingredients)))
-
-    # Objective function:
-    model.objective = maximize(mean_pizza_taste - lambda_param * price)
-
-    # 4. Constraint Setup: Constraints are added for various nutritional values (protein, fat, carbohydrates, calories) 
-    # and the quantities of different types of ingredients (dough, sauce, cheese, etc.).
-    model += (
-        xsum(x[i] * ingredients[i].value.protein for i in range(len(ingredients)))
-        >= constraints_values.protein.min
-    )
-    model += (
-        xsum(x[i] * ingredients[i].value.protein for i in range(len(ingredients)))
-        <= constraints_values.protein.max
-    )
-    model += (
-        xsum(x[i] * ingredients[i].value.fat.mean() for i in range(len(ingredients)))
-        >= constraints_values.fat.min
-    )
-    model += (
-        xsum(x[i] * ingredients[i].value.fat.mean() for i in range(len(ingredients)))
-        <= constraints_values.fat.max
-    )
-    model += (
-        xsum(x[i] * ingredients[i].value.carbohydrates for i in range(len(ingredients)))
-        >= constraints_values.carbohydrates.min
-    )
-    model += (
-        xsum(x[i] * ingredients[i].value.carbohydrates for i in range(len(ingredients)))
-        <= constraints_values.carbohydrates.max
-    )
-    model += (
-        xsum(x[i] * ingredients[i].value.calories for i in range(len(ingredients)))
-        >= constraints_values.calories.min
-    )
-    model += (
-        xsum(x[i] * ingredients[i].value.calories for i in range(len(ingredients)))
-        <= constraints_values.calories.max
-    )
 
-    model += (
-        xsum(
-            x[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.DOUGH
-        )
-        == constraints_ingredients.dough
-    )
-    model += (
-        xsum(
-            x[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.SAUCE
-        )
-        == constraints_ingredients.sauce
-    )
-    model += (
-        xsum(
-            x[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.CHEESE
-        )
-        == constraints_ingredients.cheese
-    )
-    model += (
-        xsum(
-            x[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.MEAT
-        )
-        == constraints_ingredients.meat
-    )
-    model += (
-        xsum(
-            x[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.VEGETABLE
-        )
-        == constraints_ingredients.vegetables
-    )
-    model += (
-        xsum(
-            x[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.FRUIT
-        )
-        == constraints_ingredients.fruits
-    )
-
-    # 5. Optimization of the Model
-    model.optimize()
-
-    # check solution
-    if model.status != OptimizationStatus.OPTIMAL:
-        raise Exception(
-            "The model is not optimal -> likely no solution found (infeasible))"
-        )
-
-    # 6. Solution Extraction: it returns a Pizza object containing the selected ingredients.
-    return Pizza(
-        dough=[
-            ingredients[i] 
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.DOUGH and x[i].x == 1
-        ][0],
-        sauce=[
-            ingredients[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.SAUCE and x[i].x == 1
-        ][0], 
-        cheese=[
-            ingredients[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.CHEESE and x[i].x == 1
-        ],
-        meat=[
-            ingredients[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.MEAT and x[i].x == 1
-        ],
-        vegetables=[
-            ingredients[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.VEGETABLE and x[i].x == 1
-        ],
-        fruits=[
-            ingredients[i]
-            for i in range(len(ingredients))
-            if ingredients[i].value.type == IngredientType.FRUIT and x[i].x == 1
-        ],
+    The ingredients are taken from the catalog, `PizzaIngredients` by default.
+    The limits max_seconds, max_nodes and max_gap, the solver and the errors are the ones of `solve_objective`.
+    """
+    pizza_model = build_pizza_model(constraints_values, constraints_ingredients, catalog)
+    return solve_objective(
+        pizza_model, "maximize_taste_penalty_price", lambda_param, max_seconds, max_nodes, max_gap, solver
     )
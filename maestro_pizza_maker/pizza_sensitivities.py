@@ -7,32 +7,54 @@
 # TODO: implement above mentioned sensitivities
 # hint: simple linear regression might be helpful
 
+from typing import List, Optional, Tuple
+
+from maestro_pizza_maker.pizza import Pizza
 from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.profiling import phase
+from maestro_pizza_maker.recipes import RecipePizzas
 import numpy as np
 from sklearn.linear_model import LinearRegression
 
+
+def _regression_points(menu: PizzaMenu) -> Tuple[List[Pizza], Optional[np.ndarray]]:
+    # the pizzas and their sample weights, a compressed menu fits every recipe once weighted by its copies
+    # (the same coefficients as fitting every copy)
+    if isinstance(menu.pizzas, RecipePizzas):
+        return menu.pizzas.recipes, menu.pizzas.weights
+    return menu.pizzas, None
+
 def menu_sensitivity_protein(menu: PizzaMenu) -> float:
     # TODO: implement according to the description above 
     assert isinstance(menu, PizzaMenu)
-    prices = np.array([pizza.price for pizza in menu.pizzas])
-    proteins = np.array([pizza.protein for pizza in menu.pizzas]).reshape(-1,1)
-    model = LinearRegression().fit(proteins, prices)
+    pizzas, weights = _regression_points(menu)
+    with phase("sensitivities.collect", attribute="protein"):
+        prices = np.array([pizza.price for pizza in pizzas])
+        proteins = np.array([pizza.protein for pizza in pizzas]).reshape(-1,1)
+    with phase("sensitivities.regression", attribute="protein"):
+        model = LinearRegression().fit(proteins, prices, sample_weight=weights)
     return model.coef_.item()
 
 
 def menu_sensitivity_carbs(menu: PizzaMenu) -> float:
     # TODO: implement according to the description above
     assert isinstance(menu, PizzaMenu)
-    prices = np.array([pizza.price for pizza in menu.pizzas])
-    carbs = np.array([pizza.carbohydrates for pizza in menu.pizzas]).reshape(-1,1)
-    model = LinearRegression().fit(carbs, prices)
+    pizzas, weights = _regression_points(menu)
+    with phase("sensitivities.collect", attribute="carbohydrates"):
+        prices = np.array([pizza.price for pizza in pizzas])
+        carbs = np.array([pizza.carbohydrates for pizza in pizzas]).reshape(-1,1)
+    with phase("sensitivities.regression", attribute="carbohydrates"):
+        model = LinearRegression().fit(carbs, prices, sample_weight=weights)
     return model.coef_.item()
 
 
 def menu_sensitivity_fat(menu: PizzaMenu) -> float:
     # TODO: implement according to the description above
     assert isinstance(menu, PizzaMenu)
-    prices = np.array([pizza.price for pizza in menu.pizzas])
-    fat = np.array([pizza.average_fat for pizza in menu.pizzas]).reshape(-1,1)
-    model = LinearRegression().fit(fat, prices)
+    pizzas, weights = _regression_points(menu)
+    with phase("sensitivities.collect", attribute="average_fat"):
+        prices = np.array([pizza.price for pizza in pizzas])
+        fat = np.array([pizza.average_fat for pizza in pizzas]).reshape(-1,1)
+    with phase("sensitivities.regression", attribute="average_fat"):
+        model = LinearRegression().fit(fat, prices, sample_weight=weights)
     return model.coef_.item()
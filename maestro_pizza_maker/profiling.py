@@ -0,0 +1,186 @@
+# Opt-in instrumentation of the maestro pizza maker.
+# Phases (model building, solving, taste aggregation, dataframe construction, ...) are timed and counters are
+# collected only while a sink is enabled, otherwise every hook is a single global lookup.
+#
+# usage:
+#   sink = InMemorySink()
+#   with profiling(sink):
+#       maximize_taste_penalty_price(...)
+#   sink.summary()
+
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+@dataclass
+class ProfileEvent:
+    kind: str  # "phase", "counter" or "solver"
+    name: str
+    value: Any
+    tags: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class SolverStats:
+    status: str
+    build_seconds: float
+    solve_seconds: float
+    nodes: Optional[int] = None
+    gap: Optional[float] = None
+    objective_value: Optional[float] = None
+    objective_bound: Optional[float] = None
+    num_vars: int = 0
+    num_constraints: int = 0
+
+
+class InMemorySink:
+    """
+    Keeps all events in a list, `summary` aggregates them per phase and counter.
+    """
+
+    def __init__(self) -> None:
+        self.events: List[ProfileEvent] = []
+
+    def record(self, event: ProfileEvent) -> None:
+        self.events.append(event)
+
+    def clear(self) -> None:
+        self.events.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        summary: Dict[str, Dict[str, float]] = {}
+        for event in self.events:
+            if event.kind == "phase":
+                entry = summary.setdefault(event.name, {"calls": 0, "seconds": 0.0})
+                entry["calls"] += 1
+                entry["seconds"] += event.value
+            elif event.kind == "counter":
+                entry = summary.setdefault(event.name, {"count": 0})
+                entry["count"] += event.value
+        return summary
+
+    @property
+    def solver_stats(self) -> List[SolverStats]:
+        return [event.value for event in self.events if event.kind == "solver"]
+
+
+class LoggingSink:
+    """
+    Writes every event to a logger.
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.DEBUG) -> None:
+        self.logger = logger or logging.getLogger("maestro_pizza_maker.profiling")
+        self.level = level
+
+    def record(self, event: ProfileEvent) -> None:
+        self.logger.log(self.level, "%s %s=%s %s", event.kind, event.name, event.value, event.tags)
+
+
+class CallbackSink:
+    """
+    Forwards every event to a callback.
+    """
+
+    def __init__(self, callback: Callable[[ProfileEvent], None]) -> None:
+        self.callback = callback
+
+    def record(self, event: ProfileEvent) -> None:
+        self.callback(event)
+
+
+_SINK = None
+
+
+def enable(sink=None):
+    """
+    Enables the instrumentation with the given sink (a new `InMemorySink` by default) and returns the sink.
+    """
+    global _SINK
+    _SINK = InMemorySink() if sink is None else sink
+    return _SINK
+
+
+def disable() -> None:
+    global _SINK
+    _SINK = None
+
+
+def is_enabled() -> bool:
+    return _SINK is not None
+
+
+@contextmanager
+def profiling(sink=None) -> Iterator[Any]:
+    """
+    Enables the instrumentation within the with block and restores the previous sink afterwards.
+    """
+    global _SINK
+    previous = _SINK
+    try:
+        yield enable(sink)
+    finally:
+        _SINK = previous
+
+
+class _Phase:
+    __slots__ = ("name", "tags", "start")
+
+    def __init__(self, name: str, tags: Dict[str, Any]) -> None:
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self) -> "_Phase":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        sink = _SINK
+        if sink is not None:
+            sink.record(ProfileEvent("phase", self.name, time.perf_counter() - self.start, self.tags))
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoPhase":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+def phase(name: str, **tags):
+    """
+    Context manager timing the phase `name`, does nothing while the instrumentation is disabled.
+    """
+    if _SINK is None:
+        return _NO_PHASE
+    return _Phase(name, tags)
+
+
+def record_phase(name: str, seconds: float, **tags) -> None:
+    """
+    Records a phase timed by the caller, e.g. when its start and end are not in one block.
+    """
+    sink = _SINK
+    if sink is not None:
+        sink.record(ProfileEvent("phase", name, seconds, tags))
+
+
+def count(name: str, value: float = 1, **tags) -> None:
+    sink = _SINK
+    if sink is not None:
+        sink.record(ProfileEvent("counter", name, value, tags))
+
+
+def record_solver_stats(name: str, stats: SolverStats, **tags) -> None:
+    sink = _SINK
+    if sink is not None:
+        sink.record(ProfileEvent("solver", name, stats, tags))
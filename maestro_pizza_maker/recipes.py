@@ -0,0 +1,175 @@
+# A generated menu holds many copies of the same pizzas, and every copy is stored and evaluated on its own.
+# The maestro pizza maker compresses such a menu into its distinct recipes and how many times each is on the menu:
+#
+#   - the recipe of a pizza is the multiset of its ingredients, see `Pizza.recipe`, so two pizzas with the same
+#     ingredients in another order are the same recipe
+#   - the compressed pizzas are still a sequence of pizzas, every recipe repeated as many times as it is on the menu,
+#     grouped by recipe in the order of the first copies. Adding a pizza adds a copy of its recipe, removing a pizza
+#     removes a copy
+#   - the aggregates are weighted by the copies instead of repeated: the menu taste (and the taste at risk) sums every
+#     recipe once times its copies, the sensitivities weight the recipes by their copies
+#   - a loaded menu is compressed from its ingredient indices, only the first copy of every recipe is created
+#
+# usage:
+#   compressed = menu.compress()  # or compress_menu(menu)
+#   compressed.pizzas.recipes, compressed.pizzas.multiplicities
+#   taste_at_risk_menu(compressed, 0.05)  # the same as taste_at_risk_menu(menu, 0.05)
+#   expanded = PizzaMenu(pizzas=list(compressed.pizzas))
+
+from collections.abc import MutableSequence
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from maestro_pizza_maker.persistence import StoredPizzas
+from maestro_pizza_maker.pizza import Pizza, Recipe
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.profiling import count, phase
+
+
+class RecipePizzas(MutableSequence):
+    """
+    The pizzas of a menu as its distinct recipes and the number of copies of every recipe. The pizzas are grouped
+    by recipe, so inserting a pizza adds a copy of its recipe wherever the index is.
+    """
+
+    def __init__(self, pizzas: Iterable[Pizza] = ()) -> None:
+        self.recipes: List[Pizza] = []  # the first copy of every recipe
+        self.multiplicities: List[int] = []
+        self._positions: Dict[Recipe, int] = {}
+        self._offsets: Optional[np.ndarray] = None  # the cumulative multiplicities, for the positional access
+        for pizza in pizzas:
+            self.add(pizza)
+
+    @property
+    def weights(self) -> np.ndarray:
+        # the multiplicities of the recipes as an array
+        return np.asarray(self.multiplicities, dtype=np.int64)
+
+    def add(self, pizza: Pizza, copies: int = 1) -> None:
+        # adds copies of the recipe of the pizza
+        if copies < 1:
+            raise ValueError("copies must be positive")
+        recipe = pizza.recipe
+        position = self._positions.get(recipe)
+        if position is None:
+            self._positions[recipe] = len(self.recipes)
+            self.recipes.append(pizza)
+            self.multiplicities.append(copies)
+        else:
+            self.multiplicities[position] += copies
+        self._offsets = None
+
+    def _discard(self, position: int) -> None:
+        # removes a copy of the recipe at the position, the recipe is dropped with its last copy
+        self._offsets = None
+        self.multiplicities[position] -= 1
+        if self.multiplicities[position]:
+            return
+        del self._positions[self.recipes[position].recipe]
+        del self.recipes[position], self.multiplicities[position]
+        for recipe, later in self._positions.items():
+            if later > position:
+                self._positions[recipe] = later - 1
+
+    def _recipe_position(self, index: int) -> int:
+        if self._offsets is None:
+            self._offsets = np.cumsum(self.multiplicities, dtype=np.int64)
+        n_pizzas = int(self._offsets[-1]) if len(self._offsets) else 0
+        if not -n_pizzas <= index < n_pizzas:
+            raise IndexError(index)
+        return int(np.searchsorted(self._offsets, index % n_pizzas, side="right"))
+
+    def __len__(self) -> int:
+        return sum(self.multiplicities)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[p] for p in range(*index.indices(len(self)))]
+        return self.recipes[self._recipe_position(index)]
+
+    def __iter__(self) -> Iterator[Pizza]:
+        for pizza, multiplicity in zip(self.recipes, self.multiplicities):
+            for _ in range(multiplicity):
+                yield pizza
+
+    def __contains__(self, pizza: object) -> bool:
+        return isinstance(pizza, Pizza) and pizza.recipe in self._positions
+
+    def __setitem__(self, index, pizza) -> None:
+        if isinstance(index, slice):
+            raise TypeError("the pizzas of a compressed menu are replaced one at a time")
+        del self[index]
+        self.add(pizza)
+
+    def __delitem__(self, index) -> None:
+        if isinstance(index, slice):
+            # the copies of the later positions first, so that the earlier positions do not move
+            for p in sorted(range(*index.indices(len(self))), reverse=True):
+                self._discard(self._recipe_position(p))
+            return
+        self._discard(self._recipe_position(index))
+
+    def insert(self, index: int, pizza: Pizza) -> None:
+        self.add(pizza)
+
+    def index(self, pizza: Pizza, start: int = 0, stop: Optional[int] = None) -> int:
+        # the position of the first copy of the recipe of the pizza
+        position = self._positions.get(pizza.recipe)
+        first = sum(self.multiplicities[:position]) if position is not None else None
+        if first is None or first < start or (stop is not None and first >= stop):
+            raise ValueError("the pizza is not on the menu")
+        return first
+
+    def count(self, pizza: Pizza) -> int:
+        position = self._positions.get(pizza.recipe)
+        return 0 if position is None else self.multiplicities[position]
+
+    def remove(self, pizza: Pizza) -> None:
+        # removes a copy of the recipe of the pizza, whatever the order of its ingredients
+        position = self._positions.get(pizza.recipe)
+        if position is None:
+            raise ValueError("the pizza is not on the menu")
+        self._discard(position)
+
+    def __repr__(self) -> str:
+        return f"RecipePizzas({len(self)} pizzas, {len(self.recipes)} recipes)"
+
+    def menu_taste(self) -> np.ndarray:
+        # the sum of the tastes of all pizzas, every recipe once times its copies
+        return sum(multiplicity * pizza.taste for pizza, multiplicity in zip(self.recipes, self.multiplicities))
+
+
+def _stored_recipes(pizzas: StoredPizzas) -> RecipePizzas:
+    # the rows of the ingredient indices are sorted, so that the same recipes have the same bytes
+    rows = np.repeat(np.arange(len(pizzas)), np.diff(pizzas.indptr))
+    indices = np.asarray(pizzas.indices, dtype=np.int64)
+    ordered = indices[np.lexsort((indices, rows))]
+    positions: Dict[bytes, int] = {}
+    firsts: List[int] = []  # the first pizza of every recipe
+    multiplicities: List[int] = []
+    for p in range(len(pizzas)):
+        position = positions.setdefault(ordered[pizzas.indptr[p] : pizzas.indptr[p + 1]].tobytes(), len(positions))
+        if position == len(firsts):
+            firsts.append(p)
+            multiplicities.append(1)
+        else:
+            multiplicities[position] += 1
+    recipes = RecipePizzas()
+    for p, multiplicity in zip(firsts, multiplicities):
+        recipes.add(pizzas[p], multiplicity)
+    return recipes
+
+
+def compress_menu(menu: PizzaMenu) -> PizzaMenu:
+    """
+    Returns the menu with the same pizzas as `RecipePizzas`, its distinct recipes and their copies.
+    """
+    pizzas = menu.pizzas
+    with phase("recipes.compress", pizzas=len(pizzas)):
+        if isinstance(pizzas, StoredPizzas) and not pizzas.materialized:
+            recipes = _stored_recipes(pizzas)
+        else:
+            recipes = RecipePizzas(pizzas)
+    count("recipes.recipes", len(recipes.recipes))
+    return PizzaMenu(pizzas=recipes)
@@ -0,0 +1,215 @@
+# The taste at risk and the conditional taste at risk are estimated from a finite number of fat scenarios,
+# the maestro pizza maker wants to know how far the estimates can be off. Two confidence intervals are offered:
+#
+#   - "bootstrap": the percentile interval of the measure over resamples of the scenarios (TaR and CTaR)
+#   - "order_statistic": the distribution-free interval of a quantile between two order statistics
+#     of the sorted tastes, whose ranks follow from the binomial distribution (TaR only)
+#
+# A bootstrap resample of n scenarios is drawn as n ranks of the sorted tastes. The resampled quantile depends
+# only on the k-th and (k+1)-th smallest drawn rank, and the resampled tail on the drawn ranks up to the k-th one,
+# so the same rank draws serve all pizzas: the resampled TaR of every pizza is a lookup in its sorted tastes
+# and the resampled tail sums of all pizzas are one matrix product of the sorted tastes with the rank counts.
+# The pizzas are processed in blocks, optionally on several threads, the results do not depend on the threads.
+#
+# usage:
+#   taste_at_risk_pizza(pizza, 0.05, interval=IntervalOptions(confidence=0.9))  # RiskInterval(estimate, low, high)
+#   risk_intervals(menu, [0.01, 0.05], measure="ctar", options=IntervalOptions(n_workers=4))
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from maestro_pizza_maker.catalog import IngredientCatalog
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.profiling import count, phase
+
+INTERVAL_METHODS = ["bootstrap", "order_statistic"]
+RISK_MEASURES = ["tar", "ctar"]
+
+
+@dataclass
+class IntervalOptions:
+    confidence: float = 0.95
+    method: str = "bootstrap"
+    n_resamples: int = 1000
+    seed: Optional[int] = None
+    n_workers: int = 1
+
+    def __post_init__(self) -> None:
+        if not 0 < self.confidence < 1:
+            raise ValueError("the confidence must be between 0 and 1")
+        if self.method not in INTERVAL_METHODS:
+            raise ValueError(f"unknown interval method {self.method}, expected one of {INTERVAL_METHODS}")
+        if self.n_resamples < 1 or self.n_workers < 1:
+            raise ValueError("n_resamples and n_workers must be positive")
+
+
+@dataclass
+class RiskInterval:
+    # floats for one taste vector, (pizzas x quantiles) arrays for `risk_intervals`
+    estimate: Union[float, np.ndarray]
+    low: Union[float, np.ndarray]
+    high: Union[float, np.ndarray]
+
+
+@dataclass
+class _Resamples:
+    # the rank draws of the bootstrap for one quantile, shared by all pizzas
+    lower: np.ndarray  # (resamples,) the rank of the k-th smallest draw
+    upper: np.ndarray  # (resamples,) the rank of the (k+1)-th smallest draw
+    fraction: float  # the interpolation between them, as in np.quantile
+    tail: np.ndarray  # (scenarios x resamples) how many times each rank is drawn into the tail
+
+
+def _position(n_scenarios: int, quantile: float) -> Tuple[int, int, float]:
+    # the ranks and the weight of the linear interpolation of np.quantile
+    position = (n_scenarios - 1) * quantile
+    k = int(np.floor(position))
+    return k, min(k + 1, n_scenarios - 1), position - k
+
+
+def _resamples(n_scenarios: int, quantiles: Sequence[float], options: IntervalOptions, dtype) -> List[_Resamples]:
+    rng = np.random.default_rng(options.seed)
+    draws = rng.integers(0, n_scenarios, size=(options.n_resamples, n_scenarios))
+    offsets = np.arange(options.n_resamples)[:, None] * n_scenarios
+    counts = np.bincount((draws + offsets).ravel(), minlength=options.n_resamples * n_scenarios)
+    counts = counts.reshape(options.n_resamples, n_scenarios)
+    ranks = np.arange(n_scenarios)
+
+    resamples = []
+    for quantile in quantiles:
+        k, k_next, fraction = _position(n_scenarios, quantile)
+        ordered = np.partition(draws, [k, k_next], axis=1)
+        lower, upper = ordered[:, k], ordered[:, k_next]
+        tail = (counts * (ranks[None, :] <= lower[:, None])).T.astype(dtype)
+        resamples.append(_Resamples(lower, upper, fraction, tail))
+    return resamples
+
+
+def _order_statistic_ranks(n_scenarios: int, quantile: float, confidence: float) -> Tuple[int, int]:
+    # the number of scenarios below the true quantile is binomial(n, quantile), the interval between the
+    # order statistics l and u (0-based) covers the quantile with at least the confidence (up to the ends)
+    alpha = 1 - confidence
+    k = np.arange(n_scenarios)
+    with np.errstate(divide="ignore"):
+        log_ratio = np.log(n_scenarios - k) - np.log(k + 1) + np.log(quantile) - np.log1p(-quantile)
+    log_pmf = np.concatenate([[n_scenarios * np.log1p(-quantile)], n_scenarios * np.log1p(-quantile) + np.cumsum(log_ratio)])
+    cdf = np.cumsum(np.exp(log_pmf - log_pmf.max()))
+    cdf /= cdf[-1]
+    low = max(int(np.searchsorted(cdf, alpha / 2, side="right")), 1) - 1
+    high = min(int(np.searchsorted(cdf, 1 - alpha / 2, side="left")) + 1, n_scenarios) - 1
+    return low, high
+
+
+def _intervals_block(
+    tastes: np.ndarray, quantiles: Sequence[float], measure: str, options: IntervalOptions,
+    resamples: Optional[List[_Resamples]],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ordered = np.sort(tastes, axis=1)
+    n_scenarios = ordered.shape[1]
+    shape = (len(ordered), len(quantiles))
+    estimate, low, high = np.empty(shape), np.empty(shape), np.empty(shape)
+    bounds = [(1 - options.confidence) / 2, (1 + options.confidence) / 2]
+    for q, quantile in enumerate(quantiles):
+        k, k_next, fraction = _position(n_scenarios, quantile)
+        tar = ordered[:, k] + fraction * (ordered[:, k_next] - ordered[:, k])
+        if measure == "tar":
+            estimate[:, q] = tar
+        else:
+            tail = ordered <= tar[:, None]
+            estimate[:, q] = (ordered * tail).sum(axis=1) / tail.sum(axis=1)
+
+        if options.method == "order_statistic":
+            lowest, highest = _order_statistic_ranks(n_scenarios, quantile, options.confidence)
+            low[:, q], high[:, q] = ordered[:, lowest], ordered[:, highest]
+            continue
+        resample = resamples[q]
+        if measure == "tar":
+            replicates = ordered[:, resample.lower] + resample.fraction * (
+                ordered[:, resample.upper] - ordered[:, resample.lower]
+            )
+        else:
+            replicates = (ordered @ resample.tail) / resample.tail.sum(axis=0)
+        low[:, q], high[:, q] = np.quantile(replicates, bounds, axis=1)
+    return estimate, low, high
+
+
+def _intervals(
+    blocks, n_pizzas: int, n_scenarios: int, dtype, quantiles: Sequence[float], measure: str,
+    options: IntervalOptions,
+) -> RiskInterval:
+    if measure not in RISK_MEASURES:
+        raise ValueError(f"unknown measure {measure}, expected one of {RISK_MEASURES}")
+    if options.method == "order_statistic" and measure != "tar":
+        raise ValueError("the order statistic interval is a quantile interval, it is available for tar only")
+    # We focus on the left tail of the taste distribution.
+    quantiles = [1 - quantile if quantile > 0.5 else quantile for quantile in quantiles]
+
+    resamples = None
+    if options.method == "bootstrap":
+        count("risk_intervals.resamples", options.n_resamples)
+        with phase("risk_intervals.resample", scenarios=n_scenarios):
+            resamples = _resamples(n_scenarios, quantiles, options, dtype)
+
+    shape = (n_pizzas, len(quantiles))
+    estimate, low, high = np.empty(shape), np.empty(shape), np.empty(shape)
+
+    def run(block) -> None:
+        start, stop, tastes = block
+        estimate[start:stop], low[start:stop], high[start:stop] = _intervals_block(
+            tastes, quantiles, measure, options, resamples
+        )
+
+    with phase("risk_intervals.intervals", pizzas=n_pizzas, workers=options.n_workers):
+        if options.n_workers == 1:
+            for block in blocks:
+                run(block)
+        else:
+            # at most two blocks per worker are computed ahead, the tastes of a large menu do not fit in memory
+            with ThreadPoolExecutor(options.n_workers) as executor:
+                pending = []
+                for block in blocks:
+                    pending.append(executor.submit(run, block))
+                    if len(pending) >= 2 * options.n_workers:
+                        pending.pop(0).result()
+                for future in pending:
+                    future.result()
+    return RiskInterval(estimate=estimate, low=low, high=high)
+
+
+def taste_interval(taste: np.ndarray, quantile: float, measure: str, options: IntervalOptions) -> RiskInterval:
+    """
+    The estimate and the confidence interval of the taste at risk ("tar") or the conditional taste at risk
+    ("ctar") of one taste vector.
+    """
+    taste = np.asarray(taste)
+    interval = _intervals(
+        iter([(0, 1, taste[None, :])]), 1, len(taste), taste.dtype, [quantile], measure, options
+    )
+    return RiskInterval(
+        estimate=float(interval.estimate[0, 0]), low=float(interval.low[0, 0]), high=float(interval.high[0, 0])
+    )
+
+
+def risk_intervals(
+    menu: PizzaMenu,
+    quantiles: Sequence[float],
+    measure: str = "tar",
+    options: Optional[IntervalOptions] = None,
+    catalog: Optional[IngredientCatalog] = None,
+) -> RiskInterval:
+    """
+    The estimates and the confidence intervals of the taste at risk ("tar") or the conditional taste at risk
+    ("ctar") of every pizza of the menu at every quantile, as (pizzas x quantiles) arrays. The catalog
+    of the menu ingredients is the one of its pizzas by default, see `PizzaMenu.ingredient_catalog`.
+    """
+    options = IntervalOptions() if options is None else options
+    catalog = menu.ingredient_catalog() if catalog is None else catalog
+    indptr, indices = menu.ingredient_indices(catalog)
+    # the blocks are small enough for the (pizzas x resamples) replicates of every quantile
+    blocks = catalog.taste_blocks(indptr, indices, block_size=2**20)
+    return _intervals(
+        blocks, len(indptr) - 1, catalog.n_scenarios, catalog.fat.dtype, list(quantiles), measure, options
+    )
@@ -1,28 +1,153 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence, Union
+
 import numpy as np
 
+# The precision of the fat scenarios. The quantiles of the taste do not need float64, float32 halves the memory
+# and the bandwidth of every scenario vector. The fat of the ingredients, the taste of the pizzas and menus and
+# the risk measures keep the dtype of the scenarios. Set the environment variable before the first import,
+# e.g. MAESTRO_FAT_DTYPE=float32
+FAT_DTYPE_VARIABLE = "MAESTRO_FAT_DTYPE"
+FAT_DTYPES = ["float32", "float64"]
+N_SCENARIOS = 1000
+
+# The fat scenarios are drawn from a fixed seed, so that every process (e.g. the workers of a pool) importing
+# the package evaluates the pizzas on the same scenarios. Another seed can be set before the first import,
+# e.g. MAESTRO_FAT_SEED=7. The mean and the covariance are drawn from one stream of the seed and every chunk
+# of scenarios from its own stream, so the scenarios do not depend on how many threads draw them.
+FAT_SEED_VARIABLE = "MAESTRO_FAT_SEED"
+DEFAULT_FAT_SEED = 2023
+CHUNK_SCENARIOS = 2**16
+_PARAMETER_STREAM, _SCENARIO_STREAM = 0, 1
+
+# The workers of a pool started by `maestro_pizza_maker.shared.shared_pool` do not draw the scenarios at all,
+# they attach to the scenarios published by the parent in a shared memory segment. The pool sets the environment
+# variable to the segment before the workers import the package, MAESTRO_SHARED_FAT=<segment>:<dtype>:<shape>
+SHARED_FAT_VARIABLE = "MAESTRO_SHARED_FAT"
+# the segments attached by this process, they stay open as long as the process
+_ATTACHED_SEGMENTS: List[shared_memory.SharedMemory] = []
+
 
-def _generate_positive_semi_definite_matrix(dim: int) -> np.array:
+def fat_dtype(dtype: Optional[Union[str, np.dtype]] = None) -> np.dtype:
+    """
+    Returns the dtype of the fat scenarios, the given one or the one of the environment variable, float64 by default.
+    """
+    if dtype is None:
+        dtype = os.environ.get(FAT_DTYPE_VARIABLE, "float64")
+    dtype = np.dtype(dtype)
+    if dtype.name not in FAT_DTYPES:
+        raise ValueError(f"unsupported fat dtype {dtype.name}, expected one of {FAT_DTYPES}")
+    return dtype
+
+
+def fat_seed(seed: Optional[int] = None) -> int:
+    """
+    Returns the seed of the fat scenarios, the given one or the one of the environment variable, DEFAULT_FAT_SEED by default.
+    """
+    if seed is None:
+        seed = int(os.environ.get(FAT_SEED_VARIABLE, DEFAULT_FAT_SEED))
+    return seed
+
+
+def _generate_positive_semi_definite_matrix(dim: int, rng: np.random.Generator) -> np.array:
     """
     Generates a positive semi-definite matrix of dimension dim to be used as a covariance matrix.
     """
-    dummy_matrix = np.random.rand(dim, dim)
+    dummy_matrix = rng.random((dim, dim))
     return np.dot(dummy_matrix, dummy_matrix.transpose())
 
 
-def _generate_normal_vector(dim: int) -> np.array:
+def _generate_normal_vector(dim: int, rng: np.random.Generator) -> np.array:
     """
     Generates a vector of dimension dim with values from a normal distribution.
     """
-    return np.random.normal(size=dim, loc=30, scale=5).clip(min=1)
+    return rng.normal(size=dim, loc=30, scale=5).clip(min=1)
+
+
+def _covariance_factor(cov: np.ndarray) -> np.ndarray:
+    # L with L @ L.T == cov, a singular covariance is factored by its eigenvalues
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(cov)
+        return vectors * np.sqrt(values.clip(min=0))
+
+
+def multivariate_normal_scenarios(
+    mean: np.ndarray,
+    cov: np.ndarray,
+    n_scenarios: int,
+    seed: Optional[int] = None,
+    n_workers: int = 1,
+    dtype: Optional[Union[str, np.dtype]] = None,
+) -> np.ndarray:
+    """
+    Draws n_scenarios vectors from the multivariate normal distribution as a (scenarios x dim) matrix in the fat dtype,
+    clipped at 0.1. The covariance is factored once and the chunks of CHUNK_SCENARIOS scenarios are drawn
+    on n_workers threads, the result depends only on the seed.
+    """
+    if n_workers < 1:
+        raise ValueError("n_workers must be positive")
+    mean = np.asarray(mean, dtype=np.float64)
+    factor = _covariance_factor(np.asarray(cov, dtype=np.float64))
+    entropy = fat_seed(seed)
+    scenarios = np.empty((n_scenarios, len(mean)), dtype=fat_dtype(dtype))
+
+    def draw(chunk: int) -> None:
+        start = chunk * CHUNK_SCENARIOS
+        stop = min(start + CHUNK_SCENARIOS, n_scenarios)
+        rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(_SCENARIO_STREAM, chunk)))
+        correlated = rng.standard_normal((stop - start, len(mean))) @ factor.T
+        correlated += mean
+        np.maximum(correlated, 0.1, out=scenarios[start:stop])
+
+    chunks = range(-(-n_scenarios // CHUNK_SCENARIOS))
+    if n_workers == 1:
+        for chunk in chunks:
+            draw(chunk)
+    else:
+        with ThreadPoolExecutor(n_workers) as executor:
+            list(executor.map(draw, chunks))
+    return scenarios
 
 
-def _generate_multivariate_normal_vector(dim: int) -> np.array:
+def _generate_multivariate_normal_vector(
+    dim: int,
+    n_scenarios: int = N_SCENARIOS,
+    dtype: Optional[Union[str, np.dtype]] = None,
+    seed: Optional[int] = None,
+    n_workers: int = 1,
+) -> np.array:
     """
-    Generates a vector of dimension dim with values from a multivariate normal distribution.
+    Generates n_scenarios vectors of dimension dim with values from a multivariate normal distribution.
+    The mean and the covariance are drawn from the seed, the drawings are made in float64 and stored in the fat dtype.
     """
-    mean = _generate_normal_vector(dim)
-    cov = _generate_positive_semi_definite_matrix(dim)
-    return np.random.multivariate_normal(mean, cov, 1000).clip(min=0.1)
+    rng = np.random.default_rng(np.random.SeedSequence(fat_seed(seed), spawn_key=(_PARAMETER_STREAM,)))
+    mean = _generate_normal_vector(dim, rng)
+    cov = _generate_positive_semi_definite_matrix(dim, rng)
+    return multivariate_normal_scenarios(mean, cov, n_scenarios, seed, n_workers, dtype)
+
+
+def attach_shared_array(name: str, shape: Sequence[int], dtype: Union[str, np.dtype]) -> np.ndarray:
+    """
+    Returns a read-only array on the shared memory segment, without copying it.
+    """
+    segment = shared_memory.SharedMemory(name=name)
+    _ATTACHED_SEGMENTS.append(segment)
+    array = np.ndarray(tuple(shape), dtype=dtype, buffer=segment.buf)
+    array.flags.writeable = False
+    return array
+
+
+def _fat_simulations() -> np.ndarray:
+    # the published scenarios of the parent process or the drawn ones, (ingredients x scenarios)
+    spec = os.environ.get(SHARED_FAT_VARIABLE)
+    if spec:
+        name, dtype, shape = spec.split(":")
+        return attach_shared_array(name, [int(n) for n in shape.split("x")], fat_dtype(dtype))
+    return _generate_multivariate_normal_vector(16).transpose()
 
 
-FAT_SIMULATIONS = _generate_multivariate_normal_vector(16).transpose()
+FAT_SIMULATIONS = _fat_simulations()
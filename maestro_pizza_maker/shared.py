@@ -0,0 +1,139 @@
+# When the maestro pizza maker fans work out over `multiprocessing`, every worker imports the package and draws
+# the fat scenarios of `PizzaIngredients` again, and every worker holds its own copy of the catalog it evaluates.
+# Instead the parent publishes them once into shared memory segments, that the workers attach to without copying:
+#
+#   - `publish_catalog` copies the columns of a catalog (see `IngredientCatalog.to_arrays`) into one segment each
+#     and returns a picklable `SharedCatalog`, the names, shapes and dtypes of the segments
+#   - `SharedCatalog.attach` creates a catalog on read-only views of the segments
+#   - `shared_pool` starts a pool, whose workers attach to the fat scenarios of the parent when they import the
+#     package (see `SHARED_FAT_VARIABLE`) and to the catalog in their initializer, `worker_catalog` returns it.
+#     The segments are unlinked when the pool is closed
+#
+# The memory of the scenarios and the catalog does not grow with the number of workers.
+#
+# usage:
+#   with shared_pool(8, catalog) as pool:
+#       results = pool.map(evaluate, chunks)  # evaluate calls worker_catalog()
+
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from multiprocessing import get_context, shared_memory
+from multiprocessing.pool import Pool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from maestro_pizza_maker.catalog import IngredientCatalog, default_catalog
+from maestro_pizza_maker.profiling import count, phase
+from maestro_pizza_maker.sand_box.fat_generator import (
+    FAT_SIMULATIONS,
+    SHARED_FAT_VARIABLE,
+    attach_shared_array,
+)
+
+# the catalog attached by the initializer of this worker
+_WORKER_CATALOG: Optional[IngredientCatalog] = None
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    name: str  # of the shared memory segment
+    shape: Tuple[int, ...]
+    dtype: str
+
+    @property
+    def spec(self) -> str:
+        # the value of `SHARED_FAT_VARIABLE`
+        return f"{self.name}:{self.dtype}:{'x'.join(str(n) for n in self.shape)}"
+
+    def attach(self) -> np.ndarray:
+        return attach_shared_array(self.name, self.shape, self.dtype)
+
+
+@dataclass(frozen=True)
+class SharedCatalog:
+    columns: Dict[str, SharedArray]
+
+    def attach(self) -> IngredientCatalog:
+        return IngredientCatalog.from_arrays({column: array.attach() for column, array in self.columns.items()})
+
+
+class SharedSegments:
+    """
+    The shared memory segments published by this process, unlinked by `close`.
+    """
+
+    def __init__(self) -> None:
+        self.segments: List[shared_memory.SharedMemory] = []
+
+    def publish(self, array: np.ndarray) -> SharedArray:
+        # a copy of the array in a new segment (of at least one byte, empty segments are not allowed)
+        segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.segments.append(segment)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+        count("shared.bytes", array.nbytes)
+        return SharedArray(segment.name, array.shape, array.dtype.str)
+
+    def publish_catalog(self, catalog: IngredientCatalog) -> SharedCatalog:
+        return SharedCatalog({column: self.publish(array) for column, array in catalog.to_arrays().items()})
+
+    def close(self) -> None:
+        for segment in self.segments:
+            segment.close()
+            segment.unlink()
+        self.segments = []
+
+
+def publish_catalog(catalog: IngredientCatalog, segments: SharedSegments) -> SharedCatalog:
+    """
+    Publishes the columns of the catalog into new segments of `segments`, that are unlinked when they are closed.
+    """
+    with phase("shared.publish", ingredients=len(catalog), scenarios=catalog.n_scenarios):
+        return segments.publish_catalog(catalog)
+
+
+def attach_worker(catalog: Optional[SharedCatalog]) -> None:
+    """
+    The initializer of the workers of `shared_pool`, attaches the worker to the published catalog.
+    """
+    global _WORKER_CATALOG
+    _WORKER_CATALOG = catalog.attach() if catalog is not None else None
+
+
+def worker_catalog() -> IngredientCatalog:
+    """
+    Returns the catalog attached by `attach_worker`, the catalog of `PizzaIngredients` if none was published.
+    """
+    return _WORKER_CATALOG if _WORKER_CATALOG is not None else default_catalog()
+
+
+@contextmanager
+def shared_pool(
+    n_workers: int, catalog: Optional[IngredientCatalog] = None, start_method: Optional[str] = None
+) -> Iterator[Pool]:
+    """
+    Starts a pool of n_workers processes attached to the fat scenarios of `PizzaIngredients` and to the catalog,
+    published in shared memory. The pool is terminated and the segments are unlinked on exit.
+    """
+    if n_workers < 1:
+        raise ValueError("n_workers must be positive")
+    segments = SharedSegments()
+    previous = os.environ.get(SHARED_FAT_VARIABLE)
+    try:
+        fat = segments.publish(np.ascontiguousarray(FAT_SIMULATIONS))
+        shared_catalog = publish_catalog(catalog, segments) if catalog is not None else None
+        # the workers started by the pool (also the replacements of failed workers) inherit the variable
+        os.environ[SHARED_FAT_VARIABLE] = fat.spec
+        pool = get_context(start_method).Pool(n_workers, initializer=attach_worker, initargs=(shared_catalog,))
+        try:
+            yield pool
+        finally:
+            pool.terminate()
+            pool.join()
+    finally:
+        if previous is None:
+            os.environ.pop(SHARED_FAT_VARIABLE, None)
+        else:
+            os.environ[SHARED_FAT_VARIABLE] = previous
+        segments.close()
@@ -0,0 +1,206 @@
+# The maestro pizza maker prunes his menu of pizzas, that taste (nearly) the same in every scenario distribution.
+# Comparing the taste vectors of all pairs of pizzas is too slow for a large menu, the index compares signatures:
+#
+#   - the signature of a pizza is its taste at n_quantiles evenly spaced quantiles, the mean absolute difference
+#     of two signatures approximates the Wasserstein-1 distance of the taste distributions
+#   - the mean of a signature is the mean of the quantiles, two signatures are at least as far apart as their means,
+#     so the signatures are sorted by their means and a query only compares the pizzas with close means
+#   - near duplicates are found along the sorted means as well, every pizza is compared with the following ones
+#     until the means are further apart than the radius. The sums of a few groups of quantiles (divided by
+#     n_quantiles) are a tighter bound than the mean, most candidates are rejected by them before the signatures
+#     are compared
+#
+# usage:
+#   index = menu.taste_index()
+#   positions, distances = index.knn(pizza.taste, k=5)
+#   redundant = index.duplicates(radius=0.1)  # all but the first pizza of every group of near duplicates
+
+from typing import Tuple
+
+import numpy as np
+
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.profiling import count, phase
+
+# the signatures of the menu are computed in blocks of about this many taste values
+_SIGNATURE_BLOCK = 2**22
+# the candidates of a k-nearest-neighbour query are compared in batches of at least this size
+_KNN_BATCH = 64
+# the number of groups of quantiles of the coarse signatures
+_COARSE_GROUPS = 4
+
+
+def quantile_levels(n_quantiles: int) -> np.ndarray:
+    # the midpoints of n_quantiles equal probability intervals
+    return (np.arange(n_quantiles) + 0.5) / n_quantiles
+
+
+def taste_signatures(tastes: np.ndarray, n_quantiles: int) -> np.ndarray:
+    """
+    Returns the (pizzas x n_quantiles) signatures of the (pizzas x scenarios) tastes, their quantiles
+    at `quantile_levels` interpolated as np.quantile does. Sorting the rows is faster than selecting many quantiles.
+    """
+    ordered = np.sort(tastes, axis=1)
+    position = quantile_levels(n_quantiles) * (ordered.shape[1] - 1)
+    below = np.floor(position).astype(np.intp)
+    above = np.minimum(below + 1, ordered.shape[1] - 1)
+    lower = ordered[:, below].astype(np.float64)
+    return lower + (position - below) * (ordered[:, above] - lower)
+
+
+class TasteSimilarityIndex:
+    """
+    An index of the taste distributions of the pizzas of a menu, built from their quantile signatures.
+    The distance of two pizzas is the mean absolute difference of their signatures, about the Wasserstein-1
+    distance of their tastes. The queries return positions in the menu.
+    """
+
+    def __init__(self, signatures: np.ndarray) -> None:
+        signatures = np.asarray(signatures, dtype=np.float64)
+        if signatures.ndim != 2 or signatures.shape[1] == 0:
+            raise ValueError("the signatures must be a (pizzas x quantiles) matrix")
+        means = signatures.mean(axis=1)
+        self.order = np.argsort(means, kind="stable")
+        self.means = means[self.order]
+        self.signatures = np.ascontiguousarray(signatures[self.order])
+        self.n_quantiles = signatures.shape[1]
+        # the mean absolute difference of two signatures is at least the sum of the absolute differences of these
+        starts = np.linspace(0, self.n_quantiles, min(_COARSE_GROUPS, self.n_quantiles) + 1).astype(np.intp)[:-1]
+        self.coarse = np.add.reduceat(self.signatures, starts, axis=1) / self.n_quantiles
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    @classmethod
+    def from_menu(cls, menu: PizzaMenu, n_quantiles: int = 32) -> "TasteSimilarityIndex":
+        """
+        Builds the index of the pizzas of the menu from their taste at n_quantiles quantiles.
+        """
+        from maestro_pizza_maker.parallel import menu_index
+
+        if n_quantiles < 1:
+            raise ValueError("n_quantiles must be positive")
+        count("similarity.pizzas", len(menu))
+        if len(menu) == 0:
+            return cls(np.empty((0, n_quantiles)))
+        with phase("similarity.signatures", pizzas=len(menu), quantiles=n_quantiles):
+            catalog, indptr, indices = menu_index(menu)
+            signatures = np.empty((len(indptr) - 1, n_quantiles))
+            for start, stop, tastes in catalog.taste_blocks(indptr, indices, _SIGNATURE_BLOCK):
+                signatures[start:stop] = taste_signatures(tastes, n_quantiles)
+        return cls(signatures)
+
+    def signature(self, taste: np.ndarray) -> np.ndarray:
+        # the signature of a taste vector, e.g. `Pizza.taste` on the scenarios of the menu
+        return taste_signatures(np.asarray(taste)[None, :], self.n_quantiles)[0]
+
+    def _distances(self, signature: np.ndarray, start: int, stop: int) -> np.ndarray:
+        return np.abs(self.signatures[start:stop] - signature).mean(axis=1)
+
+    def knn(self, taste: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the positions and the distances of the k pizzas closest to the taste vector, closest first.
+        """
+        if k < 1:
+            raise ValueError("k must be positive")
+        signature = self.signature(taste)
+        mean = signature.mean()
+        low = high = int(np.searchsorted(self.means, mean))
+        candidates, distances = np.empty(0, dtype=np.intp), np.empty(0)
+        batch = max(k, _KNN_BATCH)
+        compared = 0
+        while True:
+            kth = distances.max() if len(distances) == k else np.inf
+            # the candidates beyond the window are at least as far as the difference of their means
+            left = mean - self.means[low - 1] if low > 0 else np.inf
+            right = self.means[high] - mean if high < len(self) else np.inf
+            if min(left, right) >= kth or (low == 0 and high == len(self)):
+                break
+            new = []
+            if left < kth:
+                new.append(np.arange(max(low - batch, 0), low))
+                low = max(low - batch, 0)
+            if right < kth:
+                new.append(np.arange(high, min(high + batch, len(self))))
+                high = min(high + batch, len(self))
+            new_candidates = np.concatenate(new)
+            new_distances = np.abs(self.signatures[new_candidates] - signature).mean(axis=1)
+            compared += len(new_candidates)
+            candidates = np.concatenate([candidates, new_candidates])
+            distances = np.concatenate([distances, new_distances])
+            if len(distances) > k:
+                best = np.argpartition(distances, k - 1)[:k]
+                candidates, distances = candidates[best], distances[best]
+            batch *= 2
+        count("similarity.compared", compared)
+        closest = np.lexsort((candidates, distances))
+        return self.order[candidates[closest]], distances[closest]
+
+    def radius(self, taste: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the positions and the distances of the pizzas within the radius of the taste vector, closest first.
+        """
+        signature = self.signature(taste)
+        mean = signature.mean()
+        start = int(np.searchsorted(self.means, mean - radius, side="left"))
+        stop = int(np.searchsorted(self.means, mean + radius, side="right"))
+        count("similarity.compared", stop - start)
+        distances = self._distances(signature, start, stop)
+        within = np.flatnonzero(distances <= radius)
+        closest = within[np.argsort(distances[within], kind="stable")]
+        return self.order[start + closest], distances[closest]
+
+    def near_duplicates(self, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (pairs x 2) positions of all pairs of pizzas within the radius of each other, the smaller
+        position first and sorted, and their distances.
+        """
+        n = len(self)
+        # the pizzas following pizza i in the order of the means, that may be within the radius
+        ends = np.searchsorted(self.means, self.means + radius, side="right")
+        firsts, seconds, distances = [], [], []
+        compared = 0
+        rows = np.arange(n)
+        d = 0
+        with phase("similarity.near_duplicates", pizzas=n):
+            # the d-th following pizza of all pizzas at once, the pizzas with fewer candidates drop out
+            while True:
+                d += 1
+                rows = rows[rows + d < ends[rows]]
+                if not len(rows):
+                    break
+                bound = np.abs(self.coarse[rows] - self.coarse[rows + d]).sum(axis=1)
+                candidates = rows[bound <= radius]
+                distance = np.abs(self.signatures[candidates] - self.signatures[candidates + d]).mean(axis=1)
+                compared += len(candidates)
+                within = distance <= radius
+                firsts.append(candidates[within])
+                seconds.append(candidates[within] + d)
+                distances.append(distance[within])
+        count("similarity.compared", compared)
+        if not distances:
+            return np.empty((0, 2), dtype=np.intp), np.empty(0)
+        first, second = self.order[np.concatenate(firsts)], self.order[np.concatenate(seconds)]
+        pairs = np.column_stack([np.minimum(first, second), np.maximum(first, second)])
+        distances = np.concatenate(distances)
+        ordered = np.lexsort((pairs[:, 1], pairs[:, 0]))
+        return pairs[ordered], distances[ordered]
+
+    def duplicates(self, radius: float) -> np.ndarray:
+        """
+        Returns a boolean mask of the pizzas, that are near duplicates (within the radius, transitively)
+        of a pizza at a smaller position, i.e. the pizzas to prune to keep one pizza of every group.
+        """
+        pairs, _ = self.near_duplicates(radius)
+        # the groups are the connected components, every pizza is labelled with the smallest position of its group
+        labels = np.arange(len(self))
+        while len(pairs):
+            smallest = np.minimum(labels[pairs[:, 0]], labels[pairs[:, 1]])
+            updated = labels.copy()
+            np.minimum.at(updated, pairs[:, 0], smallest)
+            np.minimum.at(updated, pairs[:, 1], smallest)
+            updated = updated[updated]
+            if np.array_equal(updated, labels):
+                break
+            labels = updated
+        return labels != np.arange(len(self))
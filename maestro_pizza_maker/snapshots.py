@@ -0,0 +1,163 @@
+# A service changes a shared menu while other threads read it, and a reader iterating over `menu.pizzas` would
+# see the list change under it. The maestro pizza maker keeps such a menu as versioned, immutable snapshots:
+#
+#   - a snapshot is a consistent view of the menu, it never changes. Readers take the current snapshot without
+#     a lock and work on it for as long as they like, `snapshot.menu` is a `PizzaMenu` for the usual functions
+#   - the pizzas of a snapshot are stored in chunks. Adding or removing a pizza copies the chunk it changes and
+#     the list of chunks, all other chunks are shared with the previous snapshot
+#   - the writers take a lock, build the next snapshot and publish it with its version, one after another
+#   - the taste of every chunk is summed once and shared by all snapshots holding the chunk, the other derived
+#     aggregates are cached per snapshot, see `PizzaSnapshot.cached`
+#
+# usage:
+#   versioned = VersionedPizzaMenu(menu.pizzas)
+#   versioned.add_pizza(pizza)  # in a writer thread, the new snapshot is returned
+#   snapshot = versioned.snapshot()  # in a reader thread
+#   snapshot.version, snapshot.menu.to_dataframe(sort_by="price", descendent=True)
+#   snapshot.cached(taste_at_risk_menu, 0.05)  # computed once for the snapshot
+
+import threading
+from collections.abc import Sequence
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from maestro_pizza_maker.pizza import Pizza
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.profiling import count
+
+# the pizzas of a chunk, a new chunk is started when the last one is full
+CHUNK_SIZE = 64
+
+
+class _Chunk:
+    # an immutable run of pizzas and the sum of their tastes, shared between the snapshots
+    __slots__ = ("pizzas", "_taste")
+
+    def __init__(self, pizzas: Tuple[Pizza, ...]) -> None:
+        self.pizzas = pizzas
+        self._taste: Optional[np.ndarray] = None
+
+    def taste(self) -> np.ndarray:
+        # summed by the first reader, the race of two readers only sums it twice
+        if self._taste is None:
+            self._taste = sum(pizza.taste for pizza in self.pizzas)
+        return self._taste
+
+
+class SnapshotPizzas(Sequence):
+    """
+    The pizzas of a snapshot, an immutable sequence of chunks of pizzas.
+    """
+
+    def __init__(self, chunks: Tuple[_Chunk, ...] = ()) -> None:
+        self._chunks = chunks
+        # the index of the first pizza of every chunk, and the number of pizzas at the end
+        self._offsets = np.concatenate([[0], np.cumsum([len(chunk.pizzas) for chunk in chunks], dtype=np.int64)])
+
+    @classmethod
+    def from_pizzas(cls, pizzas: Iterable[Pizza]) -> "SnapshotPizzas":
+        pizzas = tuple(pizzas)
+        return cls(tuple(_Chunk(pizzas[c : c + CHUNK_SIZE]) for c in range(0, len(pizzas), CHUNK_SIZE)))
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        c = int(np.searchsorted(self._offsets, index, side="right")) - 1
+        return self._chunks[c].pizzas[index - int(self._offsets[c])]
+
+    def __iter__(self) -> Iterator[Pizza]:
+        for chunk in self._chunks:
+            yield from chunk.pizzas
+
+    def appended(self, pizza: Pizza) -> "SnapshotPizzas":
+        # the pizzas with the pizza at the end, only the last chunk is copied
+        chunks = self._chunks
+        if chunks and len(chunks[-1].pizzas) < CHUNK_SIZE:
+            return SnapshotPizzas(chunks[:-1] + (_Chunk(chunks[-1].pizzas + (pizza,)),))
+        return SnapshotPizzas(chunks + (_Chunk((pizza,)),))
+
+    def removed(self, index: int) -> "SnapshotPizzas":
+        # the pizzas without the pizza at the index, only its chunk is copied and an emptied chunk is dropped
+        c = int(np.searchsorted(self._offsets, index, side="right")) - 1
+        position = index - int(self._offsets[c])
+        pizzas = self._chunks[c].pizzas
+        rest = pizzas[:position] + pizzas[position + 1 :]
+        return SnapshotPizzas(self._chunks[:c] + ((_Chunk(rest),) if rest else ()) + self._chunks[c + 1 :])
+
+    def menu_taste(self) -> np.ndarray:
+        # the taste of the menu from the tastes of the chunks, summed once for all snapshots
+        if not self._chunks:
+            return 0
+        return sum(chunk.taste() for chunk in self._chunks)
+
+
+class PizzaSnapshot:
+    """
+    An immutable version of a menu and the aggregates computed on it.
+    """
+
+    def __init__(self, pizzas: SnapshotPizzas, version: int) -> None:
+        self.pizzas = pizzas
+        self.version = version
+        self.menu = PizzaMenu(pizzas=pizzas)
+        self._cache: Dict[Hashable, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.pizzas)
+
+    def cached(self, function: Callable[..., Any], *args: Hashable) -> Any:
+        # function(self.menu, *args), computed once for the snapshot. The result is shared by all readers
+        # of the snapshot and should not be modified
+        key = (function, args)
+        if key in self._cache:
+            count("snapshot.cache.hits", 1)
+            return self._cache[key]
+        count("snapshot.cache.misses", 1)
+        # concurrent readers may compute it twice, the first result is kept
+        return self._cache.setdefault(key, function(self.menu, *args))
+
+
+class VersionedPizzaMenu:
+    """
+    A menu changed by writers, one after another, and read lock-free through its snapshots.
+    """
+
+    def __init__(self, pizzas: Iterable[Pizza] = ()) -> None:
+        self._lock = threading.Lock()
+        self._snapshot = PizzaSnapshot(SnapshotPizzas.from_pizzas(pizzas), version=0)
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def snapshot(self) -> PizzaSnapshot:
+        # the current snapshot, reading an attribute is atomic
+        return self._snapshot
+
+    def _publish(self, pizzas: SnapshotPizzas) -> PizzaSnapshot:
+        self._snapshot = PizzaSnapshot(pizzas, self._snapshot.version + 1)
+        return self._snapshot
+
+    def add_pizza(self, pizza: Pizza) -> PizzaSnapshot:
+        assert isinstance(pizza, Pizza)
+        with self._lock:
+            return self._publish(self._snapshot.pizzas.appended(pizza))
+
+    def remove_pizza(self, pizza: Pizza) -> PizzaSnapshot:
+        # removes the first pizza with the same recipe, as `PizzaMenu.remove_pizza`
+        assert isinstance(pizza, Pizza)
+        recipe = pizza.recipe
+        with self._lock:
+            pizzas = self._snapshot.pizzas
+            index = next((p for p, other in enumerate(pizzas) if other.recipe == recipe), None)
+            if index is None:
+                raise ValueError("The pizza is not part of the menu")
+            return self._publish(pizzas.removed(index))
@@ -3,11 +3,35 @@
 
 # TODO: define 2 risk measures for the pizza menu and implement them (1 - Taste at Risk (TaR), 2 - Conditional Taste at Risk (CTaR), also known as Expected Shorttaste (ES)
 
+from typing import Optional, Union
+
+from maestro_pizza_maker import parallel
+from maestro_pizza_maker.catalog import IngredientCatalog
 from maestro_pizza_maker.pizza import Pizza
 from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.profiling import count, phase
+from maestro_pizza_maker.risk_intervals import IntervalOptions, RiskInterval, taste_interval
 import numpy as np
+import pandas as pd
+
+def _menu_taste(menu: PizzaMenu, n_workers: int = 1) -> np.ndarray:
+    # the taste of the whole menu is the sum of the tastes of all pizzas in the menu
+    count("taste_at_risk.pizzas", len(menu.pizzas))
+    if n_workers > 1 and len(menu.pizzas):
+        # see `maestro_pizza_maker.parallel`
+        return parallel.menu_taste(menu, n_workers)
+    with phase("taste_at_risk.aggregate"):
+        # containers of pizzas, that know a faster sum, have a `menu_taste` method: a loaded menu sums its ingredients
+        # instead of its pizzas, a compressed menu every recipe times its copies, a snapshot the tastes of its chunks
+        menu_taste = getattr(menu.pizzas, "menu_taste", None)
+        if menu_taste is not None:
+            return menu_taste()
+        return sum(pizza.taste for pizza in menu.pizzas)
+
 
-def taste_at_risk_pizza(pizza: Pizza, quantile: float) -> float:
+def taste_at_risk_pizza(
+    pizza: Pizza, quantile: float, interval: Optional[IntervalOptions] = None
+) -> Union[float, RiskInterval]:
     # TODO: implement the taste at risk measure for a pizza
     # quantile is the quantile that we want to consider
     # Hint: Similarity between the Taste at Risk and the Value at Risk is not a coincidence or is it?
@@ -15,10 +39,15 @@ def taste_at_risk_pizza(pizza: Pizza, quantile: float) -> float:
     
     # We focus on the left tail of the taste distribution.
     if quantile>0.5: quantile = 1 - quantile
-    
+
+    if interval is not None:
+        # the estimate with its confidence interval, see `maestro_pizza_maker.risk_intervals`
+        return taste_interval(pizza.taste, quantile, "tar", interval)
     return np.quantile(pizza.taste, q=quantile)
 
-def taste_at_risk_menu(menu: PizzaMenu, quantile: float) -> float:
+def taste_at_risk_menu(
+    menu: PizzaMenu, quantile: float, interval: Optional[IntervalOptions] = None, n_workers: int = 1
+) -> Union[float, RiskInterval]:
     # TODO: implement the taste at risk measure for a menu
     # quantile is the quantile that we want to consider
     # Hint: the taste of the whole menu is the sum of the taste of all pizzas in the menu, or? ;)
@@ -26,11 +55,16 @@ def taste_at_risk_menu(menu: PizzaMenu, quantile: float) -> float:
     # We focus on the left tail of the taste distribution.
     if quantile>0.5: quantile = 1 - quantile
     
-    sum_taste: np.ndarray = sum(pizza.taste for pizza in menu.pizzas)
-    return np.quantile(sum_taste, q=quantile)
+    sum_taste: np.ndarray = _menu_taste(menu, n_workers)
+    if interval is not None:
+        return taste_interval(sum_taste, quantile, "tar", interval)
+    with phase("taste_at_risk.quantile"):
+        return np.quantile(sum_taste, q=quantile)
 
 
-def conditional_taste_at_risk_pizza(pizza: Pizza, quantile: float) -> float:
+def conditional_taste_at_risk_pizza(
+    pizza: Pizza, quantile: float, interval: Optional[IntervalOptions] = None
+) -> Union[float, RiskInterval]:
     # TODO: implement the conditional taste at risk measure for a pizza
     # quantile is the quantile that we want to consider
     # Hint: Simmilarity between the Conditional Taste at Risk and the Conditional Value at Risk is not a coincidence or is it?
@@ -38,19 +72,66 @@ def conditional_taste_at_risk_pizza(pizza: Pizza, quantile: float) -> float:
     # We focus on the left tail of the taste distribution.
     if quantile>0.5: quantile = 1 - quantile
 
+    if interval is not None:
+        return taste_interval(pizza.taste, quantile, "ctar", interval)
     TaR: float = taste_at_risk_pizza(pizza=pizza, quantile=quantile)
     taste: np.ndarray = pizza.taste
     return taste[taste <= TaR].mean()
 
 
-def conditional_taste_at_risk_menu(menu: PizzaMenu, quantile: float) -> float:
+def conditional_taste_at_risk_menu(
+    menu: PizzaMenu, quantile: float, interval: Optional[IntervalOptions] = None, n_workers: int = 1
+) -> Union[float, RiskInterval]:
     # TODO: implement the conditional taste at risk measure for a menu
     # Hint: the taste of the whole menu is the sum of the taste of all pizzas in the menu, or? ;) (same as for the taste at risk)
 
     # We focus on the left tail of the taste distribution.
     if quantile>0.5: quantile = 1 - quantile
 
-    TaR: float = taste_at_risk_menu(menu=menu, quantile=quantile)
-    taste: np.ndarray = sum(pizza.taste for pizza in menu.pizzas)
-    return taste[taste <= TaR].mean()
+    if interval is not None:
+        return taste_interval(_menu_taste(menu, n_workers), quantile, "ctar", interval)
+    taste: np.ndarray = _menu_taste(menu, n_workers)
+    with phase("taste_at_risk.quantile"):
+        TaR: float = np.quantile(taste, q=quantile)
+    if n_workers > 1:
+        return parallel.tail_mean(taste, TaR, n_workers)
+    with phase("taste_at_risk.tail_mean"):
+        return taste[taste <= TaR].mean()
+
+
+def precision_report(
+    menu: PizzaMenu, quantile: float, catalog: Optional[IngredientCatalog] = None, dtype: str = "float32"
+) -> pd.DataFrame:
+    """
+    Compares the menu taste and its risk measures computed in dtype with the ones computed in float64
+    from the same fat scenarios, the catalog of the menu ingredients is the one of its pizzas by default.
+    Returns one row per measure (taste is the largest difference over the scenarios) with the columns
+    float64, <dtype>, abs_error and rel_error.
+    """
+    # We focus on the left tail of the taste distribution.
+    if quantile > 0.5:
+        quantile = 1 - quantile
+    catalog = menu.ingredient_catalog() if catalog is None else catalog
+    dtype = np.dtype(dtype)
+    if dtype == np.float64:
+        raise ValueError("the report compares float64 with a lower precision, e.g. float32")
+
+    # the taste of the menu from how many times each ingredient is on it, in both precisions
+    weights = menu.ingredient_counts(catalog).sum(axis=0) * catalog.taste_weights
+    reference = weights @ catalog.fat.astype(np.float64)
+    taste = weights.astype(dtype) @ catalog.fat.astype(dtype)
+
+    rows = {}
+    worst = int(np.argmax(np.abs(taste - reference)))
+    rows["taste"] = (reference[worst], taste[worst])
+    for measure, tail in [("tar", False), ("ctar", True)]:
+        values = []
+        for vector in [reference, taste]:
+            tar = np.quantile(vector, q=quantile)
+            values.append(vector[vector <= tar].mean() if tail else tar)
+        rows[measure] = tuple(values)
 
+    report = pd.DataFrame.from_dict(rows, orient="index", columns=["float64", dtype.name])
+    report["abs_error"] = (report[dtype.name].astype(np.float64) - report["float64"]).abs()
+    report["rel_error"] = report["abs_error"] / report["float64"].abs()
+    return report
@@ -0,0 +1,123 @@
+# The suppliers of the maestro pizza maker change their prices, and he wants to know ahead what the menu
+# would cost and which pizza would be optimal under hundreds of possible price changes.
+# A price scenario is a vector of the prices of all ingredients of a catalog, a (scenarios x ingredients)
+# matrix holds many of them. The catalog (and the `PizzaIngredients` enum) is never modified:
+#
+#   - the prices of all pizzas of a menu in all scenarios are one matrix product with the ingredient counts
+#   - the optimal pizzas are found on one model built once, only its price constraints and its objective
+#     are replaced per scenario, and equal scenarios are solved once
+#     (a start solution from the previous scenario made CBC slower, it solves these models at the root node)
+#
+# usage:
+#   prices = price_shocks({"MOZZARELA": [1.0, 1.1, 1.5], "HAM": [1.2, 1.2, 1.0]})
+#   menu_prices(menu, prices).sum(axis=1)  # the price of the whole menu in every scenario
+#   optimal_pizzas(prices, constraints_values, constraints_ingredients, objective="minimize_price").pizzas
+
+from dataclasses import dataclass
+from typing import List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from maestro_pizza_maker.catalog import IngredientCatalog, default_catalog
+from maestro_pizza_maker.pizza import Pizza
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.pizza_optimizer import (
+    OBJECTIVES,
+    PizzaConstraintsIngredients,
+    PizzaConstraintsValues,
+    PizzaOptimizationError,
+    build_pizza_model,
+    solve_objective,
+)
+from maestro_pizza_maker.profiling import count, phase
+
+
+@dataclass
+class ScenarioOptima:
+    # one entry per price scenario, equal scenarios share the pizza, an infeasible scenario has no pizza
+    pizzas: List[Optional[Pizza]]
+    price: np.ndarray  # the price of the optimal pizza in its scenario, NaN if infeasible
+    objective_value: np.ndarray  # NaN if infeasible
+
+
+def price_matrix(prices: np.ndarray, catalog: Optional[IngredientCatalog] = None) -> np.ndarray:
+    """
+    Returns the price scenarios as a (scenarios x ingredients) matrix, a single scenario may be a vector.
+    """
+    catalog = default_catalog() if catalog is None else catalog
+    prices = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+    if prices.ndim != 2 or prices.shape[1] != len(catalog):
+        raise ValueError(f"the price scenarios must have the shape (scenarios, {len(catalog)}), got {prices.shape}")
+    if not np.isfinite(prices).all():
+        raise ValueError("the prices must be finite")
+    return prices
+
+
+def price_shocks(shocks: Mapping[str, Sequence[float]], catalog: Optional[IngredientCatalog] = None) -> np.ndarray:
+    """
+    Returns the price scenarios, in which the prices of the given ingredients (by name) are multiplied
+    by the factors of every scenario and the other prices are the catalog prices.
+    """
+    catalog = default_catalog() if catalog is None else catalog
+    lengths = {len(factors) for factors in shocks.values()}
+    if len(lengths) > 1:
+        raise ValueError("every ingredient needs one factor per scenario")
+    prices = np.tile(catalog.price, (lengths.pop() if lengths else 1, 1))
+    for name, factors in shocks.items():
+        prices[:, catalog.index_of(name)] *= np.asarray(factors, dtype=np.float64)
+    return prices
+
+
+def menu_prices(menu: PizzaMenu, prices: np.ndarray, catalog: Optional[IngredientCatalog] = None) -> np.ndarray:
+    """
+    Returns the (scenarios x pizzas) matrix of the prices of the pizzas of the menu in every price scenario,
+    the catalog of the menu ingredients is the one of its pizzas by default, see `PizzaMenu.ingredient_catalog`.
+    """
+    catalog = menu.ingredient_catalog() if catalog is None else catalog
+    prices = price_matrix(prices, catalog)
+    count("what_if.scenarios", len(prices))
+    with phase("what_if.menu_prices", pizzas=len(menu)):
+        return prices @ menu.ingredient_counts(catalog).T
+
+
+def optimal_pizzas(
+    prices: np.ndarray,
+    constraints_values: PizzaConstraintsValues,
+    constraints_ingredients: PizzaConstraintsIngredients,
+    objective: str = "minimize_price",
+    lambda_param: float = 0.5,
+    catalog: Optional[IngredientCatalog] = None,
+) -> ScenarioOptima:
+    """
+    Solves one of `OBJECTIVES` for every price scenario, the price bounds of constraints_values
+    apply to the scenario prices. The ingredients are taken from the catalog, `PizzaIngredients` by default.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"unknown objective {objective}, expected one of {OBJECTIVES}")
+    catalog = default_catalog() if catalog is None else catalog
+    prices = price_matrix(prices, catalog)
+    distinct, inverse = np.unique(prices, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    count("what_if.scenarios", len(prices))
+    count("what_if.solved", len(distinct))
+
+    pizza_model = build_pizza_model(constraints_values, constraints_ingredients, catalog)
+    pizzas: List[Optional[Pizza]] = []
+    price = np.full(len(distinct), np.nan)
+    objective_value = np.full(len(distinct), np.nan)
+    for k, scenario in enumerate(distinct):
+        pizza_model.set_price(scenario)
+        try:
+            pizza = solve_objective(pizza_model, objective, lambda_param)
+        except PizzaOptimizationError:
+            # no pizza satisfies the constraints at these prices
+            pizzas.append(None)
+            continue
+        pizzas.append(pizza)
+        price[k] = scenario[pizza_model.selected()].sum()
+        objective_value[k] = pizza.solver_stats.objective_value
+    return ScenarioOptima(
+        pizzas=[pizzas[k] for k in inverse],
+        price=price[inverse],
+        objective_value=objective_value[inverse],
+    )
@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+
+import numpy as np
+
+from maestro_pizza_maker import aio
+from maestro_pizza_maker.benchmarks import synthetic_catalog, synthetic_menu
+from maestro_pizza_maker.pizza_optimizer import (
+    PizzaConstraintsIngredients,
+    PizzaConstraintsValues,
+    ValueBounds,
+    maximize_taste_penalty_price,
+    minimize_price,
+)
+from maestro_pizza_maker.profiling import InMemorySink, profiling
+from maestro_pizza_maker.taste_at_risk import conditional_taste_at_risk_menu, taste_at_risk_menu
+
+
+class AioTests(unittest.IsolatedAsyncioTestCase):
+    async def test_identical_requests_are_merged(self):
+        values, ingredients = PizzaConstraintsValues(), PizzaConstraintsIngredients(cheese=1)
+        sink = InMemorySink()
+        with profiling(sink):
+            pizzas = await asyncio.gather(*[aio.optimize(values, ingredients) for _ in range(5)])
+        self.assertEqual(sink.summary()["aio.merged"]["count"], 4)
+        self.assertEqual(len(sink.solver_stats), 1)
+        self.assertTrue(all(pizza is pizzas[0] for pizza in pizzas))
+        self.assertEqual(pizzas[0].price, maximize_taste_penalty_price(values, ingredients).price)
+
+    async def test_batch_shares_the_model(self):
+        values, ingredients = PizzaConstraintsValues(), PizzaConstraintsIngredients(meat=1)
+        service = aio.PizzaService(window=0.05)
+        sink = InMemorySink()
+        with profiling(sink):
+            cheap, *tasty = await asyncio.gather(
+                service.optimize(values, ingredients, objective="minimize_price"),
+                *[service.optimize(values, ingredients, lambda_param=l) for l in [0.0, 0.5, 2.0]],
+            )
+        # one batch of four requests
+        self.assertEqual(sink.summary()["aio.batch"]["count"], 4)
+        self.assertEqual(sum(event.name == "aio.batch" for event in sink.events), 1)
+        self.assertAlmostEqual(cheap.price, minimize_price(values, ingredients).price)
+        for pizza, lambda_param in zip(tasty, [0.0, 0.5, 2.0]):
+            self.assertAlmostEqual(pizza.price, maximize_taste_penalty_price(values, ingredients, lambda_param).price)
+
+    async def test_batches_without_a_shared_model_run_apart(self):
+        service = aio.PizzaService(window=0.05)
+        sink = InMemorySink()
+        with profiling(sink):
+            await asyncio.gather(
+                service.optimize(PizzaConstraintsValues(), PizzaConstraintsIngredients(meat=1), lambda_param=0.0),
+                service.optimize(PizzaConstraintsValues(), PizzaConstraintsIngredients(meat=1), lambda_param=1.0),
+                service.optimize(PizzaConstraintsValues(), PizzaConstraintsIngredients(cheese=1)),
+            )
+        # one executor call per model
+        batches = sorted(event.value for event in sink.events if event.name == "aio.batch")
+        self.assertEqual(batches, [1, 2])
+
+    async def test_errors_reach_only_their_callers(self):
+        service = aio.PizzaService(window=0.05)
+        infeasible = PizzaConstraintsValues(price=ValueBounds(max=0.1))
+        results = await asyncio.gather(
+            service.optimize(infeasible, PizzaConstraintsIngredients()),
+            service.optimize(PizzaConstraintsValues(), PizzaConstraintsIngredients()),
+            return_exceptions=True,
+        )
+        self.assertIsInstance(results[0], Exception)
+        self.assertGreater(results[1].price, 0)
+        with self.assertRaises(ValueError):
+            await service.optimize(PizzaConstraintsValues(), PizzaConstraintsIngredients(), objective="cheapest")
+
+    async def test_menu_risk_matches_taste_at_risk(self):
+        catalog = synthetic_catalog(24, 300)
+        menus = [synthetic_menu(catalog, n, seed=n) for n in [3, 5, 8]]
+        service = aio.PizzaService(window=0.05)
+        tar, ctar = await asyncio.gather(
+            asyncio.gather(*[service.menu_risk(menu, 0.05) for menu in menus]),
+            asyncio.gather(*[service.menu_risk(menu, 0.95, measure="ctar") for menu in menus]),
+        )
+        np.testing.assert_allclose(tar, [taste_at_risk_menu(menu, 0.05) for menu in menus])
+        np.testing.assert_allclose(ctar, [conditional_taste_at_risk_menu(menu, 0.05) for menu in menus])
+
+
+if __name__ == "__main__":
+    unittest.main()
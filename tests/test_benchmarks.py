@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+import unittest
+
+from maestro_pizza_maker.benchmarks import (
+    OPERATIONS,
+    BenchmarkConfig,
+    BenchmarkResult,
+    compare,
+    load_results,
+    main,
+    run_benchmarks,
+    save_results,
+    synthetic_catalog,
+    synthetic_menu,
+)
+
+
+class BenchmarkTests(unittest.TestCase):
+    def test_synthetic_menu(self):
+        ingredients = synthetic_catalog(32, 200)
+        menu = synthetic_menu(ingredients, 25)
+        self.assertEqual(len(menu), 25)
+        self.assertEqual(menu.pizzas[0].taste.shape, (200,))
+
+    def test_run_and_roundtrip(self):
+        config = BenchmarkConfig(
+            menu_sizes=[5],
+            scenario_counts=[100],
+            catalog_sizes=[12],
+            operations=["pizza_taste", "menu_to_dataframe", "menu_construction"],
+            repeat=1,
+        )
+        results = run_benchmarks(config)
+        self.assertEqual(len(results), 3)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            save_results(results, path)
+            self.assertEqual(load_results(path), results)
+
+    def test_cases_use_the_requested_sizes(self):
+        config = BenchmarkConfig(
+            menu_sizes=[5, 40], scenario_counts=[100], catalog_sizes=[12], operations=["taste_at_risk_menu"], repeat=1
+        )
+        self.assertEqual({result.params["pizzas"] for result in run_benchmarks(config)}, {5, 40})
+
+        cases = OPERATIONS["catalog_load"](BenchmarkConfig([5], [100], [12, 24]))
+        _, load = next(cases)
+        directory = os.path.dirname(load.__defaults__[0])
+        self.assertEqual(len(list(cases)), 1)
+        self.assertFalse(os.path.exists(directory))
+
+    def test_compare_flags_regressions(self):
+        baseline = [BenchmarkResult("op", {"pizzas": 10}, 0.010, 1000)]
+        self.assertTrue(compare(baseline, baseline).ok)
+
+        slower = [BenchmarkResult("op", {"pizzas": 10}, 0.020, 1000)]
+        comparison = compare(baseline, slower, threshold=0.25)
+        self.assertEqual([r.metric for r in comparison.regressions], ["seconds"])
+
+        hungrier = [BenchmarkResult("op", {"pizzas": 10}, 0.010, 5000)]
+        comparison = compare(baseline, hungrier, threshold=0.25)
+        self.assertEqual([r.metric for r in comparison.regressions], ["peak_bytes"])
+
+        noise = [BenchmarkResult("op", {"pizzas": 10}, 1e-5, 1000)]
+        self.assertTrue(compare([BenchmarkResult("op", {"pizzas": 10}, 1e-6, 1000)], noise).ok)
+
+    def test_main_fails_on_regression(self):
+        args = ["--operations", "pizza_taste", "--scenario-counts", "100", "--repeat", "1"]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            self.assertEqual(main(args + ["--baseline", path, "--save-baseline"]), 0)
+            with open(path) as file:
+                document = json.load(file)
+            for result in document["results"]:
+                result["seconds"] = 1e-9
+                result["peak_bytes"] = 1
+            with open(path, "w") as file:
+                json.dump(document, file)
+            self.assertEqual(main(args + ["--baseline", path, "--min-seconds", "0"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from maestro_pizza_maker.benchmarks import synthetic_catalog, synthetic_menu
+from maestro_pizza_maker.catalog import CatalogIngredient, IngredientCatalog, default_catalog
+from maestro_pizza_maker.ingredients import IngredientType, PizzaIngredients
+from maestro_pizza_maker.pizza import Pizza
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.pizza_optimizer import (
+    PizzaConstraintsIngredients,
+    PizzaConstraintsValues,
+    maximize_taste_penalty_price,
+    minimize_price,
+)
+from maestro_pizza_maker.risk_intervals import risk_intervals
+from maestro_pizza_maker.taste_at_risk import precision_report
+from maestro_pizza_maker.what_if import menu_prices
+
+
+class CatalogTests(unittest.TestCase):
+    def test_default_catalog_returns_enum_members(self):
+        catalog = default_catalog()
+        self.assertEqual(len(catalog), len(PizzaIngredients))
+        self.assertEqual(list(catalog), list(PizzaIngredients))
+        np.testing.assert_array_equal(catalog.fat[2], PizzaIngredients.MOZZARELA.value.fat)
+        df = PizzaIngredients.get_ingredients_df()
+        self.assertEqual(len(df), len(PizzaIngredients))
+        self.assertEqual(df["name"].iloc[0], "TOMATO SAUCE")
+
+    def test_csv_and_npz_roundtrip(self):
+        df = pd.DataFrame(
+            {
+                "name": ["DOUGH", "SAUCE", "GOUDA"],
+                "type": ["dough", "SAUCE", "cheese"],
+                "price": [1.0, 0.5, 1.5],
+                "protein": [10.0, 0.5, 8.0],
+                "carbohydrates": [10.0, 3.0, 0.0],
+                "calories": [100.0, 20.0, 350.0],
+                "fat_0": [1.0, 2.0, 3.0],
+                "fat_1": [4.0, 5.0, 6.0],
+            }
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, "ingredients.csv")
+            df.to_csv(csv_path, index=False)
+            catalog = IngredientCatalog.from_csv(csv_path)
+            self.assertEqual(catalog.fat.shape, (3, 2))
+            self.assertEqual(catalog[2].value.type, IngredientType.CHEESE)
+            np.testing.assert_array_equal(catalog.type_indices(IngredientType.SAUCE), [1])
+
+            npz_path = os.path.join(directory, "ingredients.npz")
+            catalog.to_npz(npz_path)
+            loaded = IngredientCatalog.from_npz(npz_path)
+            np.testing.assert_array_equal(loaded.fat, catalog.fat)
+            self.assertEqual(list(loaded.names), ["DOUGH", "SAUCE", "GOUDA"])
+
+    def test_invalid_catalog(self):
+        with self.assertRaises(ValueError):
+            IngredientCatalog(
+                names=["A"], types=[0], price=[1], protein=[1], carbohydrates=[1], calories=[1],
+                fat=np.ones((2, 3)),
+            )
+        df = pd.DataFrame({"name": ["A"], "type": ["pasta"], "price": [1], "protein": [1],
+                           "carbohydrates": [1], "calories": [1], "fat_0": [1]})
+        with self.assertRaises(ValueError):
+            IngredientCatalog.from_dataframe(df)
+
+    def test_pizzas_and_menus_on_large_catalog(self):
+        catalog = synthetic_catalog(2_000, 100)
+        menu = synthetic_menu(catalog, 50)
+        self.assertIsInstance(menu.pizzas[0].dough, CatalogIngredient)
+        counts = menu.ingredient_counts(catalog)
+        self.assertEqual(counts.shape, (50, 2_000))
+        np.testing.assert_allclose(counts @ catalog.price, [pizza.price for pizza in menu.pizzas])
+        self.assertEqual(len(menu.to_dataframe(sort_by="price", descendent=True)), 50)
+
+    def test_menu_functions_infer_the_catalog(self):
+        catalog = synthetic_catalog(24, 300)
+        menu = synthetic_menu(catalog, 6)
+        self.assertIs(menu.ingredient_catalog(), catalog)
+        counts = menu.ingredient_counts()
+        np.testing.assert_array_equal(counts, menu.ingredient_counts(catalog))
+        np.testing.assert_allclose(menu_prices(menu, catalog.price), [[pizza.price for pizza in menu.pizzas]])
+        self.assertLessEqual(len(menu.pareto_front(["price", "taste_at_risk"])), 6)
+        intervals = risk_intervals(menu, [0.05], measure="tar")
+        self.assertEqual(intervals.estimate.shape, (6, 1))
+        self.assertEqual(len(precision_report(menu, 0.05)), len(precision_report(menu, 0.05, catalog)))
+        # the pizzas of two catalogs with as many fat scenarios share the distinct ingredients of the menu
+        margherita = Pizza.from_ingredients(
+            [PizzaIngredients.CLASSIC_DOUGH, PizzaIngredients.TOMATO_SAUCE, PizzaIngredients.MOZZARELA]
+        )
+        n_scenarios = default_catalog().fat.shape[1]
+        mixed = PizzaMenu(pizzas=synthetic_menu(synthetic_catalog(24, n_scenarios), 6).pizzas + [margherita])
+        np.testing.assert_allclose(
+            mixed.ingredient_counts() @ mixed.ingredient_catalog().price, [pizza.price for pizza in mixed.pizzas]
+        )
+        self.assertEqual(list(PizzaMenu(pizzas=[margherita]).ingredient_catalog()), list(PizzaIngredients))
+
+    def test_optimizers_on_catalog(self):
+        catalog = synthetic_catalog(600, 50)
+        constraints = PizzaConstraintsIngredients(cheese=1, meat=2)
+        cheapest = minimize_price(PizzaConstraintsValues(), constraints, catalog=catalog)
+        self.assertEqual(len(cheapest.meat), 2)
+        self.assertAlmostEqual(
+            cheapest.price,
+            sum(
+                np.sort(catalog.price[catalog.type_indices(ingredient_type)])[:n].sum()
+                for ingredient_type, n in [
+                    (IngredientType.DOUGH, 1),
+                    (IngredientType.SAUCE, 1),
+                    (IngredientType.CHEESE, 1),
+                    (IngredientType.MEAT, 2),
+                ]
+            ),
+        )
+        tasty = maximize_taste_penalty_price(PizzaConstraintsValues(), constraints, catalog=catalog)
+        self.assertIsInstance(tasty, Pizza)
+
+    def test_default_optimizer_returns_enum_members(self):
+        pizza = minimize_price(PizzaConstraintsValues(), PizzaConstraintsIngredients())
+        self.assertIsInstance(pizza.dough, PizzaIngredients)
+        self.assertIsInstance(pizza.sauce, PizzaIngredients)
+
+
+if __name__ == "__main__":
+    unittest.main()
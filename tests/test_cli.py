@@ -0,0 +1,98 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from maestro_pizza_maker.benchmarks import synthetic_catalog, synthetic_menu
+from maestro_pizza_maker.cli import main
+from maestro_pizza_maker.pizza_optimizer import PizzaConstraintsIngredients, PizzaConstraintsValues, minimize_price
+from maestro_pizza_maker.taste_at_risk import conditional_taste_at_risk_pizza, taste_at_risk_pizza
+
+
+class CliTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.catalog = synthetic_catalog(16, 200)
+        self.catalog_path = self._path("catalog.npz")
+        self.catalog.to_npz(self.catalog_path)
+        self.menu = synthetic_menu(self.catalog, 7)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def _write_pizzas(self) -> str:
+        path = self._path("pizzas.jsonl")
+        with open(path, "w") as file:
+            for p, pizza in enumerate(self.menu.pizzas):
+                file.write(json.dumps({"id": f"p{p}", "ingredients": [i.name for i in pizza.ingredients]}) + "\n")
+            file.write(json.dumps({"id": "broken", "ingredients": ["INGREDIENT_0", "UNKNOWN"]}) + "\n")
+            file.write('{"id": "truncated", "ingredients": ["INGREDIENT_0"\n')
+        return path
+
+    def test_evaluate_matches_the_pizza_measures(self):
+        output = self._path("results.jsonl")
+        status = main(["evaluate", self._write_pizzas(), "--catalog", self.catalog_path, "--output", output, "--chunk-size", "3"])
+        self.assertEqual(status, 1)
+        with open(output) as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual([r["id"] for r in records], [f"p{p}" for p in range(7)] + ["broken", "8"])
+        for record, pizza in zip(records, self.menu.pizzas):
+            self.assertIsNone(record["error"])
+            self.assertAlmostEqual(record["price"], pizza.price)
+            self.assertAlmostEqual(record["average_fat"], pizza.average_fat)
+            self.assertAlmostEqual(record["tar"], taste_at_risk_pizza(pizza, 0.05))
+            self.assertAlmostEqual(record["ctar"], conditional_taste_at_risk_pizza(pizza, 0.05))
+        self.assertEqual(records[-2]["error"], "UNKNOWN is not in the catalog")
+        self.assertIsNone(records[-2]["tar"])
+        # a malformed line does not stop the stream
+        self.assertTrue(records[-1]["error"].startswith("line 9 is not valid JSON"))
+
+    def test_workers_and_csv_give_the_same_results(self):
+        source = self._path("pizzas.csv")
+        with open(source, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["id", "ingredients"])
+            for p, pizza in enumerate(self.menu.pizzas):
+                writer.writerow([p, ";".join(i.name for i in pizza.ingredients)])
+        outputs = []
+        for workers in ["1", "2"]:
+            output = self._path(f"results_{workers}.csv")
+            arguments = ["evaluate", source, "--catalog", self.catalog_path, "--output", output, "--chunk-size", "2"]
+            self.assertEqual(main(arguments + ["--workers", workers]), 0)
+            with open(output) as file:
+                outputs.append(file.read())
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(len(outputs[0].splitlines()), 8)
+
+    def test_optimize_jobs(self):
+        source = self._path("jobs.jsonl")
+        with open(source, "w") as file:
+            file.write(json.dumps({"id": "cheap", "objective": "minimize_price", "ingredients": {"cheese": 1}}) + "\n")
+            file.write(json.dumps({"id": "impossible", "values": {"price": {"max": 0}}}) + "\n")
+            file.write("[1, 2]\n")
+            file.write(json.dumps({"id": "typo", "values": {"price": {"max": "cheap"}}}) + "\n")
+            file.write(json.dumps({"id": "no_values", "values": None}) + "\n")
+            file.write(json.dumps({"id": "listed", "ingredients": [1]}) + "\n")
+        output = self._path("pizzas.jsonl")
+        self.assertEqual(main(["optimize", source, "--catalog", self.catalog_path, "--output", output]), 1)
+        with open(output) as file:
+            cheap, impossible, not_an_object, typo, no_values, listed = [json.loads(line) for line in file]
+        self.assertEqual(not_an_object["error"], "line 3 is not a JSON object")
+        # the message is not cut at its quotes
+        self.assertTrue(typo["error"].startswith("'<' not supported"), typo["error"])
+        self.assertEqual(no_values["error"], "values must be a JSON object, got null")
+        self.assertEqual(listed["error"], "ingredients must be a JSON object, got [1]")
+        expected = minimize_price(PizzaConstraintsValues(), PizzaConstraintsIngredients(cheese=1), self.catalog)
+        self.assertEqual(cheap["status"], "OPTIMAL")
+        self.assertEqual(cheap["ingredients"], [i.name for i in expected.ingredients])
+        self.assertAlmostEqual(cheap["price"], expected.price)
+        self.assertEqual(impossible["status"], "INFEASIBLE")
+        self.assertIsNotNone(impossible["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from maestro_pizza_maker.benchmarks import synthetic_catalog, synthetic_menu
+from maestro_pizza_maker.pizza import Pizza
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.sand_box.fat_generator import FAT_DTYPE_VARIABLE, _generate_multivariate_normal_vector, fat_dtype
+from maestro_pizza_maker.taste_at_risk import (
+    _menu_taste,
+    conditional_taste_at_risk_menu,
+    precision_report,
+    taste_at_risk_menu,
+)
+
+
+class FatDtypeTests(unittest.TestCase):
+    def test_dtype_setting(self):
+        with mock.patch.dict(os.environ, {FAT_DTYPE_VARIABLE: "float32"}):
+            self.assertEqual(fat_dtype(), np.float32)
+            self.assertEqual(_generate_multivariate_normal_vector(3, n_scenarios=10).dtype, np.float32)
+        self.assertEqual(fat_dtype("float64"), np.float64)
+        with self.assertRaises(ValueError):
+            fat_dtype("float16")
+
+    def test_float32_is_kept_through_the_menu(self):
+        catalog = synthetic_catalog(24, 2_000, dtype="float32")
+        menu = synthetic_menu(catalog, 30)
+        # a pizza without toppings must not be upcast by the empty topping lists
+        plain = Pizza(dough=catalog[0], sauce=catalog[1])
+        self.assertEqual(plain.taste.dtype, np.float32)
+        self.assertEqual(_menu_taste(menu).dtype, np.float32)
+        self.assertEqual(np.asarray(taste_at_risk_menu(menu, 0.05)).dtype, np.float32)
+        self.assertEqual(np.asarray(conditional_taste_at_risk_menu(menu, 0.05)).dtype, np.float32)
+        self.assertEqual(menu.get_most_fat_pizza(0.5).fat.dtype, np.float32)
+
+    def test_precision_report(self):
+        catalog = synthetic_catalog(24, 2_000, dtype="float64")
+        menu = synthetic_menu(catalog, 30)
+        report = precision_report(menu, 0.95, catalog)
+        self.assertEqual(list(report.index), ["taste", "tar", "ctar"])
+        self.assertEqual(list(report.columns), ["float64", "float32", "abs_error", "rel_error"])
+        self.assertAlmostEqual(report.loc["tar", "float64"], taste_at_risk_menu(menu, 0.05))
+        self.assertLess(report["rel_error"].max(), 1e-5)
+
+        single = PizzaMenu(pizzas=[menu.pizzas[0]])
+        self.assertLess(precision_report(single, 0.05, catalog)["rel_error"].max(), 1e-5)
+        with self.assertRaises(ValueError):
+            precision_report(menu, 0.05, catalog, dtype="float64")
+
+
+if __name__ == "__main__":
+    unittest.main()
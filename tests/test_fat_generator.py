@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from maestro_pizza_maker.sand_box import fat_generator
+from maestro_pizza_maker.sand_box.fat_generator import (
+    FAT_SEED_VARIABLE,
+    FAT_SIMULATIONS,
+    _generate_multivariate_normal_vector,
+    multivariate_normal_scenarios,
+)
+
+
+class FatGeneratorTests(unittest.TestCase):
+    def test_workers_do_not_change_the_scenarios(self):
+        # small chunks, so that several threads draw them
+        with mock.patch.object(fat_generator, "CHUNK_SCENARIOS", 1_000):
+            single = _generate_multivariate_normal_vector(8, 10_500, seed=5)
+            threaded = _generate_multivariate_normal_vector(8, 10_500, seed=5, n_workers=3)
+        np.testing.assert_array_equal(single, threaded)
+        self.assertFalse(np.array_equal(single, _generate_multivariate_normal_vector(8, 10_500, seed=6)))
+
+    def test_seed_setting(self):
+        with mock.patch.dict(os.environ, {FAT_SEED_VARIABLE: "11"}):
+            from_variable = _generate_multivariate_normal_vector(4, 100)
+        np.testing.assert_array_equal(from_variable, _generate_multivariate_normal_vector(4, 100, seed=11))
+
+    def test_distribution(self):
+        rng = np.random.default_rng(0)
+        mean = rng.normal(loc=30, scale=5, size=5)
+        dummy = rng.random((5, 3))
+        # a singular covariance has no Cholesky factor
+        cov = dummy @ dummy.T
+        scenarios = multivariate_normal_scenarios(mean, cov, 200_000, seed=1, dtype="float32")
+        self.assertEqual(scenarios.dtype, np.float32)
+        np.testing.assert_allclose(scenarios.mean(axis=0), mean, atol=0.01)
+        np.testing.assert_allclose(np.cov(scenarios.T), cov, atol=0.02)
+        with self.assertRaises(ValueError):
+            multivariate_normal_scenarios(mean, cov, 10, n_workers=0)
+
+    def test_processes_share_the_scenarios(self):
+        code = "from maestro_pizza_maker.sand_box.fat_generator import FAT_SIMULATIONS; print(FAT_SIMULATIONS.sum().hex())"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(float.fromhex(output.strip()), FAT_SIMULATIONS.sum())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from maestro_pizza_maker.benchmarks import synthetic_catalog
+from maestro_pizza_maker.heuristic import HeuristicOptions, anneal, heuristic_selection
+from maestro_pizza_maker.pizza_optimizer import (
+    InfeasiblePizzaError,
+    PizzaConstraintsIngredients,
+    PizzaConstraintsValues,
+    ValueBounds,
+    build_pizza_model,
+    maximize_taste_penalty_price,
+    minimize_price,
+    solve_objective,
+    value_matrix,
+)
+
+
+class HeuristicTests(unittest.TestCase):
+    def setUp(self):
+        self.catalog = synthetic_catalog(600, 20)
+        self.values = PizzaConstraintsValues(protein=ValueBounds(min=60), calories=ValueBounds(max=1500))
+        self.ingredients = PizzaConstraintsIngredients(cheese=2, meat=2, vegetables=1)
+
+    def test_heuristic_pizza_is_close_to_the_optimum(self):
+        for solve in [minimize_price, maximize_taste_penalty_price]:
+            optimal = solve(self.values, self.ingredients, catalog=self.catalog)
+            heuristic = solve(self.values, self.ingredients, catalog=self.catalog, solver="heuristic")
+            stats = heuristic.solver_stats
+            self.assertIn(stats.status, ["OPTIMAL", "FEASIBLE"])
+            self.assertAlmostEqual(stats.objective_value, optimal.solver_stats.objective_value, delta=0.01)
+            # the LP bound is at least as good as the optimum
+            self.assertGreaterEqual(stats.gap, 0)
+            self.assertLessEqual(abs(stats.objective_bound - stats.objective_value), abs(stats.objective_value) * stats.gap + 1e-9)
+            self.assertGreaterEqual(heuristic.protein, 60 - 1e-9)
+            self.assertLessEqual(heuristic.calories, 1500 + 1e-9)
+            self.assertEqual((len(heuristic.cheese), len(heuristic.meat), len(heuristic.vegetables)), (2, 2, 1))
+
+        pizza_model = build_pizza_model(self.values, self.ingredients, self.catalog)
+        warm = solve_objective(pizza_model, "minimize_price", solver="warm_start")
+        self.assertEqual(warm.solver_stats.status, "OPTIMAL")
+        self.assertAlmostEqual(warm.price, minimize_price(self.values, self.ingredients, self.catalog).price)
+        with self.assertRaises(ValueError):
+            solve_objective(pizza_model, "minimize_price", solver="annealing")
+
+    def test_silent_model_prints_nothing(self):
+        # Clp writes the log of the LP bound to the file descriptor of the standard output, not to sys.stdout
+        pizza_model = build_pizza_model(self.values, self.ingredients, self.catalog)
+        pizza_model.model.verbose = 0
+        with tempfile.TemporaryFile() as output:
+            saved = os.dup(1)
+            os.dup2(output.fileno(), 1)
+            try:
+                heuristic_selection(pizza_model, "minimize_price", options=HeuristicOptions(seed=0))
+            finally:
+                os.dup2(saved, 1)
+                os.close(saved)
+            output.seek(0)
+            self.assertEqual(output.read(), b"")
+
+    def test_anneal_repairs_the_greedy_pizza(self):
+        # the cheapest ingredients have no protein, the greedy pizza violates the protein bound
+        costs = np.array([1.0, 1.0, 5.0, 6.0, 9.0])
+        values = np.array([[0.0, 0.0, 10.0, 20.0, 30.0]])
+        groups = [(np.arange(5), 2)]
+        result = anneal(costs, values, np.array([25.0]), np.array([np.inf]), groups, HeuristicOptions(seed=0))
+        # one of the two cheapest with the most protein
+        self.assertIn(list(result.selected), [[0, 4], [1, 4]])
+        self.assertEqual(result.objective_value, 10.0)
+        infeasible = anneal(costs, values, np.array([100.0]), np.array([np.inf]), groups, HeuristicOptions(patience=50))
+        self.assertIsNone(infeasible.selected)
+
+    def test_infeasible_models(self):
+        values = PizzaConstraintsValues(price=ValueBounds(max=0.0))
+        pizza_model = build_pizza_model(values, self.ingredients, self.catalog)
+        with self.assertRaises(InfeasiblePizzaError):
+            heuristic_selection(pizza_model, "minimize_price", options=HeuristicOptions(patience=100))
+        too_many = PizzaConstraintsIngredients(cheese=len(self.catalog))
+        with self.assertRaises(InfeasiblePizzaError):
+            minimize_price(PizzaConstraintsValues(), too_many, self.catalog, solver="heuristic")
+        # the value matrix is the one of the MIP model
+        self.assertEqual(value_matrix(self.catalog).shape[1], len(self.catalog))
+
+
+if __name__ == "__main__":
+    unittest.main()
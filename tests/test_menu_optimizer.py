@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from maestro_pizza_maker.benchmarks import synthetic_catalog
+from maestro_pizza_maker.menu_optimizer import MenuConstraints, optimize_menu
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.pizza_optimizer import ChanceBounds, PizzaConstraintsIngredients, PizzaConstraintsValues
+from maestro_pizza_maker.taste_at_risk import taste_at_risk_menu
+
+
+def _recipe(pizza):
+    return tuple(sorted(i.name for i in [pizza.dough, pizza.sauce, *pizza.cheese, *pizza.meat, *pizza.vegetables]))
+
+
+class MenuOptimizerTests(unittest.TestCase):
+    values = PizzaConstraintsValues()
+    ingredients = PizzaConstraintsIngredients(cheese=1, meat=1, vegetables=1)
+
+    def test_joint_menu_is_distinct_and_within_budget(self):
+        menu = optimize_menu(
+            5, self.values, self.ingredients, MenuConstraints(budget=25.0, diversity_weight=0.5), max_seconds=5
+        )
+        self.assertIsInstance(menu, PizzaMenu)
+        self.assertEqual(len(menu), 5)
+        self.assertEqual(len({_recipe(pizza) for pizza in menu.pizzas}), 5)
+        self.assertLessEqual(sum(pizza.price for pizza in menu.pizzas), 25.0 + 1e-6)
+        self.assertIsNotNone(menu.pizzas[0].solver_stats)
+
+    def test_solvers_are_silent(self):
+        # CBC and Clp write their logs to the file descriptor of the standard output, not to sys.stdout
+        for method in ["joint", "column_generation"]:
+            with tempfile.TemporaryFile() as output:
+                saved = os.dup(1)
+                os.dup2(output.fileno(), 1)
+                try:
+                    optimize_menu(2, self.values, self.ingredients, method=method, max_seconds=5)
+                finally:
+                    os.dup2(saved, 1)
+                    os.close(saved)
+                output.seek(0)
+                self.assertEqual(output.read(), b"", method)
+
+    def test_joint_menu_is_at_least_as_good_as_column_generation(self):
+        def objective(menu):
+            return sum(pizza.taste.mean() - 0.5 * pizza.price for pizza in menu.pizzas)
+
+        joint = optimize_menu(4, self.values, self.ingredients, method="joint", max_seconds=5)
+        columns = optimize_menu(4, self.values, self.ingredients, method="column_generation", max_seconds=5)
+        self.assertGreaterEqual(objective(joint), objective(columns) - 1e-6)
+
+    def test_column_generation_on_large_catalog(self):
+        catalog = synthetic_catalog(200, 50)
+        menu = optimize_menu(
+            60, self.values, self.ingredients, MenuConstraints(budget=400.0), catalog=catalog, max_seconds=5
+        )
+        self.assertEqual(len({_recipe(pizza) for pizza in menu.pizzas}), 60)
+        self.assertLessEqual(sum(pizza.price for pizza in menu.pizzas), 400.0 + 1e-6)
+
+    def test_menu_taste_at_risk(self):
+        # the tastiest menu reaches the bound, the order statistic below the interpolated quantile
+        tasty = optimize_menu(4, self.values, self.ingredients, lambda_param=0.0, max_seconds=5)
+        bound = np.quantile(sum(pizza.taste for pizza in tasty.pizzas), 0.05, method="lower")
+
+        for method in ["column_generation", "joint"]:
+            menu = optimize_menu(
+                4, self.values, self.ingredients, MenuConstraints(min_menu_tar=bound), lambda_param=5.0,
+                method=method, max_seconds=4,
+            )
+            self.assertGreaterEqual(taste_at_risk_menu(menu, 0.05), bound - 1e-6)
+
+    def test_fat_chance_of_every_pizza(self):
+        tasty = optimize_menu(3, self.values, self.ingredients, max_seconds=5)
+        limit = min(float(np.quantile(pizza.fat, 0.9)) for pizza in tasty.pizzas) - 2
+        values = PizzaConstraintsValues(fat_chance=ChanceBounds(max=limit, probability=0.9))
+        for method in ["column_generation", "joint"]:
+            menu = optimize_menu(3, values, self.ingredients, method=method, max_seconds=4)
+            for pizza in menu.pizzas:
+                self.assertGreaterEqual((pizza.fat <= limit + 1e-6).mean(), 0.9)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            optimize_menu(3, self.values, self.ingredients, method="greedy")
+        with self.assertRaises(ValueError):
+            optimize_menu(0, self.values, self.ingredients)
+        with self.assertRaises(Exception):
+            optimize_menu(3, self.values, self.ingredients, MenuConstraints(budget=1.0), max_seconds=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
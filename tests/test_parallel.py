@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from maestro_pizza_maker import parallel
+from maestro_pizza_maker.benchmarks import synthetic_catalog, synthetic_menu
+from maestro_pizza_maker.ingredients import PizzaIngredients
+from maestro_pizza_maker.parallel import menu_index
+from maestro_pizza_maker.persistence import load_menu, save_menu
+from maestro_pizza_maker.pizza import Pizza
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.taste_at_risk import _menu_taste, conditional_taste_at_risk_menu, taste_at_risk_menu
+
+
+class ParallelTests(unittest.TestCase):
+    def setUp(self):
+        self.catalog = synthetic_catalog(24, 3_000)
+        self.menu = synthetic_menu(self.catalog, 200)
+
+    def test_menu_risk_matches_the_serial_evaluation(self):
+        # small chunks, so that the scenarios are split among the workers
+        with mock.patch.object(parallel, "SCENARIO_CHUNK", 700):
+            np.testing.assert_allclose(_menu_taste(self.menu, n_workers=3), _menu_taste(self.menu), rtol=1e-12)
+            for measure in [taste_at_risk_menu, conditional_taste_at_risk_menu]:
+                self.assertAlmostEqual(measure(self.menu, 0.05, n_workers=3), measure(self.menu, 0.05), places=6)
+                self.assertEqual(measure(self.menu, 0.05, n_workers=2), measure(self.menu, 0.05, n_workers=5))
+
+    def test_most_fat_pizza(self):
+        with mock.patch.object(parallel, "PIZZA_CHUNK_VALUES", 30_000):
+            self.assertIs(self.menu.get_most_fat_pizza(0.9, n_workers=4), self.menu.get_most_fat_pizza(0.9))
+        # equal pizzas, the last one is the most fat as in the serial evaluation
+        pizza = Pizza(dough=PizzaIngredients.CLASSIC_DOUGH, sauce=PizzaIngredients.TOMATO_SAUCE)
+        twin = Pizza(dough=PizzaIngredients.CLASSIC_DOUGH, sauce=PizzaIngredients.TOMATO_SAUCE)
+        menu = PizzaMenu(pizzas=[pizza, twin])
+        self.assertIs(menu.get_most_fat_pizza(n_workers=2), menu.get_most_fat_pizza())
+
+    def test_menu_index(self):
+        catalog, indptr, indices = menu_index(self.menu)
+        self.assertLessEqual(len(catalog), 24)
+        self.assertEqual(len(indptr), 201)
+        self.assertEqual([catalog[i] for i in indices[indptr[3] : indptr[4]]], self.menu.pizzas[3].ingredients)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "menu.npz")
+            save_menu(path, self.menu, catalog=self.catalog)
+            stored = load_menu(path)
+            # a loaded menu is indexed already
+            self.assertIs(menu_index(stored.menu)[0], stored.catalog)
+            self.assertAlmostEqual(
+                taste_at_risk_menu(stored.menu, 0.05, n_workers=2), taste_at_risk_menu(self.menu, 0.05), places=6
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from maestro_pizza_maker.benchmarks import synthetic_catalog, synthetic_menu
+from maestro_pizza_maker.pareto import objective_values, pareto_mask
+from maestro_pizza_maker.persistence import load_menu, save_menu
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.pizza_optimizer import PizzaConstraintsValues, ValueBounds
+from maestro_pizza_maker.taste_at_risk import taste_at_risk_pizza
+
+
+def _pairwise_front(values):
+    # the O(n^2) definition of the front
+    return np.array(
+        [
+            not np.any(np.all(values <= point, axis=1) & np.any(values < point, axis=1))
+            for point in values
+        ],
+        dtype=bool,
+    )
+
+
+class ParetoTests(unittest.TestCase):
+    def test_mask_matches_pairwise_comparisons(self):
+        rng = np.random.default_rng(3)
+        for n_objectives in [1, 2, 3, 4]:
+            # few distinct values, so that there are ties and duplicates
+            values = rng.integers(0, 5, size=(300, n_objectives)).astype(float)
+            np.testing.assert_array_equal(pareto_mask(values), _pairwise_front(values))
+            values = rng.normal(size=(500, n_objectives))
+            np.testing.assert_array_equal(pareto_mask(values), _pairwise_front(values))
+        self.assertEqual(pareto_mask(np.empty((0, 2))).shape, (0,))
+        with self.assertRaises(ValueError):
+            pareto_mask([[np.nan, 1.0]])
+
+    def test_large_three_objective_front(self):
+        # every point of a plane is on the front, the front grows with every point
+        rng = np.random.default_rng(5)
+        values = rng.random((20_000, 3))
+        values[:, 2] = 3 - values[:, 0] - values[:, 1]
+        self.assertTrue(pareto_mask(values).all())
+        values = rng.integers(0, 40, size=(2_000, 3)).astype(float)
+        np.testing.assert_array_equal(pareto_mask(values), _pairwise_front(values))
+
+    def test_objective_values_match_the_pizzas(self):
+        catalog = synthetic_catalog(24, 500)
+        menu = synthetic_menu(catalog, 40)
+        values = objective_values(menu, ["price", "expected_taste", "taste_at_risk", "protein"], catalog, 0.95)
+        np.testing.assert_allclose(values[:, 0], [pizza.price for pizza in menu.pizzas])
+        np.testing.assert_allclose(values[:, 1], [pizza.taste.mean() for pizza in menu.pizzas])
+        np.testing.assert_allclose(values[:, 2], [taste_at_risk_pizza(pizza, 0.05) for pizza in menu.pizzas])
+        np.testing.assert_allclose(values[:, 3], [pizza.protein for pizza in menu.pizzas])
+        with self.assertRaises(ValueError):
+            objective_values(menu, ["sweetness"], catalog)
+
+    def test_pareto_front_of_a_menu(self):
+        catalog = synthetic_catalog(24, 500)
+        menu = synthetic_menu(catalog, 200)
+        front = menu.pareto_front(["price", "taste_at_risk"], catalog=catalog)
+        self.assertIsInstance(front, PizzaMenu)
+        prices = [pizza.price for pizza in menu.pizzas]
+        tars = [taste_at_risk_pizza(pizza, 0.05) for pizza in menu.pizzas]
+        expected = _pairwise_front(np.column_stack([prices, -np.array(tars)]))
+        self.assertEqual(front.pizzas, [pizza for pizza, kept in zip(menu.pizzas, expected) if kept])
+        # the cheapest pizza is always on the front
+        self.assertIn(menu.cheapest_pizza, front.pizzas)
+
+        constraints = PizzaConstraintsValues(protein=ValueBounds(min=float(np.median([p.protein for p in menu.pizzas]))))
+        constrained = menu.pareto_front(["price", "expected_taste", "calories"], constraints, catalog=catalog)
+        self.assertTrue(all(pizza.protein >= constraints.protein.min for pizza in constrained.pizzas))
+        self.assertEqual(len(menu.pareto_front(["price"], senses={"price": "max"}, catalog=catalog)), 1)
+        with self.assertRaises(ValueError):
+            menu.pareto_front(["price"], senses={"price": "up"}, catalog=catalog)
+        with self.assertRaisesRegex(ValueError, "unknown objectives"):
+            menu.pareto_front(["price", "bogus"], catalog=catalog)
+
+    def test_pareto_front_on_the_catalog_of_the_pizzas(self):
+        catalog = synthetic_catalog(24, 500)
+        menu = synthetic_menu(catalog, 100)
+        objectives = ["price", "expected_taste", "taste_at_risk"]
+        front = menu.pareto_front(objectives)
+        self.assertEqual(front.pizzas, menu.pareto_front(objectives, catalog=catalog).pizzas)
+        values = objective_values(menu, objectives, catalog) * [1, -1, -1]
+        expected = _pairwise_front(values)
+        self.assertEqual(front.pizzas, [pizza for pizza, kept in zip(menu.pizzas, expected) if kept])
+
+    def test_stored_menu_is_not_materialized(self):
+        catalog = synthetic_catalog(24, 200)
+        menu = synthetic_menu(catalog, 300)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "menu.npz")
+            save_menu(path, menu, catalog=catalog)
+            stored = load_menu(path).menu
+            front = stored.pareto_front(["price", "protein", "taste_at_risk"])
+            self.assertFalse(stored.pizzas.materialized)
+            expected = menu.pareto_front(["price", "protein", "taste_at_risk"], catalog=catalog)
+            self.assertEqual([pizza.price for pizza in front.pizzas], [pizza.price for pizza in expected.pizzas])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from maestro_pizza_maker.benchmarks import synthetic_catalog, synthetic_menu
+from maestro_pizza_maker.catalog import CatalogIngredient
+from maestro_pizza_maker.ingredients import PizzaIngredients
+from maestro_pizza_maker.persistence import StoredPizzas, load_menu, save_menu
+from maestro_pizza_maker.pizza import Pizza
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.taste_at_risk import conditional_taste_at_risk_menu, taste_at_risk_menu
+
+
+class PersistenceTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "menu.npz")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_roundtrip_is_lazy_and_memory_mapped(self):
+        catalog = synthetic_catalog(40, 500)
+        menu = synthetic_menu(catalog, 300)
+        save_menu(self.path, menu, catalog=catalog, pizza_ids=np.arange(300) * 7, metadata={"lambda": 0.5})
+
+        stored = load_menu(self.path)
+        self.assertIsInstance(stored.menu.pizzas, StoredPizzas)
+        self.assertEqual(len(stored.menu), 300)
+        self.assertEqual(stored.metadata, {"lambda": 0.5})
+        np.testing.assert_array_equal(stored.pizza_ids, np.arange(300) * 7)
+        # the scenarios are read from the file, not copied into memory
+        self.assertFalse(stored.catalog.fat.flags.writeable)
+        np.testing.assert_array_equal(stored.catalog.fat, catalog.fat)
+
+        self.assertAlmostEqual(taste_at_risk_menu(stored.menu, 0.05), taste_at_risk_menu(menu, 0.05))
+        self.assertAlmostEqual(
+            conditional_taste_at_risk_menu(stored.menu, 0.05), conditional_taste_at_risk_menu(menu, 0.05)
+        )
+        np.testing.assert_array_equal(stored.menu.ingredient_counts(), menu.ingredient_counts(catalog))
+        self.assertFalse(stored.menu.pizzas.materialized)
+
+        pizza = stored.menu.pizzas[-1]
+        self.assertIsInstance(pizza.dough, CatalogIngredient)
+        self.assertEqual([i.name for i in pizza.ingredients], [i.name for i in menu.pizzas[-1].ingredients])
+        self.assertAlmostEqual(pizza.price, menu.pizzas[-1].price)
+        self.assertEqual(len(stored.menu.pizzas[10:20]), 10)
+
+    def test_modification_materializes(self):
+        catalog = synthetic_catalog(20, 50)
+        save_menu(self.path, synthetic_menu(catalog, 5), catalog=catalog)
+        stored = load_menu(self.path)
+        first = stored.menu.pizzas[0]
+        stored.menu.remove_pizza(first)
+        self.assertTrue(stored.menu.pizzas.materialized)
+        self.assertEqual(len(stored.menu), 4)
+        stored.menu.add_pizza(first)
+        self.assertEqual(stored.menu.pizzas[-1], first)
+
+        # a modified menu is saved from its pizzas, an unmodified one from its indices
+        resaved = os.path.join(self.directory.name, "resaved.npz")
+        save_menu(resaved, stored.menu)
+        self.assertEqual(len(load_menu(resaved).menu), 5)
+
+    def test_catalog_menu_is_saved_with_its_catalog(self):
+        catalog = synthetic_catalog(16, 100)
+        menu = synthetic_menu(catalog, 5)
+        save_menu(self.path, menu)
+        stored = load_menu(self.path)
+        np.testing.assert_array_equal(stored.catalog.fat, catalog.fat)
+        self.assertEqual(
+            [[i.name for i in pizza.ingredients] for pizza in stored.menu.pizzas],
+            [[i.name for i in pizza.ingredients] for pizza in menu.pizzas],
+        )
+
+    def test_enum_menu_keeps_its_scenarios(self):
+        pizza = Pizza(
+            dough=PizzaIngredients.CLASSIC_DOUGH,
+            sauce=PizzaIngredients.TOMATO_SAUCE,
+            cheese=[PizzaIngredients.MOZZARELA],
+        )
+        save_menu(self.path, PizzaMenu(pizzas=[pizza]))
+        loaded = load_menu(self.path).menu.pizzas[0]
+        self.assertEqual(loaded.dough.name, "CLASSIC_DOUGH")
+        np.testing.assert_array_equal(loaded.taste, pizza.taste)
+
+    def test_invalid_ids(self):
+        with self.assertRaises(ValueError):
+            save_menu(self.path, synthetic_menu(synthetic_catalog(12, 10), 3), pizza_ids=[1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import itertools
+import unittest
+
+import numpy as np
+
+from maestro_pizza_maker.benchmarks import synthetic_catalog
+from maestro_pizza_maker.catalog import default_catalog
+from maestro_pizza_maker.pizza import PIZZA_SLOTS
+from maestro_pizza_maker.pizza_optimizer import (
+    ChanceBounds,
+    InfeasiblePizzaError,
+    PizzaConstraintsIngredients,
+    PizzaConstraintsValues,
+    PizzaOptimizationError,
+    ValueBounds,
+    build_pizza_model,
+    maximize_taste_penalty_price,
+    minimize_price,
+    solve_objective,
+    value_matrix,
+)
+
+
+class PizzaOptimizerTests(unittest.TestCase):
+    def test_value_matrix(self):
+        catalog = default_catalog()
+        matrix = value_matrix(catalog)
+        self.assertEqual(matrix.shape, (5, len(catalog)))
+        np.testing.assert_allclose(matrix[2], [i.value.fat.mean() for i in catalog])
+
+    def test_model_size_is_linear(self):
+        catalog = synthetic_catalog(3_000, 10)
+        values = PizzaConstraintsValues(protein=ValueBounds(5, 50), calories=ValueBounds(max=900))
+        pizza_model = build_pizza_model(values, PizzaConstraintsIngredients(cheese=1), catalog)
+        self.assertEqual(pizza_model.model.num_cols, 3_000)
+        # protein min and max, calories max and one count per type
+        self.assertEqual(pizza_model.model.num_rows, 3 + 6)
+        self.assertEqual(pizza_model.model.num_nz, 3 * 3_000 + 3_000)
+
+    def test_bounds_are_respected(self):
+        values = PizzaConstraintsValues(protein=ValueBounds(min=30.0), price=ValueBounds(max=6.0))
+        ingredients = PizzaConstraintsIngredients(cheese=2, meat=1)
+        pizza = minimize_price(values, ingredients)
+        self.assertGreaterEqual(pizza.protein, 30.0)
+        self.assertLessEqual(pizza.price, 6.0)
+        self.assertEqual(len(pizza.cheese), 2)
+
+    def test_taste_objective_matches_pizza_taste(self):
+        lambda_param = 0.5
+        pizza = maximize_taste_penalty_price(
+            PizzaConstraintsValues(), PizzaConstraintsIngredients(meat=1), lambda_param
+        )
+        self.assertAlmostEqual(
+            pizza.solver_stats.objective_value,
+            pizza.taste.mean() - lambda_param * pizza.price,
+            places=6,
+        )
+
+    def test_infeasible(self):
+        with self.assertRaises(Exception):
+            minimize_price(
+                PizzaConstraintsValues(price=ValueBounds(max=0.1)), PizzaConstraintsIngredients()
+            )
+
+    def test_limits_return_the_best_pizza_so_far(self):
+        # narrow bounds on a large catalog, CBC does not prove optimality at the root node
+        catalog = synthetic_catalog(3_000, 100)
+        ingredients = PizzaConstraintsIngredients(cheese=3, meat=3, vegetables=3, fruits=2)
+        values = PizzaConstraintsValues(
+            price=ValueBounds(max=40), protein=ValueBounds(55.3, 55.6), calories=ValueBounds(1_000, 1_010)
+        )
+        pizza_model = build_pizza_model(values, ingredients, catalog)
+        pizza = solve_objective(pizza_model, "maximize_taste_penalty_price", max_nodes=1)
+        stats = pizza.solver_stats
+        self.assertEqual(stats.status, "FEASIBLE")
+        self.assertGreaterEqual(stats.objective_bound, stats.objective_value)
+        self.assertGreater(stats.gap, 0)
+        self.assertTrue(55.3 - 1e-6 <= pizza.protein <= 55.6 + 1e-6)
+
+        # a limit stopping the solver before the first pizza is no proof of infeasibility
+        values.protein = ValueBounds(55.4, 55.41)
+        with self.assertRaises(PizzaOptimizationError) as raised:
+            minimize_price(values, ingredients, catalog, max_nodes=0)
+        self.assertNotIsInstance(raised.exception, InfeasiblePizzaError)
+        self.assertEqual(raised.exception.solver_stats.status, "NO_SOLUTION_FOUND")
+        with self.assertRaises(ValueError):
+            solve_objective(pizza_model, "minimize_price", max_seconds=-1)
+
+    def test_fat_chance_constraints(self):
+        catalog = default_catalog()
+        ingredients = PizzaConstraintsIngredients(cheese=1, meat=1, vegetables=1)
+        tastiest = maximize_taste_penalty_price(PizzaConstraintsValues(), ingredients, catalog=catalog)
+        limit = float(np.quantile(tastiest.fat, 0.9)) - 3
+
+        # every pizza of the catalog, the best one in at least 90% of the scenarios below the limit
+        types = [t for t, slot in PIZZA_SLOTS.items() if getattr(ingredients, slot)]
+        pizzas = [list(p) for p in itertools.product(*(catalog.type_indices(t) for t in types))]
+        values = catalog.expected_taste - 0.5 * catalog.price
+        best = max(
+            values[p].sum() for p in pizzas if (catalog.fat[p].sum(axis=0) <= limit).mean() >= 0.9
+        )
+
+        objectives = []
+        for conservative in [False, True]:
+            chance = ChanceBounds(max=limit, probability=0.9, conservative=conservative)
+            pizza_model = build_pizza_model(PizzaConstraintsValues(fat_chance=chance), ingredients, catalog)
+            pizza = solve_objective(pizza_model, "maximize_taste_penalty_price")
+            self.assertGreaterEqual((pizza.fat <= limit + 1e-6).mean(), 0.9)
+            # only the scenarios violated on the way are in the model
+            self.assertLess(len(pizza_model.fat_scenarios.constrs), catalog.n_scenarios)
+            objectives.append(pizza.solver_stats.objective_value)
+        self.assertAlmostEqual(objectives[0], best, places=6)
+        self.assertLessEqual(objectives[1], objectives[0] + 1e-9)
+        with self.assertRaises(ValueError):
+            solve_objective(pizza_model, "minimize_price", solver="heuristic")
+
+    def test_typed_infeasibility(self):
+        with self.assertRaises(InfeasiblePizzaError):
+            maximize_taste_penalty_price(
+                PizzaConstraintsValues(price=ValueBounds(max=0.1)), PizzaConstraintsIngredients(), max_seconds=5
+            )
+        with self.assertRaises(InfeasiblePizzaError):
+            # one ingredient of every type
+            minimize_price(PizzaConstraintsValues(), PizzaConstraintsIngredients(cheese=2), synthetic_catalog(6, 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import logging
+import unittest
+
+from maestro_pizza_maker import profiling
+from maestro_pizza_maker.ingredients import PizzaIngredients
+from maestro_pizza_maker.pizza import Pizza
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.pizza_optimizer import (
+    PizzaConstraintsIngredients,
+    PizzaConstraintsValues,
+    maximize_taste_penalty_price,
+)
+from maestro_pizza_maker.taste_at_risk import taste_at_risk_menu
+
+
+class ProfilingTests(unittest.TestCase):
+    menu = PizzaMenu(
+        pizzas=[
+            Pizza(dough=PizzaIngredients.CLASSIC_DOUGH, sauce=PizzaIngredients.TOMATO_SAUCE),
+            Pizza(
+                dough=PizzaIngredients.THIN_DOUGH,
+                sauce=PizzaIngredients.CREAM_SAUCE,
+                cheese=[PizzaIngredients.MOZZARELA],
+            ),
+        ]
+    )
+
+    def test_disabled_records_nothing(self):
+        self.assertFalse(profiling.is_enabled())
+        self.assertIs(profiling.phase("anything"), profiling.phase("else"))
+
+    def test_in_memory_sink(self):
+        with profiling.profiling() as sink:
+            taste_at_risk_menu(self.menu, quantile=0.05)
+            self.menu.to_dataframe(sort_by="price", descendent=True)
+        self.assertFalse(profiling.is_enabled())
+        summary = sink.summary()
+        self.assertEqual(summary["taste_at_risk.pizzas"]["count"], 2)
+        self.assertEqual(summary["taste_at_risk.aggregate"]["calls"], 1)
+        self.assertIn("menu.to_dataframe.build", summary)
+
+    def test_solver_stats(self):
+        with profiling.profiling() as sink:
+            pizza = maximize_taste_penalty_price(
+                PizzaConstraintsValues(), PizzaConstraintsIngredients(cheese=1)
+            )
+        self.assertEqual(pizza.solver_stats.status, "OPTIMAL")
+        self.assertGreater(pizza.solver_stats.num_vars, 0)
+        self.assertEqual(sink.solver_stats, [pizza.solver_stats])
+        self.assertIn("optimizer.build", sink.summary())
+        self.assertIn("optimizer.solve", sink.summary())
+
+    def test_callback_and_logging_sinks(self):
+        events = []
+        with profiling.profiling(profiling.CallbackSink(events.append)):
+            profiling.count("counter", 3)
+        self.assertEqual([(e.kind, e.name, e.value) for e in events], [("counter", "counter", 3)])
+
+        with self.assertLogs("maestro_pizza_maker.profiling", level=logging.DEBUG):
+            with profiling.profiling(profiling.LoggingSink()):
+                with profiling.phase("logged"):
+                    pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+import numpy as np
+
+from maestro_pizza_maker.benchmarks import synthetic_catalog, synthetic_menu
+from maestro_pizza_maker.ingredients import PizzaIngredients
+from maestro_pizza_maker.persistence import load_menu, save_menu
+from maestro_pizza_maker.pizza import Pizza
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.pizza_sensitivities import (
+    menu_sensitivity_carbs,
+    menu_sensitivity_fat,
+    menu_sensitivity_protein,
+)
+from maestro_pizza_maker.recipes import RecipePizzas
+from maestro_pizza_maker.taste_at_risk import conditional_taste_at_risk_menu, taste_at_risk_menu
+
+
+def _duplicated_menu(catalog, n_pizzas: int, seed: int = 0) -> PizzaMenu:
+    # every pizza a few times, some copies with their toppings in reverse order
+    rng = np.random.default_rng(seed)
+    pizzas = []
+    for pizza in synthetic_menu(catalog, n_pizzas, seed=seed).pizzas:
+        for copy in range(int(rng.integers(1, 5))):
+            toppings = pizza.ingredients[2:][:: -1 if copy % 2 else 1]
+            pizzas.append(Pizza.from_ingredients([pizza.dough, pizza.sauce, *toppings]))
+    return PizzaMenu(pizzas=pizzas)
+
+
+class RecipeTests(unittest.TestCase):
+    def setUp(self):
+        self.catalog = synthetic_catalog(16, 300)
+        self.menu = _duplicated_menu(self.catalog, 30)
+
+    def test_remove_pizza_ignores_the_order_of_the_ingredients(self):
+        pizza = Pizza(
+            dough=PizzaIngredients.CLASSIC_DOUGH,
+            sauce=PizzaIngredients.TOMATO_SAUCE,
+            cheese=[PizzaIngredients.MOZZARELA, PizzaIngredients.PARMESAN],
+        )
+        reordered = Pizza(
+            dough=PizzaIngredients.CLASSIC_DOUGH,
+            sauce=PizzaIngredients.TOMATO_SAUCE,
+            cheese=[PizzaIngredients.PARMESAN, PizzaIngredients.MOZZARELA],
+        )
+        self.assertNotEqual(pizza, reordered)
+        self.assertEqual(pizza.recipe, reordered.recipe)
+        for pizzas in [[pizza], RecipePizzas([pizza])]:
+            menu = PizzaMenu(pizzas=pizzas)
+            menu.remove_pizza(reordered)
+            self.assertEqual(len(menu), 0)
+
+    def test_aggregates_match_the_expanded_menu(self):
+        compressed = self.menu.compress()
+        pizzas = compressed.pizzas
+        self.assertIsInstance(pizzas, RecipePizzas)
+        self.assertEqual(len(pizzas.recipes), 30)
+        self.assertEqual(len(compressed), len(self.menu))
+        self.assertEqual(Counter(p.recipe for p in pizzas), Counter(p.recipe for p in self.menu.pizzas))
+        for measure in [taste_at_risk_menu, conditional_taste_at_risk_menu]:
+            expected = measure(self.menu, 0.05)
+            self.assertAlmostEqual(measure(compressed, 0.05), expected, places=6)
+            self.assertAlmostEqual(measure(compressed, 0.05, n_workers=2), expected, places=6)
+        for sensitivity in [menu_sensitivity_protein, menu_sensitivity_carbs, menu_sensitivity_fat]:
+            self.assertAlmostEqual(sensitivity(compressed), sensitivity(self.menu), places=6)
+
+    def test_copies_are_added_and_removed(self):
+        pizzas = self.menu.compress().pizzas
+        first = pizzas.recipes[0]
+        copies = pizzas.count(first)
+        pizzas.append(first)
+        self.assertEqual(pizzas.count(first), copies + 1)
+        self.assertEqual(len(pizzas.recipes), 30)
+        for _ in range(copies + 1):
+            self.assertIs(pizzas[0], first)
+            del pizzas[0]
+        self.assertNotIn(first, pizzas)
+        self.assertEqual(len(pizzas.recipes), 29)
+        self.assertEqual(pizzas.index(pizzas.recipes[1]), pizzas.multiplicities[0])
+        self.assertIs(pizzas[-1], pizzas.recipes[-1])
+        with self.assertRaises(ValueError):
+            pizzas.remove(first)
+
+    def test_loaded_menu_is_compressed_from_its_indices(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "menu.npz")
+            save_menu(path, self.menu, catalog=self.catalog)
+            stored = load_menu(path)
+            compressed = stored.menu.compress()
+            self.assertFalse(stored.menu.pizzas.materialized)
+            expected = self.menu.compress().pizzas
+            self.assertEqual(compressed.pizzas.multiplicities, expected.multiplicities)
+            self.assertEqual(
+                [sorted(i.name for i in p.ingredients) for p in compressed.pizzas.recipes],
+                [sorted(i.name for i in p.ingredients) for p in expected.recipes],
+            )
+            np.testing.assert_allclose(taste_at_risk_menu(compressed, 0.05), taste_at_risk_menu(self.menu, 0.05))
+
+
+if __name__ == "__main__":
+    unittest.main()
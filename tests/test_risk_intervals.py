@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+
+from maestro_pizza_maker.benchmarks import synthetic_catalog, synthetic_menu
+from maestro_pizza_maker.risk_intervals import IntervalOptions, RiskInterval, risk_intervals, taste_interval
+from maestro_pizza_maker.taste_at_risk import (
+    conditional_taste_at_risk_menu,
+    conditional_taste_at_risk_pizza,
+    taste_at_risk_menu,
+    taste_at_risk_pizza,
+)
+
+
+class RiskIntervalTests(unittest.TestCase):
+    def setUp(self):
+        self.catalog = synthetic_catalog(16, 400)
+        self.menu = synthetic_menu(self.catalog, 40)
+
+    def test_estimates_match_the_point_functions(self):
+        options = IntervalOptions(seed=0, n_resamples=200)
+        pizza = self.menu.pizzas[0]
+        for measure, point in [("tar", taste_at_risk_pizza), ("ctar", conditional_taste_at_risk_pizza)]:
+            interval = point(pizza, 0.95, interval=options)
+            self.assertIsInstance(interval, RiskInterval)
+            self.assertAlmostEqual(interval.estimate, point(pizza, 0.05))
+            self.assertLessEqual(interval.low, interval.high)
+
+            intervals = risk_intervals(self.menu, [0.01, 0.05], measure, options, self.catalog)
+            self.assertEqual(intervals.estimate.shape, (40, 2))
+            np.testing.assert_allclose(intervals.estimate[:, 1], [point(p, 0.05) for p in self.menu.pizzas])
+        self.assertIsInstance(taste_at_risk_menu(self.menu, 0.05, interval=options), RiskInterval)
+        self.assertIsInstance(conditional_taste_at_risk_menu(self.menu, 0.05, interval=options), RiskInterval)
+
+    def test_bootstrap_matches_the_resampled_measures(self):
+        taste = self.menu.pizzas[1].taste
+        options = IntervalOptions(seed=3, n_resamples=300, confidence=0.9)
+        # the same draws as the vectorized bootstrap, as ranks of the sorted tastes
+        draws = np.random.default_rng(3).integers(0, len(taste), size=(300, len(taste)))
+        resampled = np.sort(taste)[draws]
+        tar = np.quantile(resampled, 0.05, axis=1)
+        ctar = [r[r <= t].mean() for r, t in zip(resampled, tar)]
+        for measure, replicates in [("tar", tar), ("ctar", ctar)]:
+            interval = taste_interval(taste, 0.05, measure, options)
+            np.testing.assert_allclose([interval.low, interval.high], np.quantile(replicates, [0.05, 0.95]), rtol=1e-6)
+
+    def test_order_statistic_interval(self):
+        rng = np.random.default_rng(1)
+        options = IntervalOptions(method="order_statistic", confidence=0.9)
+        covered = 0
+        for _ in range(200):
+            interval = taste_interval(rng.standard_normal(500), 0.05, "tar", options)
+            covered += interval.low <= -1.6448536 <= interval.high
+        self.assertGreaterEqual(covered, 170)
+        with self.assertRaises(ValueError):
+            taste_interval(rng.standard_normal(500), 0.05, "ctar", options)
+
+    def test_workers_do_not_change_the_result(self):
+        single = risk_intervals(self.menu, [0.05], "ctar", IntervalOptions(seed=7, n_resamples=100), self.catalog)
+        threaded = risk_intervals(
+            self.menu, [0.05], "ctar", IntervalOptions(seed=7, n_resamples=100, n_workers=3), self.catalog
+        )
+        np.testing.assert_array_equal(single.low, threaded.low)
+        np.testing.assert_array_equal(single.high, threaded.high)
+        with self.assertRaises(ValueError):
+            IntervalOptions(method="jackknife")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import unittest
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from maestro_pizza_maker.benchmarks import synthetic_catalog
+from maestro_pizza_maker.catalog import default_catalog
+from maestro_pizza_maker.sand_box import fat_generator
+from maestro_pizza_maker.shared import SharedSegments, publish_catalog, shared_pool, worker_catalog
+
+
+def _worker_state(_):
+    catalog = worker_catalog()
+    return (
+        catalog.fat.sum(),
+        catalog.fat.flags.writeable,
+        fat_generator.FAT_SIMULATIONS.sum(),
+        fat_generator.FAT_SIMULATIONS.flags.writeable,
+    )
+
+
+class SharedTests(unittest.TestCase):
+    def test_catalog_is_attached_without_copying(self):
+        catalog = synthetic_catalog(12, 50)
+        segments = SharedSegments()
+        try:
+            shared = publish_catalog(catalog, segments)
+            attached = shared.attach()
+            self.assertFalse(attached.fat.flags.writeable)
+            np.testing.assert_array_equal(attached.fat, catalog.fat)
+            np.testing.assert_array_equal(attached.price, catalog.price)
+            self.assertEqual(list(attached.names), list(catalog.names))
+        finally:
+            segments.close()
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=shared.columns["fat"].name)
+
+    def test_workers_attach_to_the_published_scenarios(self):
+        catalog = synthetic_catalog(12, 50)
+        with shared_pool(2, catalog, start_method="spawn") as pool:
+            states = pool.map(_worker_state, range(2))
+        expected = (catalog.fat.sum(), False, default_catalog().fat.sum(), False)
+        for state in states:
+            self.assertEqual(state, expected)
+        self.assertNotIn(fat_generator.SHARED_FAT_VARIABLE, os.environ)
+        with self.assertRaises(ValueError):
+            with shared_pool(0):
+                pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+import numpy as np
+
+from maestro_pizza_maker.benchmarks import synthetic_catalog, synthetic_menu
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.similarity import TasteSimilarityIndex, taste_signatures
+
+
+class TasteSimilarityIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.catalog = synthetic_catalog(24, 500)
+        self.menu = synthetic_menu(self.catalog, 400)
+        self.index = self.menu.taste_index(n_quantiles=16)
+        tastes = np.stack([pizza.taste for pizza in self.menu.pizzas])
+        self.signatures = taste_signatures(tastes, 16)
+        # the distances of all pairs of pizzas
+        self.distances = np.abs(self.signatures[:, None, :] - self.signatures[None, :, :]).mean(axis=2)
+
+    def test_signatures(self):
+        taste = self.menu.pizzas[7].taste
+        levels = (np.arange(16) + 0.5) / 16
+        np.testing.assert_allclose(self.index.signature(taste), np.quantile(taste, levels))
+        np.testing.assert_allclose(self.index.signatures[np.argsort(self.index.order)], self.signatures)
+
+    def test_queries_match_brute_force(self):
+        taste = self.menu.pizzas[11].taste
+        positions, distances = self.index.knn(taste, k=7)
+        self.assertEqual(positions[0], 11)
+        np.testing.assert_allclose(distances, np.sort(self.distances[11])[:7], atol=1e-9)
+        np.testing.assert_allclose(self.distances[11, positions], distances, atol=1e-9)
+
+        radius = np.sort(self.distances[11])[20:22].mean()
+        positions, distances = self.index.radius(taste, radius)
+        self.assertEqual(set(positions), set(np.flatnonzero(self.distances[11] <= radius)))
+        self.assertTrue(np.all(np.diff(distances) >= 0))
+        # more neighbours than pizzas
+        self.assertEqual(len(self.index.knn(taste, k=1_000)[0]), 400)
+
+    def test_near_duplicates(self):
+        # between two distances, the signatures of the index and of the test differ by rounding
+        ordered = np.sort(self.distances[np.triu_indices(400, 1)])
+        radius = (ordered[800] + ordered[801]) / 2
+        pairs, distances = self.index.near_duplicates(radius)
+        first, second = np.nonzero(np.triu(self.distances <= radius, 1))
+        np.testing.assert_array_equal(pairs, np.column_stack([first, second]))
+        np.testing.assert_allclose(distances, self.distances[first, second], atol=1e-9)
+
+    def test_duplicates_keep_one_pizza_per_group(self):
+        pizzas = self.menu.pizzas[:3]
+        # 0 and 3 are equal, 4 equals 1 and 5 equals 4
+        menu = PizzaMenu(pizzas=pizzas + [pizzas[0], pizzas[1], pizzas[1]])
+        redundant = menu.taste_index().duplicates(radius=1e-9)
+        np.testing.assert_array_equal(redundant, [False, False, False, True, True, True])
+        self.assertEqual(len(TasteSimilarityIndex.from_menu(PizzaMenu(pizzas=[]))), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
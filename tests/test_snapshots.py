@@ -0,0 +1,87 @@
+import threading
+import unittest
+from collections import Counter
+
+import numpy as np
+
+from maestro_pizza_maker.benchmarks import synthetic_catalog, synthetic_menu
+from maestro_pizza_maker.pizza import Pizza
+from maestro_pizza_maker.pizza_menu import PizzaMenu
+from maestro_pizza_maker.pizza_sensitivities import menu_sensitivity_fat
+from maestro_pizza_maker.snapshots import CHUNK_SIZE, VersionedPizzaMenu
+from maestro_pizza_maker.taste_at_risk import taste_at_risk_menu
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.catalog = synthetic_catalog(16, 100)
+        self.pizzas = synthetic_menu(self.catalog, 3 * CHUNK_SIZE // 2).pizzas
+
+    def test_snapshots_do_not_change(self):
+        versioned = VersionedPizzaMenu(self.pizzas[:-2])
+        before = versioned.snapshot()
+        after = versioned.add_pizza(self.pizzas[-2])
+        versioned.add_pizza(self.pizzas[-1])
+        removed = versioned.remove_pizza(Pizza.from_ingredients(self.pizzas[0].ingredients[::-1]))
+        self.assertEqual((before.version, after.version, removed.version, versioned.version), (0, 1, 3, 3))
+        self.assertEqual(list(before.pizzas), self.pizzas[:-2])
+        self.assertEqual(list(removed.pizzas), self.pizzas[1:])
+        self.assertEqual(removed.pizzas[-1], self.pizzas[-1])
+        self.assertEqual(removed.pizzas[2:4], self.pizzas[3:5])
+        # the unchanged chunks are shared
+        self.assertIs(before.pizzas._chunks[0], after.pizzas._chunks[0])
+        with self.assertRaises(ValueError):
+            VersionedPizzaMenu().remove_pizza(self.pizzas[0])
+
+        for snapshot, pizzas in [(before, self.pizzas[:-2]), (removed, self.pizzas[1:])]:
+            menu = PizzaMenu(pizzas=list(pizzas))
+            self.assertAlmostEqual(snapshot.cached(taste_at_risk_menu, 0.05), taste_at_risk_menu(menu, 0.05))
+            np.testing.assert_allclose(snapshot.cached(menu_sensitivity_fat), menu_sensitivity_fat(menu))
+            self.assertEqual(len(snapshot.menu.to_dataframe(sort_by="price", descendent=True)), len(pizzas))
+        self.assertIs(removed.cached(menu_sensitivity_fat), removed.cached(menu_sensitivity_fat))
+
+    def test_containers_sum_their_own_taste(self):
+        class CountingPizzas(list):
+            calls = 0
+
+            def menu_taste(self):
+                CountingPizzas.calls += 1
+                return sum(pizza.taste for pizza in self)
+
+        pizzas = CountingPizzas(self.pizzas)
+        expected = taste_at_risk_menu(PizzaMenu(pizzas=list(self.pizzas)), 0.05)
+        self.assertAlmostEqual(taste_at_risk_menu(PizzaMenu(pizzas=pizzas), 0.05), expected)
+        self.assertEqual(CountingPizzas.calls, 1)
+
+    def test_readers_see_consistent_snapshots(self):
+        versioned = VersionedPizzaMenu()
+        errors = []
+
+        def write():
+            for pizza in self.pizzas:
+                versioned.add_pizza(pizza)
+            for pizza in self.pizzas[::2]:
+                versioned.remove_pizza(pizza)
+
+        def read():
+            for _ in range(200):
+                snapshot = versioned.snapshot()
+                # the length, the pizzas and the taste of a snapshot agree, whatever the writer does
+                pizzas = list(snapshot.pizzas)
+                if len(pizzas) != len(snapshot) or (pizzas and snapshot.pizzas[-1] is not pizzas[-1]):
+                    errors.append(snapshot.version)
+
+        threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        # the synthetic menu repeats recipes, a removal takes the first copy of the recipe
+        recipes = Counter(pizza.recipe for pizza in versioned.snapshot().pizzas)
+        self.assertEqual(recipes, Counter(pizza.recipe for pizza in self.pizzas[1::2]))
+        self.assertEqual(versioned.version, len(self.pizzas) + len(self.pizzas[::2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+
+import numpy as np
+
+from maestro_pizza_maker.benchmarks import synthetic_catalog, synthetic_menu
+from maestro_pizza_maker.catalog import IngredientCatalog, default_catalog
+from maestro_pizza_maker.ingredients import PizzaIngredients
+from maestro_pizza_maker.pizza_optimizer import (
+    PizzaConstraintsIngredients,
+    PizzaConstraintsValues,
+    ValueBounds,
+    maximize_taste_penalty_price,
+    minimize_price,
+)
+from maestro_pizza_maker.what_if import menu_prices, optimal_pizzas, price_matrix, price_shocks
+
+
+def _repriced(catalog, price):
+    return IngredientCatalog(
+        names=catalog.names,
+        types=catalog.types,
+        price=price,
+        protein=catalog.protein,
+        carbohydrates=catalog.carbohydrates,
+        calories=catalog.calories,
+        fat=catalog.fat,
+    )
+
+
+class WhatIfTests(unittest.TestCase):
+    def test_menu_prices(self):
+        catalog = synthetic_catalog(30, 50)
+        menu = synthetic_menu(catalog, 20)
+        prices = catalog.price * np.random.default_rng(1).uniform(0.5, 2.0, size=(7, len(catalog)))
+        matrix = menu_prices(menu, prices, catalog)
+        self.assertEqual(matrix.shape, (7, 20))
+        expected = [[sum(scenario[i.index] for i in pizza.ingredients) for pizza in menu.pizzas] for scenario in prices]
+        np.testing.assert_allclose(matrix, expected)
+        # the catalog prices are the prices of the unchanged scenario
+        np.testing.assert_allclose(menu_prices(menu, catalog.price, catalog)[0], [pizza.price for pizza in menu.pizzas])
+
+    def test_price_shocks_leave_the_enum_alone(self):
+        before = PizzaIngredients.MOZZARELA.value.price
+        prices = price_shocks({"MOZZARELA": [1.0, 2.0], "HAM": [1.0, 0.5]})
+        self.assertEqual(prices.shape, (2, len(PizzaIngredients)))
+        catalog = default_catalog()
+        self.assertEqual(prices[1, catalog.index_of("MOZZARELA")], 2 * before)
+        self.assertEqual(prices[1, catalog.index_of("HAM")], 0.5 * PizzaIngredients.HAM.value.price)
+        optimal_pizzas(prices, PizzaConstraintsValues(), PizzaConstraintsIngredients(cheese=1))
+        self.assertEqual(PizzaIngredients.MOZZARELA.value.price, before)
+        np.testing.assert_array_equal(catalog.price, [i.value.price for i in PizzaIngredients])
+        with self.assertRaises(ValueError):
+            price_shocks({"MOZZARELA": [1.0, 2.0], "HAM": [1.0]})
+        with self.assertRaises(ValueError):
+            price_matrix(np.ones((2, 3)))
+
+    def test_optima_match_a_repriced_catalog(self):
+        catalog = synthetic_catalog(60, 100)
+        prices = catalog.price * np.random.default_rng(2).uniform(0.5, 2.0, size=(6, len(catalog)))
+        prices = np.vstack([prices, prices[:2]])
+        values = PizzaConstraintsValues(price=ValueBounds(max=9.0))
+        ingredients = PizzaConstraintsIngredients(cheese=2, meat=1)
+        for objective, solve in [
+            ("minimize_price", lambda price: minimize_price(values, ingredients, _repriced(catalog, price))),
+            (
+                "maximize_taste_penalty_price",
+                lambda price: maximize_taste_penalty_price(values, ingredients, 0.5, _repriced(catalog, price)),
+            ),
+        ]:
+            optima = optimal_pizzas(prices, values, ingredients, objective, catalog=catalog)
+            self.assertIs(optima.pizzas[0], optima.pizzas[6])
+            for k, price in enumerate(prices[:6]):
+                expected = solve(price)
+                self.assertAlmostEqual(optima.price[k], expected.price)
+                self.assertAlmostEqual(optima.objective_value[k], expected.solver_stats.objective_value, places=6)
+
+    def test_infeasible_scenarios(self):
+        catalog = synthetic_catalog(24, 20)
+        prices = np.vstack([catalog.price, catalog.price * 100])
+        optima = optimal_pizzas(prices, PizzaConstraintsValues(price=ValueBounds(max=20.0)), PizzaConstraintsIngredients(), catalog=catalog)
+        self.assertIsNotNone(optima.pizzas[0])
+        self.assertIsNone(optima.pizzas[1])
+        self.assertTrue(np.isnan(optima.price[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()